@@ -0,0 +1,229 @@
+""" Benchmark the rating engines on synthetic fleets
+
+Run from the repository root, for example:
+
+    python -m benchmarks.benchmark --sizes 1 100 10000 --output results.json
+    python -m benchmarks.benchmark --compare before.json after.json
+
+For each fleet size this times single ratings (Transformer.perform_rating)
+on a sample of the units and the vectorised fleet engine on all of them,
+by both its step search (rate_parameters) and its bracketed search
+(bracket_parameters), with the number of load cycles simulated and the peak memory
+traced while rating. Results are written as JSON so runs on different
+commits can be compared.
+"""
+
+import argparse
+import datetime
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from ratetransformer.rate import Transformer
+from ratetransformer.rate import MODEL_VERSION
+from ratetransformer.fleet import bracket_parameters
+from ratetransformer.fleet import fleet_parameters
+from ratetransformer.fleet import rate_parameters
+from ratetransformer.synthetic import synthetic_fleet
+from ratetransformer.synthetic import fleet_columns
+
+SIZES = (1, 100, 10000, 100000)
+
+
+def benchmark_serial(Units, Options={}):
+    """ Time single ratings of each unit
+    """
+    Latencies = []
+    Evaluations = []
+    WarmUpPasses = []
+
+    # Untimed first rating, so loading the compiled kernels is not timed
+    tx = Transformer(Units[0]['HeatRun'], Units[0]['Thermal'])
+    tx.perform_rating(Units[0]['AmbWHS'], Units[0]['AmbAgeing'],
+                      Units[0]['LoadShape'], Units[0]['Limits'], **Options)
+
+    for Unit in Units:
+        tx = Transformer(Unit['HeatRun'], Unit['Thermal'])
+        Start = time.perf_counter()
+        tx.perform_rating(Unit['AmbWHS'], Unit['AmbAgeing'], Unit['LoadShape'],
+                          Unit['Limits'], **Options)
+        Latencies.append(time.perf_counter() - Start)
+        Evaluations.append(tx.NumEvaluations)
+        WarmUpPasses.append(tx.NumWarmUpPasses)
+
+    tracemalloc.start()
+    tx = Transformer(Units[0]['HeatRun'], Units[0]['Thermal'])
+    tx.perform_rating(Units[0]['AmbWHS'], Units[0]['AmbAgeing'],
+                      Units[0]['LoadShape'], Units[0]['Limits'], **Options)
+    PeakMemory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    Latencies.sort()
+    return {
+        'NumUnits': len(Units),
+        'TotalSeconds': sum(Latencies),
+        'UnitsPerSecond': len(Units) / sum(Latencies),
+        'LatencyMedianMs': statistics.median(Latencies) * 1000,
+        'LatencyP95Ms': Latencies[int(0.95 * (len(Latencies) - 1))] * 1000,
+        'LatencyMaxMs': Latencies[-1] * 1000,
+        'CalculateLimitCalls': sum(Evaluations),
+        'CalculateLimitPerUnit': sum(Evaluations) / len(Units),
+        'WarmUpPasses': sum(WarmUpPasses),
+        'WarmUpPassesPerUnit': sum(WarmUpPasses) / len(Units),
+        'PeakMemoryBytes': PeakMemory,
+    }
+
+
+def benchmark_fleet(Units, Memory=True):
+    """ Time the fleet engine's step and bracketed searches on all units
+    at once
+    """
+    HeatRunArray, ThermalArray, LoadShapes, Ambients = fleet_columns(Units)
+    Start = time.perf_counter()
+    Params = fleet_parameters(HeatRunArray, ThermalArray)
+    Results = rate_parameters(Params, LoadShapes, Ambients)
+    Seconds = time.perf_counter() - Start
+
+    Start = time.perf_counter()
+    Params = fleet_parameters(HeatRunArray, ThermalArray)
+    Bracketed = bracket_parameters(Params, LoadShapes, Ambients)
+    BracketSeconds = time.perf_counter() - Start
+
+    Summary = {
+        'NumUnits': len(Units),
+        'TotalSeconds': Seconds,
+        'UnitsPerSecond': len(Units) / Seconds,
+        'IterationsPerUnit': float(np.mean(Results['NumIterations'])),
+        'NumNotConverged': int(np.sum(Results['RatingReason'] == 'Did not converge')),
+        'BracketSeconds': BracketSeconds,
+        'BracketUnitsPerSecond': len(Units) / BracketSeconds,
+        'BracketNotConverged': int(np.sum(
+            Bracketed['RatingReason'] == 'Did not converge')),
+        'PeakMemoryBytes': None,
+    }
+    if Memory:
+        # Traced separately, as tracing slows the rating
+        tracemalloc.start()
+        rate_parameters(fleet_parameters(HeatRunArray, ThermalArray),
+                        LoadShapes, Ambients)
+        Summary['PeakMemoryBytes'] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return Summary
+
+
+def run_benchmarks(Sizes=SIZES, Seed=0, SerialSample=200, Fleet=True,
+                   Memory=True, Progress=None):
+    """ Run the benchmarks for each fleet size and return the results
+    """
+    Results = []
+    for Size in Sizes:
+        Start = time.perf_counter()
+        Units = synthetic_fleet(Size, Seed)
+        Result = {'Size': Size,
+                  'GenerateSeconds': time.perf_counter() - Start,
+                  'Serial': benchmark_serial(Units[:SerialSample])}
+        if Fleet:
+            Result['Fleet'] = benchmark_fleet(Units, Memory)
+        Results.append(Result)
+        if Progress is not None:
+            Progress(Result)
+    return {
+        'Environment': environment(),
+        'Seed': Seed,
+        'SerialSample': SerialSample,
+        'Results': Results,
+    }
+
+
+def environment():
+    """ Describe the code and machine the benchmarks were run on
+    """
+    try:
+        Commit = subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL,
+            universal_newlines=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        Commit = None
+    return {
+        'Commit': Commit,
+        'ModelVersion': MODEL_VERSION,
+        'Created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'Python': platform.python_version(),
+        'NumPy': np.__version__,
+        'Machine': platform.machine(),
+        'Platform': platform.platform(),
+    }
+
+
+def compare(Before, After):
+    """ Get the ratio (after / before) of each timing for matching sizes
+    """
+    Ratios = []
+    Previous = {Result['Size']: Result for Result in Before['Results']}
+    for Result in After['Results']:
+        Old = Previous.get(Result['Size'])
+        if Old is None:
+            continue
+        Ratio = {'Size': Result['Size']}
+        for Engine, Key in [('Serial', 'LatencyMedianMs'),
+                            ('Serial', 'CalculateLimitPerUnit'),
+                            ('Serial', 'WarmUpPassesPerUnit'),
+                            ('Fleet', 'TotalSeconds'),
+                            ('Fleet', 'BracketSeconds'),
+                            ('Fleet', 'PeakMemoryBytes')]:
+            try:
+                Ratio[Engine + Key] = Result[Engine][Key] / Old[Engine][Key]
+            except (KeyError, TypeError, ZeroDivisionError):
+                Ratio[Engine + Key] = None
+        Ratios.append(Ratio)
+    return Ratios
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES,
+                        help='Fleet sizes to benchmark')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Seed for the synthetic fleets')
+    parser.add_argument('--serial-sample', type=int, default=200,
+                        help='Number of units timed with single ratings')
+    parser.add_argument('--no-fleet', action='store_true',
+                        help='Skip the fleet engine')
+    parser.add_argument('--no-memory', action='store_true',
+                        help='Skip tracing the fleet engine memory')
+    parser.add_argument('--output', help='JSON file to write the results to')
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'),
+                        help='Compare two results files instead')
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        Files = []
+        for Path in args.compare:
+            with open(Path) as f:
+                Files.append(json.load(f))
+        json.dump(compare(*Files), sys.stdout, indent=2)
+        print()
+        return
+
+    def progress(Result):
+        print('{Size} units: {Serial[LatencyMedianMs]:.2f} ms per rating'.format(
+            **Result), file=sys.stderr)
+
+    Results = run_benchmarks(args.sizes, args.seed, args.serial_sample,
+                             not args.no_fleet, not args.no_memory, progress)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(Results, f, indent=2)
+    else:
+        json.dump(Results, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -5,5 +5,6 @@ __version__ = "2.1"
 __author__ = "aguinane"
 
 from ratetransformer.rate import Transformer
+from ratetransformer.fleet import rate_fleet
 
 
@@ -0,0 +1,229 @@
+""" Persistent cache of rating results
+
+Ratings are keyed by a hash of their inputs: the heat run data, thermal
+characteristics, limits, ambients, rating options and the load shape. The
+load shape is keyed as given rather than divided by its peak: the step search
+starts from (and rounds) scalings that depend on the magnitude of the load
+shape, so a profile at another magnitude can rate slightly differently.
+
+Results are held in an in-memory LRU tier and, optionally, an SQLite file
+that is limited in size. Both are stamped with MODEL_VERSION, so entries made
+by a different version of the thermal model are never returned.
+"""
+
+import collections
+import hashlib
+import json
+import sqlite3
+
+from ratetransformer.rate import Transformer
+from ratetransformer.rate import MODEL_VERSION
+from ratetransformer.rate import RATING_RESULTS
+
+
+class RatingCache:
+    """ A two tier cache of rating results
+    """
+
+    def __init__(self, Path=None, MaxEntries=1024, MaxBytes=64 * 1024 * 1024,
+                 Version=MODEL_VERSION):
+        """ Set up the cache
+
+            Path        SQLite file for the on-disk tier (or None for memory only)
+            MaxEntries  Number of results kept in the in-memory tier
+            MaxBytes    Size of the results kept in the on-disk tier
+            Version     Model version the results are valid for
+        """
+        self.MaxEntries = MaxEntries
+        self.MaxBytes = MaxBytes
+        self.Version = Version
+        self.Memory = collections.OrderedDict()
+
+        self.MemoryHits = 0
+        self.DiskHits = 0
+        self.Misses = 0
+
+        self.db = None
+        if Path is not None:
+            self.db = sqlite3.connect(Path)
+            self._open_disk()
+
+    @property
+    def Hits(self):
+        """ Number of lookups found in either tier
+        """
+        return self.MemoryHits + self.DiskHits
+
+    def stats(self):
+        """ Get the cache hit and miss counters
+        """
+        return {'Hits': self.Hits, 'MemoryHits': self.MemoryHits,
+                'DiskHits': self.DiskHits, 'Misses': self.Misses,
+                'MemoryEntries': len(self.Memory),
+                'DiskBytes': self.DiskBytes if self.db else 0}
+
+    def rate(self, HeatRunData, ThermalChar, AmbWHS=25.0, AmbAgeing=27.0,
+             LoadShape=[], Limits={}, **Options):
+        """ Get the rating results for a transformer, performing the rating
+        only if it is not already cached
+        Takes the same arguments as Transformer and perform_rating, and
+        returns a dict of the results
+        """
+        if len(LoadShape) == 0:
+            LoadShape = [1.0] * 48
+        LoadShape = list(LoadShape)  # Such as a numpy array
+
+        Key = rating_key(HeatRunData, ThermalChar, AmbWHS, AmbAgeing, LoadShape,
+                         Limits, Options, self.Version)
+        Results = self.get(Key)
+        if Results is None:
+            tx = Transformer(HeatRunData, ThermalChar)
+            tx.perform_rating(AmbWHS, AmbAgeing, LoadShape, Limits, **Options)
+            Results = {key: getattr(tx, key) for key in RATING_RESULTS}
+            self.put(Key, Results)
+        return dict(Results)
+
+    def get(self, Key):
+        """ Look up results by key, or None if not cached
+        """
+        Results = self.Memory.get(Key)
+        if Results is not None:
+            self.Memory.move_to_end(Key)
+            self.MemoryHits += 1
+            return Results
+
+        if self.db is not None:
+            row = self.db.execute('SELECT value FROM ratings WHERE key = ?',
+                                  (Key,)).fetchone()
+            if row is not None:
+                with self.db:
+                    self.db.execute('UPDATE ratings SET accessed = ? WHERE key = ?',
+                                    (self._next_access(), Key))
+                Results = json.loads(row[0])
+                self._put_memory(Key, Results)
+                self.DiskHits += 1
+                return Results
+
+        self.Misses += 1
+        return None
+
+    def put(self, Key, Results):
+        """ Store results in both tiers
+        """
+        self._put_memory(Key, Results)
+        if self.db is None:
+            return
+
+        Value = json.dumps(Results, sort_keys=True)
+        with self.db:
+            row = self.db.execute('SELECT size FROM ratings WHERE key = ?',
+                                  (Key,)).fetchone()
+            if row is not None:
+                self.DiskBytes -= row[0]
+            self.db.execute('INSERT OR REPLACE INTO ratings VALUES (?, ?, ?, ?)',
+                            (Key, Value, len(Value), self._next_access()))
+            self.DiskBytes += len(Value)
+            self._evict_disk()
+
+    def clear(self):
+        """ Remove all entries from both tiers
+        """
+        self.Memory.clear()
+        if self.db is not None:
+            with self.db:
+                self.db.execute('DELETE FROM ratings')
+            self.DiskBytes = 0
+
+    def close(self):
+        """ Close the on-disk tier
+        """
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _put_memory(self, Key, Results):
+        """ Store results in memory, dropping the least recently used
+        """
+        self.Memory[Key] = Results
+        self.Memory.move_to_end(Key)
+        while len(self.Memory) > self.MaxEntries:
+            self.Memory.popitem(last=False)
+
+    def _open_disk(self):
+        """ Create the tables, clearing entries from other model versions
+        """
+        with self.db:
+            self.db.execute('CREATE TABLE IF NOT EXISTS meta '
+                            '(name TEXT PRIMARY KEY, value TEXT)')
+            self.db.execute('CREATE TABLE IF NOT EXISTS ratings '
+                            '(key TEXT PRIMARY KEY, value TEXT, '
+                            'size INTEGER, accessed INTEGER)')
+            self.db.execute('CREATE INDEX IF NOT EXISTS ratings_accessed '
+                            'ON ratings (accessed)')
+            row = self.db.execute("SELECT value FROM meta WHERE name = 'version'"
+                                  ).fetchone()
+            if row is None or row[0] != str(self.Version):
+                self.db.execute('DELETE FROM ratings')
+                self.db.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)",
+                                (str(self.Version),))
+        self.DiskBytes, self.Accessed = self.db.execute(
+            'SELECT COALESCE(SUM(size), 0), COALESCE(MAX(accessed), 0) '
+            'FROM ratings').fetchone()
+
+    def _next_access(self):
+        """ Get the next access counter, for least recently used eviction
+        """
+        self.Accessed += 1
+        return self.Accessed
+
+    def _evict_disk(self):
+        """ Remove the least recently used entries until within MaxBytes
+        """
+        while self.DiskBytes > self.MaxBytes:
+            row = self.db.execute('SELECT key, size FROM ratings '
+                                  'ORDER BY accessed LIMIT 1').fetchone()
+            if row is None:
+                break
+            self.db.execute('DELETE FROM ratings WHERE key = ?', (row[0],))
+            self.DiskBytes -= row[1]
+
+
+def rating_key(HeatRunData, ThermalChar, AmbWHS, AmbAgeing, LoadShape,
+               Limits, Options={}, Version=MODEL_VERSION):
+    """ Get a canonical hash of the rating inputs
+    """
+    Inputs = {
+        'Version': Version,
+        'HeatRun': HeatRunData,
+        'Thermal': ThermalChar,
+        'AmbWHS': AmbWHS,
+        'AmbAgeing': AmbAgeing,
+        'LoadShape': list(LoadShape),
+        'Limits': Limits,
+        'Options': Options,
+    }
+    Canonical = json.dumps(_canonical(Inputs), sort_keys=True,
+                           separators=(',', ':'))
+    return hashlib.sha256(Canonical.encode('utf-8')).hexdigest()
+
+
+def _canonical(value):
+    """ Convert numbers to floats so that equal values hash the same
+    (e.g. 25 and 25.0, or numpy and python floats)
+    """
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, (str, bool)) or value is None:
+        return value
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return str(value)
@@ -0,0 +1,272 @@
+""" Bulk fleet input and output in columnar formats
+
+A fleet table has one row per unit, with a column for each heat run value
+(CoolingMode, RatedLoad, dTOr, gr, H, P, R), thermal characteristic (C, x,
+y, k11, k21, k22, TauW, n, mass_assembly, mass_tank, vol_oil), limit (MaxLoadPU,
+TopOil, HotSpot, LoL) and ambient (AmbWHS, AmbAgeing), as per the example
+files in the tests folder, and optionally a Name. Missing columns or values
+(empty or NaN) take the same defaults as Transformer. Tables are read from
+CSV, .npz (one array per column) or, if pyarrow is installed, Parquet.
+
+Load shapes (units x intervals, in MVA) are kept in a .npy file, which is
+memory mapped so only the units being rated are read. The model parameters
+are resolved from each row by the same rules as Transformer, without
+building a Transformer per unit, and units are rated in chunks with the
+results written out as each chunk finishes (as CSV or JSON lines), so the
+memory used does not grow with the size of the fleet.
+"""
+
+import csv
+import json
+import math
+import os
+
+import numpy as np
+
+from ratetransformer.rate import DEFAULT_LIMITS
+from ratetransformer.rate import ThermalParameters
+from ratetransformer.rate import determine_oil_thermal_time_constant
+from ratetransformer.rate import thermal_characteristics
+from ratetransformer.fleet import bracket_parameters
+from ratetransformer.fleet import parameter_arrays
+
+HEAT_RUN_COLUMNS = ('CoolingMode', 'RatedLoad', 'dTOr', 'gr', 'H', 'P', 'R')
+THERMAL_COLUMNS = ('C', 'x', 'y', 'k11', 'k21', 'k22', 'TauW', 'n',
+                   'mass_assembly', 'mass_tank', 'vol_oil')
+
+# Columns read as text
+TEXT_COLUMNS = ('Name', 'CoolingMode')
+
+# Results written for each unit
+RESULT_COLUMNS = ('Name', 'MaxLoad', 'MaxTOTemp', 'MaxWHSTemp', 'Ageing',
+                  'CRF', 'RatingReason')
+
+
+def read_columns(Path):
+    """ Read a fleet table from a .csv, .npz or .parquet file
+    Returns a dict of column arrays
+    """
+    Extension = os.path.splitext(Path)[1].lower()
+    if Extension == '.csv':
+        with open(Path, newline='') as f:
+            Rows = list(csv.reader(f))
+        Header, Rows = Rows[0], Rows[1:]
+        return {key: _column([Row[i] for Row in Rows], key in TEXT_COLUMNS)
+                for i, key in enumerate(Header)}
+    elif Extension == '.npz':
+        with np.load(Path, allow_pickle=False) as Data:
+            return {key: Data[key] for key in Data.files}
+    elif Extension == '.parquet':
+        try:
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError('Reading Parquet files needs pyarrow to be installed')
+        Table = pyarrow.parquet.read_table(Path)
+        return {key: _column(Table.column(key).to_numpy(zero_copy_only=False),
+                             key in TEXT_COLUMNS)
+                for key in Table.column_names}
+    raise ValueError('Unknown fleet table format: {}'.format(Extension))
+
+
+def save_columns(Path, Columns):
+    """ Save a fleet table to a .csv, .npz or .parquet file
+    """
+    Columns = {key: np.asarray(value) for key, value in Columns.items()}
+    Extension = os.path.splitext(Path)[1].lower()
+    if Extension == '.csv':
+        with open(Path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(list(Columns))
+            writer.writerows(zip(*[_text(v) for v in Columns.values()]))
+    elif Extension == '.npz':
+        np.savez(Path, **Columns)
+    elif Extension == '.parquet':
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError('Writing Parquet files needs pyarrow to be installed')
+        pyarrow.parquet.write_table(pyarrow.table(Columns), Path)
+    else:
+        raise ValueError('Unknown fleet table format: {}'.format(Extension))
+
+
+def load_shapes(Path, mmap=True):
+    """ Load the load shapes (units x intervals, in MVA) from a .npy file,
+    memory mapping the file unless mmap is False
+    """
+    return np.load(Path, mmap_mode='r' if mmap else None)
+
+
+def unit_columns(Units):
+    """ Convert a list of unit dicts (as per the example files) into a fleet
+    table and an array of load shapes
+    Returns (Columns, LoadShapes)
+    """
+    Units = list(Units)
+    Columns = {}
+    for Group, Keys in [('HeatRun', HEAT_RUN_COLUMNS),
+                        ('Thermal', THERMAL_COLUMNS),
+                        ('Limits', tuple(DEFAULT_LIMITS))]:
+        for key in Keys:
+            Values = [Unit.get(Group, {}).get(key) for Unit in Units]
+            if any(v is not None for v in Values):
+                Columns[key] = _column(['' if v is None else v for v in Values],
+                                       key in TEXT_COLUMNS)
+    for key, default in [('AmbWHS', 25.0), ('AmbAgeing', 27.0)]:
+        Columns[key] = np.array([Unit.get(key, default) for Unit in Units],
+                                dtype=float)
+    LoadShapes = np.array([Unit.get('LoadShape') or [1.0] * 48
+                           for Unit in Units], dtype=float)
+    return Columns, LoadShapes
+
+
+def column_parameters(Columns):
+    """ Resolve a fleet table into arrays of model parameters, applying the
+    same defaults as Transformer (through rate.thermal_characteristics)
+    without building one per unit
+    Returns a dict of arrays as per fleet.fleet_parameters
+    """
+    for key in ('RatedLoad', 'dTOr', 'gr', 'R', 'P'):
+        if np.isnan(column_values(Columns, key)).any():
+            raise ValueError('Heat run column {} has missing values'.format(key))
+    Modes = np.asarray(Columns['CoolingMode']).astype(str).tolist()
+    RatedLoad, dTOr, gr, R, P = [column_values(Columns, key).tolist()
+                                 for key in ('RatedLoad', 'dTOr', 'gr', 'R', 'P')]
+    H = column_values(Columns, 'H', 1.3).tolist()
+    Thermal = {key: column_values(Columns, key).tolist()
+               for key in THERMAL_COLUMNS if key in Columns}
+
+    Records = []
+    for i, Mode in enumerate(Modes):
+        ThermalChar = {key: Values[i] for key, Values in Thermal.items()
+                       if not math.isnan(Values[i])}
+        x, y, C, k11, k21, k22, TauW, n = thermal_characteristics(Mode, ThermalChar)
+        TauR = determine_oil_thermal_time_constant(Mode, C, P[i], dTOr[i])
+        Records.append(ThermalParameters.build(
+            RatedLoad[i], dTOr[i], gr[i], R[i], H[i], x, y, k11, k21, k22,
+            TauW, TauR, n))
+    return parameter_arrays(Records)
+
+
+def column_limits(Columns):
+    """ Get the limits of each unit, with defaults for missing values
+    """
+    return {key: column_values(Columns, key, float(default))
+            for key, default in DEFAULT_LIMITS.items()}
+
+
+def rate_columns(Columns, LoadShapes, Output, ChunkSize=4096,
+                 Tolerance=0.000001, t=30.0, Progress=None):
+    """ Rate a fleet table, writing the results as each chunk finishes
+
+        Columns     Fleet table (dict of column arrays), or a path to read
+        LoadShapes  Load shapes (units x intervals, in MVA), or a path to
+                    a .npy file to memory map
+        Output      Path of a .csv or .jsonl file, or a ResultWriter
+        ChunkSize   Number of units rated at a time
+        Tolerance   Tolerance on the ratings, relative to the load limit
+        Progress    Called with (NumDone, NumUnits) as each chunk completes
+
+    Ratings are solved as per Transformer.perform_rating with
+    Search='brent'. Returns the number of units rated.
+    """
+    if isinstance(Columns, str):
+        Columns = read_columns(Columns)
+    if isinstance(LoadShapes, str):
+        LoadShapes = load_shapes(LoadShapes)
+    Params = column_parameters(Columns)
+    Limits = column_limits(Columns)
+    N = len(Params['RatedLoad'])
+    if len(LoadShapes) != N:
+        raise ValueError('The fleet table has {} units but there are {} load shapes'.format(
+            N, len(LoadShapes)))
+    Ambients = (column_values(Columns, 'AmbWHS', 25.0),
+                column_values(Columns, 'AmbAgeing', 27.0))
+    Names = Columns.get('Name', np.arange(N))
+
+    Writer = Output if isinstance(Output, ResultWriter) else ResultWriter(Output)
+    try:
+        for Start in range(0, N, ChunkSize):
+            idx = slice(Start, min(Start + ChunkSize, N))
+            Results = bracket_parameters(
+                {k: v[idx] for k, v in Params.items()}, LoadShapes[idx],
+                (Ambients[0][idx], Ambients[1][idx]),
+                {k: v[idx] for k, v in Limits.items()}, t,
+                Tolerance=Tolerance)
+            Results['Name'] = Names[idx]
+            Writer.write(Results)
+            if Progress is not None:
+                Progress(idx.stop, N)
+    finally:
+        if Writer is not Output:
+            Writer.close()
+    return N
+
+
+def column_values(Columns, key, default=np.nan):
+    """ Get a numeric column, with defaults (a value or an array) for
+    missing values
+    """
+    N = len(Columns['CoolingMode'])
+    Values = np.asarray(Columns.get(key, np.full(N, np.nan)), dtype=float)
+    return np.where(np.isnan(Values), default, Values)
+
+
+class ResultWriter:
+    """ Write rating results incrementally as CSV or JSON lines
+    """
+
+    def __init__(self, Path, Columns=RESULT_COLUMNS):
+        """ Open the output file, with the format from its extension
+        (.csv or .jsonl)
+        """
+        self.Format = os.path.splitext(Path)[1].lower()
+        if self.Format not in ('.csv', '.jsonl'):
+            raise ValueError('Unknown results format: {}'.format(self.Format))
+        self.Columns = Columns
+        self.NumRows = 0
+        self.file = open(Path, 'w', newline='')
+        if self.Format == '.csv':
+            self.writer = csv.writer(self.file)
+            self.writer.writerow(Columns)
+
+    def write(self, Results):
+        """ Write a chunk of results (a dict of arrays, as per rate_fleet)
+        """
+        Rows = zip(*[_text(Results[key]) for key in self.Columns])
+        if self.Format == '.csv':
+            for Row in Rows:
+                self.writer.writerow(Row)
+                self.NumRows += 1
+        else:
+            for Row in Rows:
+                self.file.write(json.dumps(dict(zip(self.Columns, Row))) + '\n')
+                self.NumRows += 1
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def _column(Values, Text=False):
+    """ Convert column values into a float array, or a string array if they
+    are text or not numbers (empty values are NaN)
+    """
+    if Text:
+        return np.array([str(v) for v in Values])
+    try:
+        return np.array([np.nan if v == '' else float(v) for v in Values])
+    except (TypeError, ValueError):
+        return np.array([str(v) for v in Values])
+
+
+def _text(Values):
+    """ Convert column values into python values for writing
+    """
+    return [v.item() if isinstance(v, np.generic) else v for v in Values]
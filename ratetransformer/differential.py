@@ -0,0 +1,276 @@
+""" Differential testing of the rating engines against the reference model
+
+Randomised but physically valid units (transformers, load shapes, ambients
+and limits, from synthetic_fleet) are rated by the reference engine and by
+each alternative engine, and the results compared unit by unit. The
+reference is Transformer.perform_rating with the step-and-halve search,
+repeating the load cycle to steady state in plain Python, so by default the
+engines are only compared with each other.
+
+The 'baseline' engine instead looks up the ratings made by the original
+model (commit b762f63) of the default units, synthetic_fleet(200, Seed=0,
+Intervals=48, RandomLimits=True), checked in as baseline.json. Using it as
+the reference shows how far every engine has moved from the original
+ratings. The reference engine matches it exactly except for OFAF units,
+whose recommended characteristics are now those of OF cooling in AS60076.7
+Table 5 (the original model matched cooling modes by substring, so OFAF got
+the ODAF characteristics), which moves their ratings by as much as 7%.
+
+An engine is a function taking a list of unit dicts (as per the example
+files in the tests folder) and returning a dict of result arrays with the
+same names as the attributes set by perform_rating. For each result the
+report gives the maximum and percentiles of the deviations from the
+reference (relative for MaxLoad, otherwise absolute) and for RatingReason
+the fraction of units that differ, along with the time each engine took.
+An engine passes if every maximum deviation is within its tolerance.
+
+Run from the repository root, for example:
+
+    python -m ratetransformer.differential --units 500 --engines brent fleet
+    python -m ratetransformer.differential --reference baseline
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+from ratetransformer.rate import Transformer
+from ratetransformer.rate import DEFAULT_LIMITS
+from ratetransformer import kernels
+from ratetransformer.cache import rating_key
+from ratetransformer.fleet import bracket_parameters
+from ratetransformer.fleet import rate_parameters
+from ratetransformer.fleet import transformer_parameters
+from ratetransformer.synthetic import synthetic_fleet
+
+# Results compared, with those compared relative to the reference value
+FIELDS = ('MaxLoad', 'MaxTOTemp', 'MaxWHSTemp', 'Ageing', 'CRF')
+RELATIVE = ('MaxLoad',)
+
+# Ratings of the default units by the original model
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+# Largest deviation allowed for each result (pu of the reference MaxLoad, °C
+# for temperatures, hours for Ageing and pu of the rated load for CRF), and
+# the fraction of units allowed a different RatingReason (for ratings on a
+# limit boundary)
+DEFAULT_TOLERANCES = {
+    'MaxLoad': 0.001,
+    'MaxTOTemp': 0.1,
+    'MaxWHSTemp': 0.1,
+    'Ageing': 0.1,
+    'CRF': 0.001,
+    'RatingReason': 0.01,
+}
+
+
+def scalar_engine(Backend=None, **Options):
+    """ An engine rating each unit with Transformer.perform_rating
+
+        Backend     Name of the kernel backend, or None for the default
+        Options     Passed on to perform_rating
+    """
+    def engine(Units):
+        Results = {key: [] for key in FIELDS + ('RatingReason',)}
+        for Unit in Units:
+            tx = Transformer(Unit['HeatRun'], Unit['Thermal'])
+            tx.Backend = kernels.get_backend(Backend)
+            tx.perform_rating(Unit['AmbWHS'], Unit['AmbAgeing'],
+                              Unit['LoadShape'], Unit['Limits'], **Options)
+            for key in Results:
+                Results[key].append(getattr(tx, key))
+        return {key: np.array(Values, dtype=object if key == 'RatingReason' else float)
+                for key, Values in Results.items()}
+    return engine
+
+
+def fleet_engine(Search='step', **Options):
+    """ An engine rating all the units together with the fleet engine,
+    by its step search (rate_parameters) or bracketed search
+    (bracket_parameters)
+
+        Options     Passed on to the fleet engine
+    """
+    def engine(Units):
+        Params = transformer_parameters(
+            [Transformer(Unit['HeatRun'], Unit['Thermal']) for Unit in Units])
+        LoadShapes = [Unit['LoadShape'] for Unit in Units]
+        Ambients = ([Unit['AmbWHS'] for Unit in Units],
+                    [Unit['AmbAgeing'] for Unit in Units])
+        Limits = {key: np.array([Unit['Limits'].get(key, default) for Unit in Units],
+                                dtype=float)
+                  for key, default in DEFAULT_LIMITS.items()}
+        if Search == 'step':
+            return rate_parameters(Params, LoadShapes, Ambients, Limits, **Options)
+        elif Search == 'brent':
+            return bracket_parameters(Params, LoadShapes, Ambients, Limits, **Options)
+        raise ValueError('Unknown search: {}'.format(Search))
+    return engine
+
+
+def baseline_engine(Path=BASELINE_FILE):
+    """ An engine looking up the ratings made by the original model, from
+    a file written for the default units
+    """
+    def engine(Units):
+        with open(Path) as f:
+            Baseline = json.load(f)
+        Results = {key: [] for key in FIELDS + ('RatingReason',)}
+        for i, Unit in enumerate(Units):
+            Key = rating_key(Unit['HeatRun'], Unit['Thermal'], Unit['AmbWHS'],
+                             Unit['AmbAgeing'], Unit['LoadShape'], Unit['Limits'],
+                             Version=Baseline['Commit'])
+            if Key not in Baseline['Results']:
+                raise ValueError('No baseline rating for unit {}, only for '
+                                 'synthetic_fleet(**{})'.format(i, Baseline['Fleet']))
+            for key in Results:
+                Results[key].append(Baseline['Results'][Key][key])
+        return {key: np.array(Values, dtype=object if key == 'RatingReason' else float)
+                for key, Values in Results.items()}
+    return engine
+
+
+ENGINES = {
+    'reference': scalar_engine('python', Search='step', SteadyState='iterate'),
+    'step': scalar_engine(Search='step'),
+    'brent': scalar_engine(Search='brent'),
+    'fleet': fleet_engine('step'),
+    'fleet_brent': fleet_engine('brent'),
+    'baseline': baseline_engine(),
+}
+if 'numba' in kernels.BACKENDS:
+    ENGINES['numba'] = scalar_engine('numba', Search='step', SteadyState='iterate')
+
+
+def compare(Reference, Results, Tolerances=DEFAULT_TOLERANCES,
+            Percentiles=(50, 95, 99)):
+    """ Compare the results of an engine with those of the reference
+
+    Returns a dict of the deviations of each result (Max and percentiles,
+    such as P95), the RatingReason mismatch rate (ReasonMismatch), the
+    results that are not within their tolerance (Failures) and whether
+    all of them are (Passed)
+    """
+    Report = {}
+    Failures = []
+    for key in FIELDS:
+        Expected = np.asarray(Reference[key], dtype=float)
+        Deviation = np.abs(np.asarray(Results[key], dtype=float) - Expected)
+        if key in RELATIVE:
+            Deviation = np.where(Expected != 0, Deviation / np.abs(Expected),
+                                 Deviation)
+        Stats = {'Max': float(Deviation.max())}
+        for q in Percentiles:
+            Stats['P{:g}'.format(q)] = float(np.percentile(Deviation, q))
+        Stats['Worst'] = int(Deviation.argmax())  # Index of the worst unit
+        Report[key] = Stats
+        if key in Tolerances and Stats['Max'] > Tolerances[key]:
+            Failures.append(key)
+    Mismatch = np.asarray(Reference['RatingReason']) != np.asarray(Results['RatingReason'])
+    Report['ReasonMismatch'] = float(Mismatch.mean())
+    Report['ReasonMismatchUnits'] = [int(i) for i in np.flatnonzero(Mismatch)]
+    if Report['ReasonMismatch'] > Tolerances.get('RatingReason', 0.0):
+        Failures.append('RatingReason')
+    Report['Failures'] = Failures
+    Report['Passed'] = not Failures
+    return Report
+
+
+def run_engine(Engine, Units):
+    """ Rate units with an engine (or the name of one in ENGINES)
+    Returns the results and the time taken [s]
+    """
+    if isinstance(Engine, str):
+        Engine = ENGINES[Engine]
+    Start = time.perf_counter()
+    Results = Engine(Units)
+    return Results, time.perf_counter() - Start
+
+
+def differential_test(Engines=None, NumUnits=200, Seed=0, Intervals=48,
+                      Reference='reference', Tolerances=DEFAULT_TOLERANCES,
+                      Percentiles=(50, 95, 99), Units=None):
+    """ Compare engines against the reference on randomised units
+
+        Engines     Names of engines in ENGINES, or a dict of engine
+                    functions (all but the reference and the baseline by
+                    default)
+        NumUnits    Number of units to generate
+        Seed        Seed for the synthetic fleet
+        Intervals   Number of load values in each daily load shape
+        Reference   The reference engine, or its name in ENGINES
+        Tolerances  Largest deviation allowed for each result, overriding
+                    those in DEFAULT_TOLERANCES
+        Percentiles Percentiles of the deviations to report
+        Units       Units to rate, rather than generating them
+
+    Returns a dict with a report from compare for each engine (Engines),
+    the Seconds each engine took and its Speedup over the reference, and
+    whether every engine Passed
+    """
+    if Units is None:
+        Units = synthetic_fleet(NumUnits, Seed, Intervals, RandomLimits=True)
+    if Engines is None:
+        Engines = [Name for Name in ENGINES if Name not in (Reference, 'baseline')]
+    if not isinstance(Engines, dict):
+        Engines = {Name: ENGINES[Name] for Name in Engines}
+    Tolerances = dict(DEFAULT_TOLERANCES, **Tolerances)
+
+    Expected, ReferenceSeconds = run_engine(Reference, Units)
+    Reports = {}
+    for Name, Engine in Engines.items():
+        Results, Seconds = run_engine(Engine, Units)
+        Report = compare(Expected, Results, Tolerances, Percentiles)
+        Report['Seconds'] = Seconds
+        Report['Speedup'] = ReferenceSeconds / Seconds if Seconds > 0 else None
+        Reports[Name] = Report
+    return {
+        'NumUnits': len(Units),
+        'Seed': Seed,
+        'ReferenceSeconds': ReferenceSeconds,
+        'Tolerances': Tolerances,
+        'Engines': Reports,
+        'Passed': all(Report['Passed'] for Report in Reports.values()),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--units', type=int, default=200,
+                        help='Number of randomised units')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Seed for the randomised units')
+    parser.add_argument('--engines', nargs='+', choices=sorted(ENGINES),
+                        help='Engines to compare with the reference')
+    parser.add_argument('--reference', default='reference', choices=sorted(ENGINES),
+                        help="Engine to compare against ('baseline' for the "
+                             "original model's ratings)")
+    parser.add_argument('--tolerance', nargs=2, action='append', default=[],
+                        metavar=('RESULT', 'VALUE'),
+                        help='Override the tolerance on a result')
+    parser.add_argument('--output', help='JSON file to write the report to')
+    args = parser.parse_args(argv)
+
+    Tolerances = {key: float(value) for key, value in args.tolerance}
+    Report = differential_test(args.engines, args.units, args.seed,
+                               Reference=args.reference, Tolerances=Tolerances)
+    for Name, Result in Report['Engines'].items():
+        print('{}: {} ({:.3f} s, {:.1f}x), max MaxLoad deviation {:.2e}, '
+              'reason mismatch {:.2%}'.format(
+                  Name, 'passed' if Result['Passed'] else
+                  'failed on ' + ', '.join(Result['Failures']),
+                  Result['Seconds'], Result['Speedup'] or 0.0,
+                  Result['MaxLoad']['Max'], Result['ReasonMismatch']),
+              file=sys.stderr)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(Report, f, indent=2)
+    return 0 if Report['Passed'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
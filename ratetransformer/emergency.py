@@ -0,0 +1,294 @@
+""" Short time emergency ratings from a known thermal state
+
+Under a constant load the AS60076.7 top oil and winding rises follow closed
+form exponential responses from their starting values (as per
+inst_top_oil_rise_at_load and Eq. (5) and (6) for the winding), so the
+temperatures at any time can be evaluated directly rather than stepped.
+
+The top oil temperature only moves towards its ultimate value, so the time
+it reaches its limit follows in closed form. The hot spot temperature is a
+constant plus a sum of at most three decaying exponentials (the top oil,
+and the winding, which overshoots on a load increase), so it turns at most
+twice. The turns are bracketed analytically and solved for, and the first
+stretch between them in which the hot spot reaches its limit brackets the
+crossing, which is solved for by the Illinois method. The loss of life only
+grows, so it brackets its own crossing, and it is integrated with
+Gauss-Legendre quadrature over a grid of times (closer together early on,
+where the winding response changes quickly).
+
+All candidate loads are evaluated together as arrays.
+"""
+
+import numpy as np
+
+from ratetransformer.rate import DEFAULT_LIMITS
+from ratetransformer.rate import LIMIT_NAMES
+
+# Gauss-Legendre nodes and weights on [0, 1], for integrating the ageing rate
+_NODES, _WEIGHTS = np.polynomial.legendre.leggauss(5)
+_NODES, _WEIGHTS = (_NODES + 1) / 2, _WEIGHTS / 2
+
+
+def time_to_limit(tx, Loads, Ambient=25.0, State=(0.0, 0.0), Load=0.0,
+                  Limits={}, Horizon=1440.0, Tolerance=0.001):
+    """ Find how long each of a batch of constant loads can be carried
+    before a limit is reached
+
+        tx          The Transformer
+        Loads       Candidate loads (in MVA)
+        Ambient     Ambient temperature [°C]
+        State       Starting (top oil rise, winding rise) [°C], such as
+                    the TOrise and WHSrise of a ThermalTracker
+        Load        Load before the candidate load is applied (in MVA), to
+                    choose between the increasing and decreasing winding
+                    response
+        Limits      Current and temperature limits, with LoL the loss of
+                    life allowed over the emergency [h]
+        Horizon     Longest time to look ahead [min]
+        Tolerance   Tolerance on the times [min]
+
+    Returns a dict of the time to each limit ('TO', 'WHS', 'Age') and the
+    first of these ('Time'), in minutes and inf if not reached within the
+    Horizon, and the limit reached first ('Limit', None if none is). Loads
+    above the load limit ('CRF') are reported as reaching it at time zero.
+    """
+    Loads = np.atleast_1d(np.asarray(Loads, dtype=float))
+    Limits = dict(DEFAULT_LIMITS, **Limits)
+    Times = quadrature_grid(Horizon)
+    Response = ThermalResponse(tx, Loads, Ambient, State, Load)
+
+    Results = {}
+    Results['TO'] = Response.top_oil_time(Limits['TopOil'], Horizon)
+    # The hot spot only rises or only falls between its turns
+    Turns = np.vstack([np.zeros((1, len(Loads))),
+                       Response.hot_spot_turns(Horizon, Tolerance),
+                       np.full((1, len(Loads)), Horizon)])
+    Turns.sort(axis=0)
+    WHStemp = Response.temperatures(Turns, np.arange(len(Loads)))[1]
+    Results['WHS'] = first_crossing(
+        lambda i, t: Response.temperatures(t, i)[1] - Limits['HotSpot'],
+        Turns, WHStemp - Limits['HotSpot'], Tolerance)
+
+    # Loss of life at each grid time, and from there within the interval
+    Steps = Response.loss_of_life(Times[:-1, None], np.diff(Times)[:, None])
+    LoL = np.vstack([np.zeros((1, len(Loads))), np.cumsum(Steps, axis=0)])
+
+    def ageing(i, t):
+        Start = np.clip(np.searchsorted(Times, t, side='right') - 1,
+                        0, len(Times) - 2)
+        return (LoL[Start, i] + Response.loss_of_life(Times[Start], t - Times[Start], i)
+                - Limits['LoL'])
+    Results['Age'] = first_crossing(ageing, np.broadcast_to(Times[:, None], LoL.shape),
+                                    LoL - Limits['LoL'], Tolerance)
+
+    Overload = Loads / tx.RatedLoad >= Limits['MaxLoadPU']
+    Table = np.array([np.where(Overload, 0.0, np.inf)] +
+                     [Results[Name] for Name in LIMIT_NAMES[1:]])
+    First = Table.argmin(axis=0)
+    Results['Time'] = Table.min(axis=0)
+    Results['Limit'] = np.array([LIMIT_NAMES[i] if np.isfinite(Time) else None
+                                 for i, Time in zip(First, Results['Time'])],
+                                dtype=object)
+    return Results
+
+
+def emergency_rating(tx, Durations, Ambient=25.0, State=(0.0, 0.0), Load=0.0,
+                     Limits={}, Tolerance=0.000001):
+    """ Find the highest constant load that can be carried for each of a
+    batch of durations without reaching a limit
+
+        Durations   How long the load is needed for [min]
+        Tolerance   Tolerance on the loads, relative to the load limit
+
+    The other inputs are as per time_to_limit. Returns a dict of the
+    highest load for each duration ('MaxLoad', in MVA) and the limit
+    reached by more load ('RatingReason')
+    """
+    Durations = np.atleast_1d(np.asarray(Durations, dtype=float))
+    Limits = dict(DEFAULT_LIMITS, **Limits)
+    Upper = np.full(len(Durations), Limits['MaxLoadPU'] * tx.RatedLoad)
+    Lower = np.zeros(len(Durations))
+    Reason = np.full(len(Durations), 'CRF', dtype=object)
+
+    def carried(Candidates):
+        Results = time_to_limit(tx, Candidates, Ambient, State, Load, Limits,
+                                Horizon=Durations.max())
+        return Results['Time'] >= Durations, Results['Limit']
+
+    # Just below the load limit, as reaching it is a breach
+    Top = Upper * (1 - Tolerance / 2)
+    OK, Limit = carried(Top)
+    Lower[OK] = Top[OK]
+    Active = ~OK
+    xtol = Tolerance * Upper
+    while Active.any():
+        Candidates = (Lower + Upper) / 2
+        OK, Limit = carried(Candidates)
+        Lower = np.where(Active & OK, Candidates, Lower)
+        Upper = np.where(Active & ~OK, Candidates, Upper)
+        Breach = Active & ~OK
+        Reason[Breach] = Limit[Breach]
+        Active &= Upper - Lower > xtol
+    return {
+        'MaxLoad': np.array([round(v, 3) for v in Lower]),
+        'RatingReason': Reason,
+    }
+
+
+class ThermalResponse:
+    """ Temperatures of a transformer under constant loads, in closed form
+    """
+
+    def __init__(self, tx, Loads, Ambient, State, Load):
+        Thermal = self.Thermal = tx.Thermal
+        self.Ambient = Ambient
+        self.TOinitial, self.WHSinitial = State
+        self.dTOult, self.dWHS = Thermal.ultimate_rises(Loads)
+        self.Increasing = Loads > Load
+
+        # Oil time constant adjusted for the considered load (IEEE C57.91)
+        a = self.dTOult / Thermal.dTOr
+        b = self.TOinitial / Thermal.dTOr
+        with np.errstate(divide='ignore', invalid='ignore'):
+            k11Tau = Thermal.k11TauR * (a - b) / (a ** Thermal.InvN - b ** Thermal.InvN)
+        Adjusted = (a != b) & (Thermal.n != 0) & np.isfinite(k11Tau)
+        self.k11Tau = np.where(Adjusted, k11Tau, Thermal.k11TauR)
+
+        # Hot spot rise as the ultimate rises plus a sum of Coefficients *
+        # exp(-t / TimeConstants) (rows of top oil, then the winding terms)
+        Gap = self.dWHS - self.WHSinitial
+        Ones = np.ones(len(Loads))
+        self.TimeConstants = np.array([
+            self.k11Tau,
+            np.where(self.Increasing, Thermal.k22TauW, Thermal.TauW),
+            Thermal.TauRk22 * Ones])
+        self.Coefficients = np.array([
+            self.TOinitial - self.dTOult,
+            np.where(self.Increasing, -Thermal.k21 * Gap, -Gap),
+            np.where(self.Increasing, (Thermal.k21 - 1) * Gap, 0.0)])
+
+    def temperatures(self, t, idx=slice(None)):
+        """ Top oil and hot spot temperatures after t minutes, for the
+        loads idx (t is a column of times, or one time per load)
+        """
+        Thermal = self.Thermal
+        t = np.asarray(t, dtype=float)
+        if t.ndim == 1 and isinstance(idx, slice):
+            t = t[:, None]
+        TOrise = self.dTOult[idx] + (self.TOinitial - self.dTOult[idx]) * \
+            np.exp(-t / self.k11Tau[idx])
+        # As per AS60076.7 Eq. (5) and (6)
+        f2 = (Thermal.k21 * (1 - np.exp(-t / Thermal.k22TauW)) -
+              (Thermal.k21 - 1) * (1 - np.exp(-t / Thermal.TauRk22)))
+        fW = np.exp(-t / Thermal.TauW)
+        dWHS = self.dWHS[idx]
+        WHSrise = np.where(self.Increasing[idx],
+                           self.WHSinitial + (dWHS - self.WHSinitial) * f2,
+                           dWHS + (self.WHSinitial - dWHS) * fW)
+        TOtemp = self.Ambient + TOrise
+        return TOtemp, TOtemp + WHSrise
+
+    def top_oil_time(self, Limit, Horizon):
+        """ Time the top oil temperature of each load reaches Limit [min],
+        inf if not within the Horizon
+        """
+        Rise = Limit - self.Ambient
+        with np.errstate(divide='ignore', invalid='ignore'):
+            Time = self.k11Tau * np.log((self.TOinitial - self.dTOult) /
+                                        (Rise - self.dTOult))
+        Reached = (self.dTOult > Rise) & (Time <= Horizon)
+        return np.where(self.Ambient + self.TOinitial >= Limit, 0.0,
+                        np.where(Reached, Time, np.inf))
+
+    def hot_spot_turns(self, Horizon, Tolerance):
+        """ Times at which the hot spot temperature of each load turns
+        (two rows, Horizon where it does not turn within the Horizon)
+        The slope is a sum of three exponentials. Taking out the top oil's
+        decay leaves a sum whose slope has at most one zero, at Split, so
+        the slope has at most one zero either side of Split.
+        """
+        Rates = 1 / self.TimeConstants
+        Slopes = -self.Coefficients * Rates
+
+        def slope(i, t):
+            return (Slopes[:, i] * np.exp(-Rates[:, i] * t)).sum(axis=0)
+
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            Split = (np.log(-(Slopes[2] * (Rates[2] - Rates[0])) /
+                            (Slopes[1] * (Rates[1] - Rates[0]))) /
+                     (Rates[2] - Rates[1]))
+        Split = np.where((Split > 0) & (Split < Horizon), Split, Horizon)
+
+        Turns = np.full((2, len(Split)), float(Horizon))
+        for Row, (a, b) in enumerate([(np.zeros(len(Split)), Split),
+                                      (Split, np.full(len(Split), float(Horizon)))]):
+            fa, fb = slope(slice(None), a), slope(slice(None), b)
+            idx = np.flatnonzero(fa * fb < 0)
+            Turns[Row, idx] = illinois(slope, idx, a[idx], b[idx], fa[idx], fb[idx],
+                                       Tolerance)
+        return Turns
+
+    def loss_of_life(self, Start, Duration, idx=slice(None)):
+        """ Loss of life [h] from Start over Duration minutes
+        """
+        Total = 0.0
+        for Node, Weight in zip(_NODES, _WEIGHTS):
+            WHStemp = self.temperatures(Start + Node * Duration, idx)[1]
+            with np.errstate(over='ignore'):
+                V = np.minimum(2 ** ((WHStemp - 98.0) / 6), 10000000.0)
+            Total = Total + Weight * V
+        return Total * Duration / 60
+
+
+def quadrature_grid(Horizon):
+    """ Times to integrate the ageing rate between [min], closer together
+    early on where the winding response changes quickly
+    """
+    Early = np.arange(0.0, min(Horizon, 120.0), 0.5)
+    Late = np.arange(min(Horizon, 120.0), Horizon, 2.0)
+    return np.concatenate([Early, Late, [Horizon]])
+
+
+def first_crossing(f, Times, Values, Tolerance):
+    """ Find the first time each column of Values (f at each of Times, with
+    one column of times per column of values, between which f only rises or
+    only falls) reaches zero, solving within the interval it is first
+    reached in
+    f(idx, t) evaluates f for the columns idx at one time each
+    Returns the times, inf where zero is not reached
+    """
+    Columns = np.arange(Values.shape[1])
+    Reached = Values >= 0
+    Found = Reached.any(axis=0)
+    First = Reached.argmax(axis=0)
+    Result = np.where(Found, Times[First, Columns], np.inf)
+
+    idx = np.flatnonzero(Found & (First > 0))
+    Result[idx] = illinois(f, idx, Times[First[idx] - 1, idx], Times[First[idx], idx],
+                           Values[First[idx] - 1, idx], Values[First[idx], idx],
+                           Tolerance)
+    return Result
+
+
+def illinois(f, idx, a, b, fa, fb, Tolerance, MaxIterations=100):
+    """ Solve f(idx, t) = 0 for the columns idx by the Illinois method,
+    with fa < 0 <= fb or fa > 0 >= fb at the ends a and b of the brackets
+    Returns the end of each bracket where the sign of fb is kept
+    """
+    Side = np.zeros(len(idx), dtype=int)
+    for i in range(MaxIterations):
+        Active = np.abs(b - a) > Tolerance
+        if not Active.any():
+            break
+        x = np.where(Active, b - fb * (b - a) / (fb - fa), b)
+        x = np.where(Active & ((x - a) * (x - b) >= 0), (a + b) / 2, x)
+        fx = f(idx, x)
+        AtB = Active & ((fx >= 0) == (fb >= 0))
+        AtA = Active & ~AtB
+        b, fb = np.where(AtB, x, b), np.where(AtB, fx, fb)
+        a, fa = np.where(AtA, x, a), np.where(AtA, fx, fa)
+        # Halve the value at an end kept twice in a row (Illinois)
+        fa = np.where(AtB & (Side == 1), fa / 2, fa)
+        fb = np.where(AtA & (Side == -1), fb / 2, fb)
+        Side = np.where(AtB, 1, np.where(AtA, -1, Side))
+    return b
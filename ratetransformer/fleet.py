@@ -0,0 +1,546 @@
+""" Vectorised cyclic rating of a fleet of transformers
+
+The fleet engine holds the parameters of many transformers as arrays and
+advances every unit's top oil and winding temperatures together, one array
+operation per time step. It follows the same AS60076.7 equations as
+Transformer.perform_rating and its step-and-halve search (Search='step'),
+so MaxLoad, MaxTOTemp, MaxWHSTemp, Ageing and CRF agree with the scalar path
+to within 0.1% and RatingReason is the same (except for units whose rating
+sits exactly on a limit boundary). bracket_parameters instead solves for
+every unit's rating together, as per Search='brent'.
+"""
+
+import math
+
+import numpy as np
+
+from ratetransformer.rate import Transformer
+from ratetransformer.rate import ThermalParameters
+from ratetransformer.rate import DEFAULT_LIMITS
+
+# Resolved model parameters held for each unit in the fleet
+PARAMETERS = ThermalParameters._fields[:13]
+
+# Rating reasons, indexed by the codes returned from limits_reached
+REASONS = ('Did not converge', 'CRF', 'TO', 'WHS', 'Age')
+
+
+def rate_fleet(HeatRunArray, ThermalArray=None, LoadShapes=None,
+               Ambients=(25.0, 27.0), Limits={}, t=30.0, SteadyState='iterate'):
+    """ Perform ratings on a fleet of transformers at once
+
+        HeatRunArray    Heat run data as a dict of columns or list of dicts
+        ThermalArray    Thermal characteristics as a dict of columns or
+                        list of dicts (missing or NaN values use defaults)
+        LoadShapes      The cyclic load curves (units x intervals, in MVA)
+        Ambients        Tuple of (AmbWHS, AmbAgeing) as scalars or arrays
+        Limits          Current and temperature limits as scalars or arrays
+        t               Time Interval (min)
+        SteadyState     'iterate' or 'solve', as per perform_rating
+
+    Returns a dict of result arrays with the same names as the attributes
+    set by Transformer.perform_rating
+    """
+    Params = fleet_parameters(HeatRunArray, ThermalArray)
+    return rate_parameters(Params, LoadShapes, Ambients, Limits, t,
+                           SteadyState)
+
+
+def rate_transformers(Transformers, LoadShapes=None, Ambients=(25.0, 27.0),
+                      Limits={}, t=30.0, SteadyState='iterate'):
+    """ Perform ratings on a list of existing Transformer objects at once
+    """
+    Params = transformer_parameters(Transformers)
+    return rate_parameters(Params, LoadShapes, Ambients, Limits, t,
+                           SteadyState)
+
+
+def rate_parameters(Params, LoadShapes=None, Ambients=(25.0, 27.0),
+                    Limits={}, t=30.0, SteadyState='iterate'):
+    """ Perform ratings for resolved fleet parameter arrays
+    """
+    N = len(Params['RatedLoad'])
+    RatedLoad = Params['RatedLoad']
+    if LoadShapes is None:
+        LoadShapes = np.ones((N, 48))
+    LoadShapes = np.broadcast_to(np.asarray(LoadShapes, dtype=float),
+                                 (N, np.shape(LoadShapes)[-1]))
+    AmbWHS = np.broadcast_to(np.asarray(Ambients[0], dtype=float), (N,))
+    AmbAgeing = np.broadcast_to(np.asarray(Ambients[1], dtype=float), (N,))
+    LimitArrays = limit_arrays(Limits, N)
+
+    # Calculate the starting scaling as per perform_rating
+    MaxLoad = LoadShapes.max(axis=1)
+    IncrementFactor = RatedLoad / MaxLoad
+    ScaleFactor = np.maximum(IncrementFactor * 0.5, 0.2)
+    IncrementFactor = np.maximum(IncrementFactor, 0.5)
+
+    NumIter = np.zeros(N, dtype=int)
+    Rounds = np.zeros(N, dtype=int)
+    PrevPeak = np.full(N, 0.0001)
+    Reason = np.zeros(N, dtype=int)
+    Stepping = np.ones(N, dtype=bool)
+    Active = np.ones(N, dtype=bool)
+    Results = np.zeros((4, N))
+
+    # Each pass evaluates every unit still searching at its own scale factor
+    maxIterations = 150
+    while Active.any():
+        idx = np.flatnonzero(Active)
+        Values = simulate_days(
+            subset(Params, idx), LoadShapes[idx] * ScaleFactor[idx, None],
+            AmbWHS[idx], AmbAgeing[idx], t, SteadyState)
+        Breach = limits_reached(RatedLoad[idx], subset(LimitArrays, idx),
+                                *Values)
+        Limit = Breach > 0
+        Reason[idx[Limit]] = Breach[Limit]
+
+        # Units in the stepping loop increase until the limit is reached
+        WasStepping = Stepping[idx]
+        step = idx[WasStepping]
+        NumIter[step] += 1
+        ScaleFactor[step] += IncrementFactor[step]
+        breached = step[Limit[WasStepping]]
+        Stepping[breached] = False
+        ScaleFactor[breached] = np.maximum(
+            ScaleFactor[breached] - 2 * IncrementFactor[breached], 0)
+
+        # Units that stepped back record the rating and halve the increment
+        back = ~WasStepping
+        done = idx[back]
+        Limit = Limit[back]
+        Max_Load = Values[0][back]
+        IncrementFactor[done] /= 2
+        Results[:, done] = [v[back] for v in Values]
+        Rounds[done] += 1
+        converged = ((IncrementFactor[done] < 0.00001) &
+                     ((PrevPeak[done] == Max_Load) |
+                      (ScaleFactor[done] + IncrementFactor[done] ==
+                       ScaleFactor[done])))
+        PrevPeak[done] = Max_Load
+        finished = converged | (Rounds[done] >= maxIterations)
+        Active[done[finished]] = False
+        done = done[~finished]
+        Limit = Limit[~finished]
+
+        # Continue stepping from the last safe scaling
+        # The repeated evaluation at the same scaling is skipped
+        resume = done[~Limit]
+        Stepping[resume] = True
+        NumIter[resume] += 1
+        ScaleFactor[resume] += IncrementFactor[resume]
+        retry = done[Limit]
+        ScaleFactor[retry] = np.maximum(
+            ScaleFactor[retry] - 2 * IncrementFactor[retry], 0)
+
+    # Round values to appropriate significant figures
+    MaxLoad = np.array([round(v, 3) for v in Results[0]])
+    return {
+        'MaxLoad': MaxLoad,
+        'MaxTOTemp': np.array([round(v, 2) for v in Results[1]]),
+        'MaxWHSTemp': np.array([round(v, 2) for v in Results[2]]),
+        'Ageing': np.array([round(v, 3) for v in Results[3]]),
+        'CRF': np.array([round(m / r, 4) for m, r in zip(MaxLoad, RatedLoad)]),
+        'RatingReason': np.array([REASONS[r] for r in Reason], dtype=object),
+        'NumIterations': NumIter,
+    }
+
+
+def bracket_parameters(Params, LoadShapes=None, Ambients=(25.0, 27.0),
+                       Limits={}, t=30.0, SteadyState='iterate',
+                       Tolerance=0.000001, Guess=None, MaxIterations=50):
+    """ Perform ratings for resolved fleet parameter arrays by solving for
+    the scale factor where each unit's smallest limit margin reaches zero,
+    as per Transformer.bracket_search
+    Each unit is bracketed between no load and the load limit, which is
+    always reached, and the brackets are narrowed together by the Illinois
+    (modified false position) method until they are within the Tolerance
+    (relative to the load limit). This is quicker than the step search when
+    all that is needed is the rating and the limit that binds, as with many
+    samples of one unit.
+    Guess = Expected scale factor of each unit, to start from a bracket 5%
+    either side of it rather than from no load and the load limit
+    Returns a dict of result arrays as per rate_parameters, at the highest
+    scaling found within the limits, that (unrounded) ScaleFactor and the
+    BracketWidth (MVA) above it
+    """
+    N = len(Params['RatedLoad'])
+    RatedLoad = Params['RatedLoad']
+    if LoadShapes is None:
+        LoadShapes = np.ones((N, 48))
+    LoadShapes = np.broadcast_to(np.asarray(LoadShapes, dtype=float),
+                                 (N, np.shape(LoadShapes)[-1]))
+    AmbWHS = np.broadcast_to(np.asarray(Ambients[0], dtype=float), (N,))
+    AmbAgeing = np.broadcast_to(np.asarray(Ambients[1], dtype=float), (N,))
+    LimitArrays = limit_arrays(Limits, N)
+    MaxLoad = LoadShapes.max(axis=1)
+
+    def margin(idx, ScaleFactor):
+        """ Smallest limit margin of each unit, the limit reached and the
+        simulated values
+        """
+        Values = simulate_days(subset(Params, idx),
+                               LoadShapes[idx] * ScaleFactor[:, None],
+                               AmbWHS[idx], AmbAgeing[idx], t, SteadyState)
+        Limits = subset(LimitArrays, idx)
+        Breach = limits_reached(RatedLoad[idx], Limits, *Values)
+        Margins = limit_margins(RatedLoad[idx], Limits, *Values)
+        Margins[0] *= 100  # Load margin in % rather than pu, like the °C
+        Margin = Margins.min(axis=0)
+        Margin = np.where(Breach > 0, np.minimum(Margin, -1e-12),
+                          np.maximum(Margin, 1e-12))
+        return Margin, Breach, np.array(Values)
+
+    # Bracket between no load and the load limit, which is always reached
+    Lower = np.zeros(N)
+    Upper = LimitArrays['MaxLoadPU'] * RatedLoad / MaxLoad
+    fLower = np.full(N, np.nan)
+    fUpper = np.full(N, np.nan)
+    Reason = np.full(N, REASONS.index('CRF'))
+    NumIter = np.zeros(N, dtype=int)
+    Results = np.zeros((4, N))  # Simulated values at the lower end
+
+    def narrow(Points):
+        """ Evaluate lists of (units, scalings) in one pass and narrow
+        the brackets of those units, in order
+        """
+        idx = np.concatenate([i for i, x in Points])
+        if len(idx) == 0:
+            return
+        fx, Breach, Values = margin(idx, np.concatenate([x for i, x in Points]))
+        Start = 0
+        for i, x in Points:
+            f, b = fx[Start:Start + len(i)], Breach[Start:Start + len(i)]
+            v = Values[:, Start:Start + len(i)]
+            Start += len(i)
+            hi = (b > 0) & (x <= Upper[i]) & (x >= Lower[i])
+            lo = (b == 0) & (x >= Lower[i]) & (x <= Upper[i])
+            Upper[i[hi]], fUpper[i[hi]], Reason[i[hi]] = x[hi], f[hi], b[hi]
+            Lower[i[lo]], fLower[i[lo]] = x[lo], f[lo]
+            Results[:, i[lo]] = v[:, lo]
+            NumIter[i] += 1
+
+    if Guess is not None:
+        Guess = np.minimum(np.asarray(Guess, dtype=float), Upper)
+        units = np.arange(N)
+        narrow([(units, Guess * 0.95), (units, np.minimum(Guess * 1.05, Upper))])
+    # Evaluate the ends that are still needed
+    low = np.flatnonzero(np.isnan(fLower))
+    high = np.flatnonzero(np.isnan(fUpper))
+    narrow([(low, Lower[low]), (high, Upper[high])])
+    Breach = np.where(np.isnan(fLower), Reason, 0)  # Reached with no load
+
+    Side = np.zeros(N, dtype=int)  # Bracket end kept on the last iteration
+    Width = np.full(N, np.inf)  # Bracket width two iterations ago
+    Previous = np.full(N, np.inf)  # Bracket width before the last iteration
+    xtol = Tolerance * Upper
+    Active = (Breach == 0) & (Upper - Lower > xtol)
+    for i in range(MaxIterations):
+        idx = np.flatnonzero(Active)
+        if len(idx) == 0:
+            break
+        a, b, fa, fb = Lower[idx], Upper[idx], fLower[idx], fUpper[idx]
+        x = b - fb * (b - a) / (fb - fa)
+        # Aim just past the root, to close in from the end that is not moving
+        x = x - Side[idx] * xtol[idx] / 2
+        # Bisect where the last two steps did not halve the bracket
+        x = np.where(b - a > Width[idx] / 2, (a + b) / 2, x)
+        Width[idx] = Previous[idx]
+        Previous[idx] = b - a
+        # Keep away from the ends, so the bracket always narrows
+        x = np.clip(x, a + xtol[idx] / 4, b - xtol[idx] / 4)
+        fx, Breach, Values = margin(idx, x)
+        NumIter[idx] += 1
+
+        breach = Breach > 0
+        hi, lo = idx[breach], idx[~breach]
+        Upper[hi], fUpper[hi], Reason[hi] = x[breach], fx[breach], Breach[breach]
+        Lower[lo], fLower[lo] = x[~breach], fx[~breach]
+        Results[:, lo] = Values[:, ~breach]
+        # Halve the value at an end kept twice in a row (Illinois)
+        fLower[hi[Side[hi] == 1]] /= 2
+        fUpper[lo[Side[lo] == -1]] /= 2
+        Side[hi] = 1
+        Side[lo] = -1
+        Active[idx] = Upper[idx] - Lower[idx] > xtol[idx]
+
+    Width = (Upper - Lower) * MaxLoad
+    MaxLoad = np.array([round(v, 3) for v in Lower * MaxLoad])
+    return {
+        'MaxLoad': MaxLoad,
+        'MaxTOTemp': np.array([round(v, 2) for v in Results[1]]),
+        'MaxWHSTemp': np.array([round(v, 2) for v in Results[2]]),
+        'Ageing': np.array([round(v, 3) for v in Results[3]]),
+        'CRF': np.array([round(m / r, 4) for m, r in zip(MaxLoad, RatedLoad)]),
+        'RatingReason': np.array([REASONS[r] for r in Reason], dtype=object),
+        'NumIterations': NumIter,
+        'ScaleFactor': Lower,
+        'BracketWidth': Width,
+    }
+
+
+def simulate_days(Params, Loads, AmbWHS, AmbAgeing, t=30.0,
+                  SteadyState='iterate', Tolerance=0.000001):
+    """ Simulate the cyclic load curve of every unit in steady state
+    Loads = Load curves (units x intervals, in MVA)
+    SteadyState = 'iterate' to repeat the cycle until the temperatures
+    repeat, or 'solve' to solve for the cyclic starting temperatures
+    Returns arrays of Max_Load, Max_TOtemp, Max_WHStemp and LoL
+    """
+    col = {k: v[:, None] for k, v in Params.items()}
+
+    # Values that do not depend on the starting temperatures
+    K = Loads / col['RatedLoad']
+    dTOult = col['dTOr'] * (((K ** 2) * col['R'] + 1) /
+                            (col['R'] + 1)) ** col['x']
+    dWHS = col['H'] * col['gr'] * (K ** col['y'])
+    Increasing = Loads > np.roll(Loads, 1, axis=1)
+
+    if SteadyState == 'solve':
+        TOrise, WHSrise, Converged = solve_cycles(
+            Params, dTOult, dWHS, Increasing, t, Tolerance)
+        idx = np.flatnonzero(~Converged)
+        if len(idx):
+            # Fall back to repeating the cycle where not converged
+            TOrise[idx], WHSrise[idx] = iterate_cycles(
+                subset(Params, idx), dTOult[idx], dWHS[idx], Increasing[idx], t)
+    elif SteadyState == 'iterate':
+        TOrise, WHSrise = iterate_cycles(Params, dTOult, dWHS, Increasing, t)
+    else:
+        raise ValueError('Unknown steady state method: {}'.format(SteadyState))
+
+    AmbWHS = np.asarray(AmbWHS)[:, None]
+    AmbAgeing = np.asarray(AmbAgeing)[:, None]
+    Max_TOtemp = (AmbWHS + TOrise).max(axis=1)
+    Max_WHStemp = (AmbWHS + TOrise + WHSrise).max(axis=1)
+    V = relative_ageing_rate(AmbAgeing + TOrise + WHSrise)
+    LoL = (V * t).sum(axis=1) / 60
+    return Loads.max(axis=1), Max_TOtemp, Max_WHStemp, LoL
+
+
+def iterate_cycles(Params, dTOult, dWHS, Increasing, t, MaxPasses=25):
+    """ Repeat the cycle from zero initial temperatures until the starting
+    and ending top oil temperatures are the same
+    Returns top oil and winding rise arrays (units x intervals)
+    """
+    N, T = dTOult.shape
+    TOrise = np.zeros((N, T))
+    WHSrise = np.zeros((N, T))
+    TOinitial = np.zeros(N)
+    WHSinitial = np.zeros(N)
+    idx = np.arange(N)
+    for i in range(MaxPasses):
+        TO, WHS = simulate_pass(subset(Params, idx), dTOult[idx], dWHS[idx],
+                                Increasing[idx], TOinitial[idx],
+                                WHSinitial[idx], t)
+        TOrise[idx] = TO
+        WHSrise[idx] = WHS
+
+        # Units where the cycle has converged keep this pass
+        changed = TOinitial[idx] != TO[:, -1]
+        idx = idx[changed]
+        if len(idx) == 0:
+            break
+        TOinitial[idx] = TO[changed, -1]
+        WHSinitial[idx] = WHS[changed, -1]
+    return TOrise, WHSrise
+
+
+def solve_cycles(Params, dTOult, dWHS, Increasing, t, Tolerance=0.000001,
+                 MaxPasses=10):
+    """ Solve for the starting rises where each unit's cycle ends at the
+    same temperatures it started from, using secant steps as per
+    Transformer.solve_steady_state
+    Returns top oil and winding rise arrays (units x intervals), and
+    whether each unit converged within MaxPasses
+    """
+    N, T = dTOult.shape
+    TOrise = np.zeros((N, T))
+    WHSrise = np.zeros((N, T))
+    Converged = np.zeros(N, dtype=bool)
+    Start = np.zeros((2, N))
+    PrevStart = np.zeros((2, N))
+    PrevResidual = np.zeros((2, N))
+    idx = np.arange(N)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for i in range(MaxPasses):
+            TO, WHS = simulate_pass(subset(Params, idx), dTOult[idx],
+                                    dWHS[idx], Increasing[idx],
+                                    Start[0, idx], Start[1, idx], t)
+            TOrise[idx] = TO
+            WHSrise[idx] = WHS
+            End = np.array([TO[:, -1], WHS[:, -1]])
+            Residual = End - Start[:, idx]
+            conv = (np.abs(Residual) <= Tolerance).all(axis=0)
+            Converged[idx[conv]] = True
+
+            # Secant step on each rise, or take the ending rise if unavailable
+            NextStart = End
+            if i > 0:
+                Slope = Residual - PrevResidual[:, idx]
+                x = Start[:, idx] - Residual * (
+                    Start[:, idx] - PrevStart[:, idx]) / Slope
+                NextStart = np.where((Slope != 0) & (x >= 0), x, End)
+            PrevStart[:, idx] = Start[:, idx]
+            PrevResidual[:, idx] = Residual
+            Start[:, idx] = NextStart
+            idx = idx[~conv]
+            if len(idx) == 0:
+                break
+    return TOrise, WHSrise, Converged
+
+
+def simulate_pass(Params, dTOult, dWHS, Increasing, TOinitial, WHSinitial, t):
+    """ Simulate one pass of the load curves from the starting temperatures
+    Returns top oil and winding rise arrays (units x intervals)
+    """
+    N, T = dTOult.shape
+    dTOr = Params['dTOr']
+    TauR = Params['TauR']
+    n = Params['n']
+    inv_n = 1 / np.where(n == 0, 1.0, n)
+    k11 = Params['k11']
+
+    # Winding factors only depend on the time interval
+    k21, k22, TauW = Params['k21'], Params['k22'], Params['TauW']
+    f2 = (k21 * (1 - np.exp((-t) / (k22 * TauW))) -
+          (k21 - 1) * (1 - np.exp((-t) / (TauR / k22))))
+    fW = np.exp((-t) / TauW)
+
+    TOrise = np.empty((N, T))
+    WHSrise = np.empty((N, T))
+    dTOi = TOinitial
+    dWHSi = WHSinitial
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for j in range(T):
+            # Top oil time constant as considered load
+            a = dTOult[:, j] / dTOr
+            b = dTOi / dTOr
+            Tau = TauR * (a - b) / ((a ** inv_n) - (b ** inv_n))
+            Tau = np.where(((a - b) == 0) | (n == 0) | ~np.isfinite(Tau),
+                           TauR, Tau)
+            dTOi = dTOult[:, j] + (dTOi - dTOult[:, j]) * np.exp((-t) / (k11 * Tau))
+
+            # Winding rise as per AS60076.7 Eq. (5) and Eq. (6)
+            dWHSi = np.where(Increasing[:, j],
+                             dWHSi + (dWHS[:, j] - dWHSi) * f2,
+                             dWHS[:, j] + (dWHSi - dWHS[:, j]) * fW)
+
+            TOrise[:, j] = dTOi
+            WHSrise[:, j] = dWHSi
+    return TOrise, WHSrise
+
+
+def limits_reached(RatedLoad, Limits, Max_Load, Max_TOtemp, Max_WHStemp, LoL):
+    """ Determine which limit (if any) was reached for each unit
+    Returns the index into REASONS, or 0 where no limit was reached
+    """
+    LoadPu = Max_Load / RatedLoad
+    return np.select(
+        [LoadPu >= Limits['MaxLoadPU'], Max_TOtemp >= Limits['TopOil'],
+         Max_WHStemp >= Limits['HotSpot'], LoL >= Limits['LoL']],
+        [1, 2, 3, 4], default=0)
+
+
+def limit_margins(RatedLoad, Limits, Max_Load, Max_TOtemp, Max_WHStemp, LoL):
+    """ Get the margin to each limit (CRF, TO, WHS, Age) for each unit, as
+    per Transformer.limit_margins
+    Returns an array of margins (limits x units)
+    """
+    LoadPu = Max_Load / RatedLoad
+    with np.errstate(divide='ignore'):
+        AgeMargin = np.where(
+            Limits['LoL'] <= 0, -1.0,
+            6 * np.log2(np.maximum(Limits['LoL'], 1e-300) /
+                        np.maximum(LoL, 1e-300)))
+    return np.array([Limits['MaxLoadPU'] - LoadPu,
+                     Limits['TopOil'] - Max_TOtemp,
+                     Limits['HotSpot'] - Max_WHStemp,
+                     AgeMargin])
+
+
+def relative_ageing_rate(WHST):
+    """ Calculate the relative ageing rate for an array of Winding Hotspot
+    Temperatures As per AS60076.7 Eq. (2)
+    """
+    with np.errstate(over='ignore'):
+        V = 2 ** ((WHST - 98.0) / 6)
+    return np.where(np.isfinite(V), V, 10000000.0)
+
+
+def limit_arrays(Limits, N):
+    """ Get the limits for each unit, with defaults as per AS60076.7 Table 4
+    """
+    Arrays = {}
+    for key, default in DEFAULT_LIMITS.items():
+        value = Limits.get(key, default)
+        Arrays[key] = np.broadcast_to(np.asarray(value, dtype=float), (N,))
+    return Arrays
+
+
+def fleet_parameters(HeatRunArray, ThermalArray=None):
+    """ Resolve fleet heat run data and thermal characteristics into arrays
+    of model parameters, applying the same defaults as Transformer
+    """
+    HeatRuns = _rows(HeatRunArray)
+    if ThermalArray is None:
+        Thermals = [{} for HeatRun in HeatRuns]
+    else:
+        Thermals = _rows(ThermalArray)
+    if len(Thermals) != len(HeatRuns):
+        raise ValueError('HeatRunArray and ThermalArray lengths differ')
+    return transformer_parameters(
+        [Transformer(h, c) for h, c in zip(HeatRuns, Thermals)])
+
+
+def transformer_parameters(Transformers):
+    """ Collect the compiled thermal parameters of Transformer objects
+    """
+    return parameter_arrays([tx.Thermal for tx in Transformers])
+
+
+def parameter_arrays(Records):
+    """ Stack ThermalParameters records into arrays of model parameters
+    """
+    Table = np.array(Records, dtype=float)
+    Table = Table.reshape(len(Records), len(ThermalParameters._fields))
+    return {key: Table[:, i].copy() for i, key in enumerate(PARAMETERS)}
+
+
+def subset(Arrays, idx):
+    """ Select the given units from a dict of arrays
+    """
+    return {k: v[idx] for k, v in Arrays.items()}
+
+
+def _rows(Data):
+    """ Convert a dict of columns into a list of dicts (one per unit),
+    dropping missing values so that defaults get applied
+    """
+    if isinstance(Data, dict):
+        keys = list(Data)
+        N = len(Data[keys[0]]) if keys else 0
+        Data = [{k: Data[k][i] for k in keys} for i in range(N)]
+    Rows = []
+    for row in Data:
+        Rows.append({k: _value(v) for k, v in row.items() if not _missing(v)})
+    return Rows
+
+
+def _value(value):
+    """ Convert numpy scalars to python values
+    """
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _missing(value):
+    """ Check whether a column value is missing
+    """
+    if value is None:
+        return True
+    try:
+        return math.isnan(value)
+    except TypeError:
+        return False
@@ -0,0 +1,363 @@
+""" Backends for the load cycle kernel of the scalar rating
+
+The kernel simulates one pass of the load cycle and returns what the limits
+are checked against: the maximum top oil and hot spot temperatures and the
+loss of life, along with the ending rises. It is written as plain scalar
+arithmetic so the same source runs as Python or is compiled by Numba.
+
+The blocks kernel simulates high resolution load shapes without stepping
+every interval. The winding rise follows the load within minutes, and is
+linear in its ultimate rise, so its cyclic values scale with the load shape
+as ScaleFactor ** y and are found once per rating, at a scaling of one. The
+top oil rise follows the load over hours, so the load shape is split into
+blocks over which the top oil stays within Compress / 2 (°C) of its path at
+the mean load of the block (to first order, at the load limit), and each
+block is evaluated in closed form in chunks over which the top oil changes
+by no more than MaxChange (4 Compress from the scalar rating). The maximum
+temperatures are then within Compress of the fixed step ones (in practice
+slightly above them), and the loss of life within a factor of
+2 ** (Compress / 6).
+
+The 'numba' backend is used when Numba is installed, and the 'python'
+backend otherwise. Numba is only imported (and the kernels compiled, or
+loaded from its cache on disk) the first time the 'numba' backend is used,
+so importing the package stays quick. The compiled kernels are only
+recompiled on the first use after installing or changing this module.
+"""
+
+import functools
+import importlib.util
+import math
+import threading
+from collections import namedtuple
+
+# A kernel backend: prepare converts the cycle steps (as returned by
+# ThermalParameters.cycle_steps) into the form taken by cycle, and split
+# splits a load shape into the blocks taken by blocks
+Backend = namedtuple('Backend', ['Name', 'prepare', 'cycle', 'split', 'blocks'])
+
+
+def cycle_kernel(dTOults, dWHSs, Increasing, t, TOinitial, WHSinitial,
+                 AmbWHS, AmbAgeing, dTOr, k11TauR, n, InvN, f2, fW):
+    """ Simulate one pass of the load cycle from the starting rises
+    As per Transformer.simulate_cycle
+    Returns the maximum top oil and hot spot temperatures, the loss of life
+    (min) and the ending top oil and winding rises
+    """
+    MaxTOtemp = -math.inf
+    MaxWHStemp = -math.inf
+    L = 0.0
+    TOprev = TOinitial
+    WHSprev = WHSinitial
+    for dTOult, dWHS, LoadIncreasing in zip(dTOults, dWHSs, Increasing):
+        # Oil time constant adjusted for the considered load
+        k11Tau = k11TauR
+        a = dTOult / dTOr
+        b = TOprev / dTOr
+        if (a - b) != 0 and n != 0:
+            Denominator = (a**InvN) - (b**InvN)
+            if Denominator != 0:
+                k11Tau = k11TauR * (a - b) / Denominator
+        TOrise = dTOult + (TOprev - dTOult) * math.exp((-t) / k11Tau)
+
+        if LoadIncreasing:
+            WHSrise = WHSprev + (dWHS - WHSprev) * f2
+        else:
+            WHSrise = dWHS + (WHSprev - dWHS) * fW
+
+        MaxTOtemp = max(MaxTOtemp, AmbWHS + TOrise)
+        MaxWHStemp = max(MaxWHStemp, AmbWHS + TOrise + WHSrise)
+
+        # Relative ageing rate, capped where 2 ** x would overflow
+        Exponent = (AmbAgeing + TOrise + WHSrise - 98.0) / 6
+        if Exponent >= 1024:
+            L += 10000000.0 * t
+        else:
+            L += (2 ** Exponent) * t
+
+        TOprev = TOrise
+        WHSprev = WHSrise
+    return MaxTOtemp, MaxWHStemp, L, TOprev, WHSprev
+
+
+def split_kernel(Loads, Ultimates, Windings, Sums, SumSquares, SumProducts,
+                 Starts, Counts, LoadsSq, LoadsVar, Excursions, WindingMax,
+                 RatedLoad, t,
+                 ScaleLimit, dTOr, R, x, y, Hgr, k11TauR, n, f2, fW, Compress):
+    """ Split a cyclic load shape into blocks for blocks_kernel
+    Fills the ultimate top oil rise of each interval at ScaleLimit
+    (Ultimates), the cyclic winding rise of each interval at a scaling of one
+    (Windings) and its running sums (Sums), sums of squares (SumSquares) and
+    sums of products with the interval number (SumProducts), and for each
+    block its first interval (Starts),
+    number of intervals (Counts), mean and variance of the squared load in pu
+    (LoadsSq and LoadsVar), weighted by their effect on the ending top oil
+    rise, bound on the top oil excursion from its path at the mean load at
+    ScaleLimit (Excursions) and largest winding rise (WindingMax)
+    Returns the number of blocks
+    """
+    N = len(Loads)
+
+    # Cyclic winding rises, which are linear in their starting value
+    Product = 1.0
+    WHSrise = 0.0
+    for Pass in range(2):
+        for i in range(N):
+            dWHS = Hgr * ((Loads[i] / RatedLoad) ** y)
+            if Loads[i] > Loads[i - 1]:
+                Retained = 1 - f2
+            else:
+                Retained = fW
+            WHSrise = dWHS + (WHSrise - dWHS) * Retained
+            if Pass == 0:
+                Product *= Retained
+            else:
+                K2 = ScaleLimit * ScaleLimit * (Loads[i] / RatedLoad) ** 2
+                Ultimates[i] = dTOr * ((K2 * R + 1) / (R + 1)) ** x
+                Windings[i] = WHSrise
+                Sums[i + 1] = Sums[i] + WHSrise
+                SumSquares[i + 1] = SumSquares[i] + WHSrise * WHSrise
+                SumProducts[i + 1] = SumProducts[i] + i * WHSrise
+        if Pass == 0 and Product < 1:
+            WHSrise = WHSrise / (1 - Product)
+
+    # Top oil retained each interval, with the oil time constant at its
+    # shortest (at rated load) for n below one
+    k11Tau = k11TauR
+    if 0 < n < 1:
+        k11Tau = k11TauR * n
+    Retained = math.exp((-t) / k11Tau)
+
+    # Grow each block while the top oil stays within Compress / 2 of its
+    # path at the weighted mean load, doubling then halving the length
+    NumBlocks = 0
+    Start = 0
+    while Start < N:
+        Good = 1
+        Bad = 0
+        Count = 1
+        GoodLoadSq = GoodLoadVar = GoodExcursion = 0.0
+        while True:
+            # Weights of the loads in the ending top oil rise
+            Weight = 1.0
+            Total = WeightedSq = WeightedFourth = WeightedUlt = 0.0
+            for i in range(Start + Count - 1, Start - 1, -1):
+                K2 = (Loads[i] / RatedLoad) ** 2
+                Total += Weight
+                WeightedSq += Weight * K2
+                WeightedFourth += Weight * K2 * K2
+                WeightedUlt += Weight * Ultimates[i]
+                Weight *= Retained
+            LoadSq = WeightedSq / Total
+            LoadVar = max(WeightedFourth / Total - LoadSq * LoadSq, 0.0)
+            MeanUlt = WeightedUlt / Total
+            Excursion = 0.0
+            Gap = 0.0
+            for i in range(Start, Start + Count):
+                Gap = Retained * Gap + (1 - Retained) * (Ultimates[i] - MeanUlt)
+                Excursion = max(Excursion, abs(Gap))
+            if Count == 1 or Excursion <= Compress / 2:
+                Good = Count
+                GoodLoadSq, GoodLoadVar, GoodExcursion = LoadSq, LoadVar, Excursion
+                if Count == N - Start or (Bad and Bad - Good <= 1):
+                    break
+                Count = min(2 * Count, N - Start) if not Bad else (Good + Bad) // 2
+            else:
+                Bad = Count
+                if Bad - Good <= 1:
+                    break
+                Count = (Good + Bad) // 2
+        Peak = Windings[Start]
+        for i in range(Start, Start + Good):
+            Peak = max(Peak, Windings[i])
+        Starts[NumBlocks] = Start
+        Counts[NumBlocks] = Good
+        LoadsSq[NumBlocks] = GoodLoadSq
+        LoadsVar[NumBlocks] = GoodLoadVar
+        Excursions[NumBlocks] = GoodExcursion
+        WindingMax[NumBlocks] = Peak
+        NumBlocks += 1
+        Start += Good
+    return NumBlocks
+
+
+def blocks_kernel(Windings, Sums, SumSquares, SumProducts, Starts, Counts,
+                  LoadsSq, LoadsVar, Excursions, WindingMax, ScaleFactor, t,
+                  TOinitial, AmbWHS, AmbAgeing, dTOr, R, x, y, k11TauR, n,
+                  InvN, MaxChange):
+    """ Simulate one pass of a load cycle split into blocks by split_kernel,
+    with the load shape scaled by ScaleFactor
+    The winding rises are the cyclic ones, so the starting winding rise is
+    not needed. The top oil rise of each block approaches the ultimate rise
+    at its mean load, in chunks over which it changes by no more than
+    MaxChange, and the maximum temperatures include the excursions from the
+    mean load.
+    Returns the same values as cycle_kernel, and the number of exponentials
+    evaluated
+    """
+    MaxTOtemp = -math.inf
+    MaxWHStemp = -math.inf
+    L = 0.0
+    NumExp = 0
+    TOprev = TOinitial
+    Scaled = ScaleFactor ** y  # Winding rises scale by this
+    Rate = math.log(2) / 6  # Ageing exponent per degree
+    # The top oil rise is driven by its ultimate rise to the power 1 / n
+    Root = n if n != 0 else 1.0
+    Power = x / Root
+    for Start, Count, LoadSq, LoadVar, Excursion, Peak in zip(
+            Starts, Counts, LoadsSq, LoadsVar, Excursions, WindingMax):
+        # Ultimate rise driving the top oil as the loads of the block do,
+        # with their spread to second order
+        Base = ScaleFactor * ScaleFactor * LoadSq * R + 1
+        Spread = (ScaleFactor * ScaleFactor * R) ** 2 * LoadVar / (Base * Base)
+        dTOult = dTOr * (Base / (R + 1)) ** x * (
+            1 + Power * (Power - 1) * Spread / 2) ** Root
+        Done = 0
+        while Done < Count:
+            k11Tau = k11TauR
+            a = dTOult / dTOr
+            b = TOprev / dTOr
+            if (a - b) != 0 and n != 0:
+                Denominator = (a**InvN) - (b**InvN)
+                if Denominator != 0:
+                    k11Tau = k11TauR * (a - b) / Denominator
+            # Intervals until the top oil could change by MaxChange, as
+            # 1 - exp(-x) <= x
+            Change = abs(dTOult - TOprev) * t / k11Tau
+            Chunk = Count - Done
+            if Change * Chunk > MaxChange:
+                Chunk = max(1, int(MaxChange / Change))
+            if Chunk > 1:
+                # Oil time constant at the rise halfway through the chunk
+                b = (dTOult + (TOprev - dTOult) *
+                     math.exp(-Chunk * t / (2 * k11Tau))) / dTOr
+                NumExp += 1
+                if (a - b) != 0 and n != 0:
+                    Denominator = (a**InvN) - (b**InvN)
+                    if Denominator != 0:
+                        k11Tau = k11TauR * (a - b) / Denominator
+            TOrise = dTOult + (TOprev - dTOult) * math.exp(-Chunk * t / k11Tau)
+            NumExp += 1
+
+            First = Start + Done
+            Done += Chunk
+            MaxTOtemp = max(MaxTOtemp, AmbWHS + max(TOprev, TOrise) + Excursion)
+            if AmbWHS + max(TOprev, TOrise) + Excursion + Scaled * Peak > MaxWHStemp:
+                # Step through the chunk for its hot spot temperature
+                Retained = 1.0
+                Gap = TOrise - dTOult
+                if Chunk > 1:
+                    Retained = math.exp((-t) / k11Tau)
+                    Gap = TOprev - dTOult
+                    NumExp += 1
+                for i in range(First, Start + Done):
+                    Gap *= Retained
+                    MaxWHStemp = max(MaxWHStemp, AmbWHS + dTOult + Gap + Excursion +
+                                     Scaled * Windings[i])
+
+            # Ageing rate at the mean rises, with the variance of its
+            # exponent to second order, taking the top oil as linear
+            Mean = (Sums[Start + Done] - Sums[First]) / Chunk
+            Variance = (SumSquares[Start + Done] - SumSquares[First]) / Chunk - Mean * Mean
+            Change = TOrise - TOprev
+            Covariance = ((SumProducts[Start + Done] - SumProducts[First]) / Chunk -
+                          (First + (Chunk - 1) / 2) * Mean) * Change / Chunk
+            Spread = (Change * Change * (Chunk * Chunk - 1) / (12 * Chunk * Chunk) +
+                      2 * Scaled * Covariance + Scaled * Scaled * Variance)
+            Exponent = (AmbAgeing + TOprev + Change * (Chunk + 1) / (2 * Chunk) +
+                        Scaled * Mean - 98.0) / 6
+            if Exponent >= 1024:
+                L += 10000000.0 * Chunk * t
+            else:
+                L += (2 ** Exponent) * Chunk * t * (1 + Rate * Rate * Spread / 2)
+            TOprev = TOrise
+    WHSend = Scaled * Windings[len(Windings) - 1]
+    return MaxTOtemp, MaxWHStemp, L, TOprev, WHSend, NumExp
+
+
+def python_prepare(Steps):
+    """ Split the cycle steps into lists for the Python kernel
+    """
+    return tuple(list(Column) for Column in zip(*Steps))
+
+
+def numba_prepare(Steps):
+    """ Split the cycle steps into arrays for the compiled kernel
+    """
+    import numpy as np
+    Columns = list(zip(*Steps))
+    return (np.array(Columns[0], dtype=np.float64),
+            np.array(Columns[1], dtype=np.float64),
+            np.array(Columns[2], dtype=np.bool_))
+
+
+def python_split(LoadShape, *Inputs):
+    """ Split a load shape into blocks with the Python kernel
+    Inputs are those of split_kernel after the output lists
+    Returns the inputs of blocks_kernel before ScaleFactor
+    """
+    N = len(LoadShape)
+    Intervals = [[0.0] * N for i in range(2)] + [[0.0] * (N + 1) for i in range(3)]
+    Blocks = [[0] * N, [0] * N] + [[0.0] * N for i in range(4)]
+    NumBlocks = split_kernel(list(LoadShape), *Intervals, *Blocks, *Inputs)
+    return tuple(Intervals[1:]) + tuple(Column[:NumBlocks] for Column in Blocks)
+
+
+def numba_split(Kernel, LoadShape, *Inputs):
+    """ Split a load shape into blocks with the compiled Kernel, as per
+    python_split
+    """
+    import numpy as np
+    N = len(LoadShape)
+    Intervals = ([np.zeros(N) for i in range(2)] +
+                 [np.zeros(N + 1) for i in range(3)])
+    Blocks = ([np.zeros(N, dtype=np.int64) for i in range(2)] +
+              [np.zeros(N) for i in range(4)])
+    NumBlocks = Kernel(np.asarray(LoadShape, dtype=np.float64), *Intervals,
+                       *Blocks, *Inputs)
+    return tuple(Intervals[1:]) + tuple(Column[:NumBlocks] for Column in Blocks)
+
+
+# Names of the backends that can be used
+if importlib.util.find_spec('numba') is not None:
+    BACKENDS = ('python', 'numba')
+else:
+    BACKENDS = ('python',)
+
+DEFAULT_BACKEND = 'numba' if 'numba' in BACKENDS else 'python'
+
+# Backends built so far, by name
+_loaded = {'python': Backend('python', python_prepare, cycle_kernel,
+                             python_split, blocks_kernel)}
+_lock = threading.Lock()
+
+
+def _numba_backend():
+    """ Import Numba and compile the kernels
+    """
+    try:
+        import numba
+    except ImportError:
+        raise ValueError('The numba backend needs Numba to be installed')
+    jit = numba.njit(cache=True, error_model='numpy')
+    return Backend('numba', numba_prepare, jit(cycle_kernel),
+                   functools.partial(numba_split, jit(split_kernel)),
+                   jit(blocks_kernel))
+
+
+def get_backend(Name=None):
+    """ Get a kernel backend by name, or the default backend if None
+    """
+    if Name is None:
+        Name = DEFAULT_BACKEND
+    try:
+        return _loaded[Name]
+    except KeyError:
+        pass
+    if Name == 'numba':
+        with _lock:
+            if Name not in _loaded:
+                _loaded[Name] = _numba_backend()
+        return _loaded[Name]
+    raise ValueError('Unknown kernel backend: {}'.format(Name))
@@ -0,0 +1,78 @@
+""" Rate many transformers across a pool of processes
+
+Each unit is described by a dict in the same layout as the example files in
+the tests folder (HeatRun, Thermal, AmbWHS, AmbAgeing, LoadShape, Limits).
+Units are sent to the worker processes in chunks, and every unit is rated by
+the same code as the serial path, so the results are identical.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import as_completed
+
+from ratetransformer.rate import Transformer
+from ratetransformer.rate import RATING_RESULTS
+
+
+def rate_many(Units, ChunkSize=16, MaxWorkers=None, Progress=None, **Options):
+    """ Perform ratings on many transformers in parallel
+
+        Units       Iterable of unit dicts (HeatRun, Thermal, AmbWHS,
+                    AmbAgeing, LoadShape, Limits)
+        ChunkSize   Number of units sent to a worker at a time
+        MaxWorkers  Number of worker processes (defaults to the number of
+                    CPUs), or 0 to rate the units serially in this process
+        Progress    Called with (NumDone, NumUnits) as each chunk completes
+        Options     Passed on to Transformer.perform_rating
+
+    Returns a list of result dicts in the same order as Units. A unit that
+    fails, or does not converge, has its reason in 'Error' instead of
+    stopping the rest of the batch.
+    """
+    Units = list(Units)
+    Chunks = [Units[i:i + ChunkSize] for i in range(0, len(Units), ChunkSize)]
+    Results = [None] * len(Chunks)
+    NumDone = 0
+
+    if MaxWorkers == 0:
+        for i, Chunk in enumerate(Chunks):
+            Results[i] = rate_chunk(Chunk, Options)
+            NumDone += len(Chunk)
+            if Progress is not None:
+                Progress(NumDone, len(Units))
+    else:
+        with ProcessPoolExecutor(max_workers=MaxWorkers) as executor:
+            futures = {executor.submit(rate_chunk, Chunk, Options): i
+                       for i, Chunk in enumerate(Chunks)}
+            for future in as_completed(futures):
+                i = futures[future]
+                Results[i] = future.result()
+                NumDone += len(Chunks[i])
+                if Progress is not None:
+                    Progress(NumDone, len(Units))
+
+    return [Result for Chunk in Results for Result in Chunk]
+
+
+def rate_chunk(Units, Options={}):
+    """ Rate a chunk of units, keeping any failure to the unit concerned
+    """
+    Results = []
+    for Unit in Units:
+        try:
+            Results.append(rate_unit(Unit, **Options))
+        except Exception as e:
+            Results.append({'Error': '{}: {}'.format(type(e).__name__, e)})
+    return Results
+
+
+def rate_unit(Unit, **Options):
+    """ Rate a single unit and return a dict of the results
+    """
+    tx = Transformer(Unit['HeatRun'], Unit.get('Thermal', {}))
+    tx.perform_rating(Unit.get('AmbWHS', 25.0), Unit.get('AmbAgeing', 27.0),
+                      Unit.get('LoadShape', []), Unit.get('Limits', {}),
+                      **Options)
+    Result = {key: getattr(tx, key) for key in RATING_RESULTS}
+    if tx.RatingReason == 'Did not converge':
+        Result['Error'] = tx.RatingReason
+    return Result
@@ -0,0 +1,132 @@
+""" Probabilistic rating over uncertain ambients and load shapes
+
+The ambients and load shape of a transformer are given as distributions.
+Samples are drawn from a seeded generator and rated together as a batch by
+the fleet engine, giving quantiles of the rating and the probability that
+each limit binds.
+
+A distribution is either a fixed value, or a function taking a numpy random
+Generator and a number of samples and returning the sampled values (one row
+per sample for load shapes), such as those made by normal, uniform,
+empirical, perturbed_shape and historical_shapes.
+"""
+
+import numpy as np
+
+from ratetransformer.rate import Transformer
+from ratetransformer.fleet import REASONS
+from ratetransformer.fleet import bracket_parameters
+from ratetransformer.fleet import transformer_parameters
+
+
+def probabilistic_rating(HeatRunData, ThermalChar, AmbWHS=25.0, AmbAgeing=27.0,
+                         LoadShape=[], Limits={}, NumSamples=10000, Seed=None,
+                         Quantiles=(50, 90, 99), BatchSize=10000,
+                         Tolerance=0.000001, t=30.0):
+    """ Rate a transformer over samples of its ambients and load shape
+
+        HeatRunData Heat run data, as per Transformer
+        ThermalChar Thermal characteristics, as per Transformer
+        AmbWHS      Distribution of the hottest month ambient [°C]
+        AmbAgeing   Distribution of the weighted ambient [°C]
+        LoadShape   Distribution of the cyclic load curve (in MVA)
+        Limits      Current and temperature limits
+        NumSamples  Number of samples to rate
+        Seed        Seed for the random generator
+        Quantiles   Exceedance levels to report (%). P90 is the rating that
+                    is reached or exceeded in 90% of the samples.
+        BatchSize   Number of samples rated at a time, to limit memory
+        Tolerance   Tolerance on the ratings, relative to the load limit
+
+    Returns a dict of the quantiles ('P50', ...), the Mean and StdDev of the
+    rating, the probability that each limit binds (LimitProbability) and
+    the sampled ratings (Samples)
+    """
+    rng = np.random.default_rng(Seed)
+    if not callable(LoadShape) and len(LoadShape) == 0:
+        LoadShape = [1.0] * 48
+    SampledWHS = sample(AmbWHS, rng, NumSamples)
+    SampledAgeing = sample(AmbAgeing, rng, NumSamples)
+    SampledShapes = sample(LoadShape, rng, NumSamples, Shape=True)
+
+    # Rate the average sample, to start each sample's search near its rating
+    tx = Transformer(HeatRunData, ThermalChar)
+    MeanShape = SampledShapes.mean(axis=0)
+    tx.perform_rating(float(SampledWHS.mean()), float(SampledAgeing.mean()),
+                      list(MeanShape), Limits)
+    Guess = tx.ScaleFactor * MeanShape.mean() / SampledShapes.mean(axis=1)
+
+    Params = transformer_parameters([tx])
+    MaxLoad = np.empty(NumSamples)
+    Reasons = np.empty(NumSamples, dtype=object)
+    for Start in range(0, NumSamples, BatchSize):
+        idx = slice(Start, min(Start + BatchSize, NumSamples))
+        N = idx.stop - idx.start
+        Results = bracket_parameters(
+            {k: np.repeat(v, N) for k, v in Params.items()},
+            SampledShapes[idx], (SampledWHS[idx], SampledAgeing[idx]),
+            Limits, t, Tolerance=Tolerance, Guess=Guess[idx])
+        MaxLoad[idx] = Results['MaxLoad']
+        Reasons[idx] = Results['RatingReason']
+
+    Summary = {'P{:g}'.format(q): round(float(np.percentile(MaxLoad, 100 - q)), 3)
+               for q in Quantiles}
+    Summary['Mean'] = float(MaxLoad.mean())
+    Summary['StdDev'] = float(MaxLoad.std())
+    Summary['LimitProbability'] = {
+        Reason: float(np.mean(Reasons == Reason)) for Reason in REASONS[1:]}
+    Summary['NumSamples'] = NumSamples
+    Summary['Samples'] = MaxLoad
+    return Summary
+
+
+def sample(Distribution, rng, NumSamples, Shape=False):
+    """ Draw samples from a distribution, or repeat a fixed value
+    Returns an array of NumSamples values, or NumSamples rows for a Shape
+    """
+    if callable(Distribution):
+        Values = np.asarray(Distribution(rng, NumSamples), dtype=float)
+    else:
+        Values = np.asarray(Distribution, dtype=float)
+    if Shape:
+        return np.broadcast_to(Values, (NumSamples, Values.shape[-1]))
+    return np.broadcast_to(Values, (NumSamples,))
+
+
+def normal(Mean, StdDev):
+    """ Normally distributed values
+    """
+    return lambda rng, NumSamples: rng.normal(Mean, StdDev, NumSamples)
+
+
+def uniform(Low, High):
+    """ Uniformly distributed values
+    """
+    return lambda rng, NumSamples: rng.uniform(Low, High, NumSamples)
+
+
+def empirical(Values):
+    """ Values drawn (with replacement) from observations
+    """
+    Values = np.asarray(Values, dtype=float)
+    return lambda rng, NumSamples: rng.choice(Values, NumSamples)
+
+
+def perturbed_shape(LoadShape, StdDev=0.05):
+    """ Load shapes with independent normal noise in each interval, as a
+    fraction of the load
+    """
+    LoadShape = np.asarray(LoadShape, dtype=float)
+
+    def draw(rng, NumSamples):
+        Noise = rng.normal(1.0, StdDev, (NumSamples, len(LoadShape)))
+        return LoadShape * np.maximum(Noise, 0.0)
+    return draw
+
+
+def historical_shapes(LoadShapes):
+    """ Load shapes drawn (with replacement) from observed daily curves
+    """
+    LoadShapes = np.asarray(LoadShapes, dtype=float)
+    return lambda rng, NumSamples: LoadShapes[
+        rng.integers(len(LoadShapes), size=NumSamples)]
@@ -1,5 +1,149 @@
+import copy
 import logging
 import math
+import time
+import types
+from collections import namedtuple
+
+from ratetransformer import kernels
+
+logger = logging.getLogger(__name__)
+
+# Increase when a change to the thermal model or search changes ratings
+MODEL_VERSION = 6
+
+# Transformer attributes set by perform_rating
+RATING_RESULTS = ('MaxLoad', 'MaxTOTemp', 'MaxWHSTemp', 'Ageing', 'CRF',
+                  'RatingReason', 'NumIterations', 'NumEvaluations')
+
+# Limits in the order they are checked, as reported in RatingReason
+LIMIT_NAMES = ('CRF', 'TO', 'WHS', 'Age')
+
+# Keys of Transformer.WarmStart, the state a later rating can start from
+WARM_START = ('ScaleFactor', 'TOStart', 'WHSStart')
+
+
+class RatingResult(namedtuple('RatingResult', RATING_RESULTS + (
+        'ScaleFactor', 'WarmStart', 'LimitRatings', 'LimitMargins',
+        'BracketWidth', 'Converged'))):
+    """ The results of a rating, as returned by Transformer.rate
+    An immutable record of the attributes perform_rating sets, with the
+    WarmStart, LimitRatings and LimitMargins as read-only mappings, and the
+    LimitRatings and LimitMargins None unless Headroom was requested
+    """
+    __slots__ = ()
+
+
+# Default limits as per AS60076.7 Table 4
+DEFAULT_LIMITS = {
+    'MaxLoadPU': 1.5,   # Maximum nameplate loading [pu]
+    'TopOil': 105,      # Maximum top oil temperature [°C]
+    'HotSpot': 120,     # Maximum winding hot spot temperature [°C]
+    'LoL': 24,          # Ageing (loss-of-life) limit [hours per day]
+}
+
+# Recommended thermal characteristics for a cooling mode
+# As per AS 60076.7-2013 Table 5 and IEEE C57.91-2011 Table 4 (n)
+CoolingModeData = namedtuple('CoolingModeData', [
+    'x',            # Oil exponent
+    'y',            # Winding exponent
+    'k11', 'k21', 'k22',  # Thermal model constants
+    'TauO',         # Oil time constant [min]
+    'TauW',         # Winding time constant [min]
+    'n',            # Oil time constant exponent
+    'NaturalOil',   # Oil is naturally circulated (for thermal capacity)
+])
+
+_ON = CoolingModeData(0.8, 1.3, 0.5, 2.0, 2.0, 210.0, 10.0, 0.8, True)
+_OB = CoolingModeData(0.8, 1.3, 0.5, 2.0, 2.0, 150.0, 7.0, 0.9, True)
+_OF = CoolingModeData(1.0, 1.3, 1.0, 1.3, 1.0, 90.0, 7.0, 0.9, False)
+_OD = CoolingModeData(1.0, 2.0, 1.0, 1.0, 1.0, 90.0, 7.0, 1.0, False)
+
+COOLING_MODES = {
+    'ONAN': _ON, 'ON': _ON,
+    'ONAF': _OB, 'OB': _OB,
+    'OFAN': _OF, 'OFAF': _OF, 'OFWF': _OF, 'OF': _OF, 'OFB': _OF,
+    'ODAN': _OD, 'ODAF': _OD, 'ODWF': _OD,
+}
+
+
+def cooling_mode_data(cooling_mode):
+    """ Get the recommended characteristics for a cooling mode
+    """
+    try:
+        return COOLING_MODES[cooling_mode.strip().upper()]
+    except KeyError:
+        raise ValueError('Unknown cooling mode: {}'.format(cooling_mode))
+
+
+class ThermalParameters(namedtuple('ThermalParameters', [
+        'RatedLoad', 'dTOr', 'gr', 'R', 'H', 'x', 'y',
+        'k11', 'k21', 'k22', 'TauW', 'TauR', 'n',
+        'Hgr', 'R1', 'InvN', 'k11TauR', 'k22TauW', 'TauRk22'])):
+    """ The thermal model of a transformer, compiled for the time steps
+    An immutable record of the resolved model parameters, followed by the
+    products and exponents used at every time step
+    """
+    __slots__ = ()
+
+    @classmethod
+    def build(cls, RatedLoad, dTOr, gr, R, H, x, y, k11, k21, k22, TauW,
+              TauR, n):
+        """ Compile the thermal parameters
+        """
+        InvN = 1 / n if n != 0 else 0.0
+        return cls(RatedLoad, dTOr, gr, R, H, x, y, k11, k21, k22, TauW,
+                   TauR, n, H * gr, R + 1, InvN, k11 * TauR, k22 * TauW,
+                   TauR / k22)
+
+    def ultimate_rises(self, Load):
+        """ Ultimate top oil and winding rise for a load (in MVA)
+        """
+        K = Load / self.RatedLoad
+        dTOult = self.dTOr * ((((K**2) * self.R) + 1) / self.R1) ** self.x
+        dWHS = self.Hgr * (K ** self.y)
+        return dTOult, dWHS
+
+    def cycle_steps(self, LoadShape):
+        """ Ultimate rises and whether the load is increasing for each
+        interval of a cyclic load shape
+        """
+        Steps = []
+        for index, Load in enumerate(LoadShape):
+            dTOult, dWHS = self.ultimate_rises(Load)
+            Steps.append((dTOult, dWHS, Load > LoadShape[index - 1]))
+        return Steps
+
+    def winding_factors(self, t):
+        """ Winding rise factors for increasing load (AS60076.7 Eq. (5))
+        and decreasing load (AS60076.7 Eq. (6)) over time interval t
+        """
+        f2 = (self.k21 * (1 - math.exp((-t) / self.k22TauW)) -
+              (self.k21 - 1) * (1 - math.exp((-t) / self.TauRk22)))
+        fW = math.exp((-t) / self.TauW)
+        return f2, fW
+
+    def top_oil_rise(self, t, dTOi, dTOult):
+        """ Top oil rise after time interval t, with the oil time constant
+        adjusted for the considered load as per IEEE C57.91-2011
+        """
+        k11Tau = self.k11TauR
+        a = dTOult / self.dTOr
+        b = dTOi / self.dTOr
+        if (a - b) != 0 and self.n != 0:
+            try:
+                k11Tau = self.k11TauR * (a - b) / ((a**self.InvN) - (b**self.InvN))
+            except ZeroDivisionError:
+                pass  # The a-b didn't catch the error
+        # As per AS60076.7 Eq. (2)
+        return dTOult + (dTOi - dTOult) * math.exp((-t) / k11Tau)
+
+    def winding_rise(self, dWHSi, dWHS, LoadIncreasing, f2, fW):
+        """ Winding rise after a time interval, using the winding factors
+        """
+        if LoadIncreasing:
+            return dWHSi + (dWHS - dWHSi) * f2
+        return dWHS + (dWHSi - dWHS) * fW
 
 
 class Transformer:
@@ -23,39 +167,20 @@ class Transformer:
         except KeyError:
             self.H = 1.3
 
-        try:
-            self.x = ThermalChar['x']  # Oil Exponent
-        except KeyError:
-            self.x = recommended_oil_exponent(self.CoolingMode)
-        try:
-            self.y = ThermalChar['y']  # Winding Exponent
-        except KeyError:
-            self.y = recommended_winding_exponent(self.CoolingMode)
-
-        try:
-            self.C = ThermalChar['C']  # Thermal Capacity
-        except KeyError:
-            try:
-                mass_assembly = ThermalChar['mass_assembly']
-                mass_tank = ThermalChar['mass_tank']
-                vol_oil = ThermalChar['vol_oil']
-                self.C = thermal_capacity(vol_oil, mass_assembly, mass_tank, self.CoolingMode)
-            except KeyError:
-                self.C = None
+        (self.x, self.y, self.C, self.k11, self.k21, self.k22, self.TauW,
+         self.n) = thermal_characteristics(self.CoolingMode, ThermalChar)
 
-        try:
-            self.k11 = ThermalChar['k11']
-            self.k21 = ThermalChar['k21']
-            self.k22 = ThermalChar['k22']
-        except KeyError:
-            self.k11, self.k21, self.k22 = recommended_thermal_constants(self.CoolingMode)
-
-        try:
-            self.TauW = ThermalChar['TauW']  # Winding Time Constant
-        except:
-            self.TauW = recommended_winding_time_constant(self.CoolingMode)
+        # Compile the thermal model used at each time step
+        TauR = determine_oil_thermal_time_constant(self.CoolingMode, self.C, self.P, self.dTOr)
+        self.Thermal = ThermalParameters.build(
+            self.RatedLoad, self.dTOr, self.gr, self.R, self.H, self.x, self.y,
+            self.k11, self.k21, self.k22, self.TauW, TauR, self.n)
 
-        self.n = recommended_oil_time_constant(self.CoolingMode)
+        self.reset_counters()
+        self.CycleStart = (0.0, 0.0)  # Rises of the last cycle simulated
+        self.Backend = None  # Kernel used by CalculateLimit (None for the default)
+        self.Compress = None  # Error bound for splitting into blocks [°C]
+        self.Blocks = None  # Load shape last split, and its blocks
 
     def calc_winding_rise(self, t, StartTemp, Load, LoadIncreasing):
         """ Calculate the winding rise
@@ -63,32 +188,12 @@ class Transformer:
         t = Time Interval (min)
         StartTemp = Initial Top Oil Rise
         Load = Load to be considered (in MVA)
-        HeatRunData is a dict with test results
-        ThermalChar is a dict with thermal characteristics for cooling mode
+        LoadIncreasing = Whether the load is bigger than the previous load
         """
-
-        ThermalChar = self.ThermalChar
-        TauR = determine_oil_thermal_time_constant(self.CoolingMode, self.C, self.P, self.dTOr)
-
         # Calculate ultimate winding rise to simplify below formulas
-        K = float(Load / self.RatedLoad)
-        dWHS = self.H * self.gr * (K ** self.y)
-
-        if LoadIncreasing == True:
-            # As per AS60076.7 Eq. (5)
-            f2 = (self.k21 *
-                (1 - math.exp((-t) / (self.k22 * self.TauW))) -
-                (self.k21 - 1) *
-                (1 - math.exp((-t) / (TauR / self.k22)))
-                )
-            dWHSt = StartTemp + (dWHS - StartTemp) * f2
-        else:
-            # As per AS60076.7 Eq. (6)
-            dWHSt = dWHS + (StartTemp - dWHS) * \
-                math.exp((-t) / (self.TauW))
-
-        return dWHSt
-
+        dTOult, dWHS = self.Thermal.ultimate_rises(float(Load))
+        f2, fW = self.Thermal.winding_factors(t)
+        return self.Thermal.winding_rise(StartTemp, dWHS, LoadIncreasing, f2, fW)
 
     def calc_top_oil_rise(self, t, StartTemp, Load):
         """ Calculate top oil rise
@@ -96,39 +201,65 @@ class Transformer:
         t = Time Interval (min)
         StartTemp = Initial Top Oil Rise
         Load = Load to be considered (in MVA)
-        HeatRunData is a dict with test results
-        ThermalChar is a dict with thermal characteristics for cooling type
         """
-        ThermalChar = self.ThermalChar
-        dTOi = StartTemp
-        K = Load / self.RatedLoad
         # Determine ultimate (steady state) temperature for given load
-        dTOult = ult_top_oil_rise_at_load(K, self.R,
-                                        self.dTOr, self.x)
-
-        TauR = determine_oil_thermal_time_constant(self.CoolingMode, self.C, self.P, self.dTOr)
-
-        # Determine the oil thermal time constant - specified load
-        Tau = thermal_time_constant_as_considered_load(TauR, self.dTOr,
-                                                    dTOi, dTOult, self.n)
+        dTOult, dWHS = self.Thermal.ultimate_rises(Load)
         # Determine instantaneous top oil temperature for given load
-        dTO = inst_top_oil_rise_at_load(dTOi, dTOult, t, self.k11, Tau)
-        return dTO
-
+        return self.Thermal.top_oil_rise(t, StartTemp, dTOult)
 
-    def perform_rating(self, AmbWHS=25.0, AmbAgeing=27.0, LoadShape=[], Limits={}):
+    def perform_rating(self, AmbWHS=25.0, AmbAgeing=27.0, LoadShape=[], Limits={},
+                       Search='step', Tolerance=0.000001, SteadyState='iterate',
+                       WarmStart=None, Headroom=False, Observer=None,
+                       Interval=30.0, Compress=None,
+                       Precision=None, Deadline=None, MaxEvaluations=None):
         """ Perform rating on a single transformer for specified rating limits
 
             AmbWHS      The monthly average temperature of the hottest month [°C]
             AmbAgeing   The yearly weighted ambient temperature [°C]
             LoadShape   The cyclic load curve to be considered (in MVA)
             Limits      Current and temperature limits
+            Search      'step' for the original step-and-halve search, or
+                        'brent' to solve for the limit with a bracketed root
+                        finder
+            Tolerance   Relative tolerance on the scale factor ('brent' only)
+            SteadyState 'iterate' to repeat the cycle up to 25 times, or
+                        'solve' to solve for the cyclic starting temperatures
+            WarmStart   The WarmStart of a previous rating, to search a narrow
+                        bracket around its peak load and start the cycle from
+                        its temperatures ('brent' only)
+            Headroom    Also find the peak load at which each limit binds on
+                        its own, and the margin to each limit at the rating
+                        (sets LimitRatings and LimitMargins)
+            Observer    Called with (tx, stats) once the rating is complete,
+                        where stats is the dict from rating_stats
+            Interval    Time between the values of LoadShape [min]
+            Compress    Split the load shape into blocks evaluated in closed
+                        form, with the temperatures within this bound of
+                        those simulated every interval [°C], or None to
+                        simulate every interval
+            Precision   Stop once the rating is known to within this fraction
+                        of the rated load, such as 0.005 ('brent' only)
+            Deadline    Stop the search after this many seconds ('brent' only)
+            MaxEvaluations  Stop the search after this many load cycles have
+                        been simulated ('brent' only)
+
+        When stopped by the Deadline or MaxEvaluations, the rating is the
+        highest load found to be within limits so far (Converged is False),
+        or no load if none was found, which takes one more load cycle after
+        the Deadline but is counted within MaxEvaluations.
+        BracketWidth is how far above the rating the lowest load found to
+        breach a limit (or the load limit) is, in MVA (None for the step
+        search).
         """
+        Started = time.perf_counter()
         self.AmbWHS = AmbWHS
         self.AmbAgeing = AmbAgeing
 
         self.LoadShape = LoadShape
-        self.t = 30.0  # Time Interval (min)
+        self.t = Interval  # Time Interval (min)
+        self.SteadyState = SteadyState
+        self.Compress = Compress
+        self.Blocks = None
 
         if self.LoadShape == []:
             self.LoadShape = [1.0] * 48
@@ -138,20 +269,121 @@ class Transformer:
         try:
             self.MaxLoadLimit = Limits['MaxLoadPU']
         except KeyError:
-            self.MaxLoadLimit = 1.5
+            self.MaxLoadLimit = DEFAULT_LIMITS['MaxLoadPU']
         try:
             self.TopOilLimit = Limits['TopOil']
         except KeyError:
-            self.TopOilLimit = 105
+            self.TopOilLimit = DEFAULT_LIMITS['TopOil']
         try:
             self.WHSLimit = Limits['HotSpot']
         except KeyError:
-            self.WHSLimit = 120
+            self.WHSLimit = DEFAULT_LIMITS['HotSpot']
         try:
             self.LoLLimit = Limits['LoL']
         except KeyError:
-            self.LoLLimit = 24
+            self.LoLLimit = DEFAULT_LIMITS['LoL']
 
+        self.RatingReason = 'Did not converge'  # Stops errors later
+        self.reset_counters()
+        self.Search = Search
+        self.Evaluations = {}  # Results of the search by scaling
+        self.BracketWidth = None  # Width of the bracket around the rating [MVA]
+        self.Converged = True  # Whether the search finished within its budget
+
+        SearchStarted = time.perf_counter()
+        if Search == 'step':
+            if (WarmStart, Precision, Deadline, MaxEvaluations) != (None,) * 4:
+                raise ValueError('WarmStart, Precision and budgets need the brent search')
+            (Max_Load, Max_TOtemp, Max_WHStemp, L,
+                NumIter) = self.step_search(Limits)
+        elif Search == 'brent':
+            (Max_Load, Max_TOtemp, Max_WHStemp, L,
+                NumIter) = self.bracket_search(
+                    Limits, Tolerance, WarmStart, Precision,
+                    None if Deadline is None else Started + Deadline,
+                    MaxEvaluations)
+        else:
+            raise ValueError('Unknown search: {}'.format(Search))
+
+        self.PhaseSeconds['Search'] = time.perf_counter() - SearchStarted
+
+        # Round values to appropriate significant figures
+        self.MaxLoad = round(Max_Load, 3)
+        self.MaxTOTemp = round(Max_TOtemp, 2)
+        self.MaxWHSTemp = round(Max_WHStemp, 2)
+        self.Ageing = round(L, 3)
+
+        self.CRF = round(self.MaxLoad / self.RatedLoad, 4)
+        self.NumIterations = NumIter
+
+        # Unrounded state for warm starting a later rating
+        self.WarmStart = dict(zip(WARM_START, (self.ScaleFactor,) + self.CycleStart))
+
+        if Headroom:
+            HeadroomStarted = time.perf_counter()
+            self.limit_headroom(Limits, Tolerance)
+            self.PhaseSeconds['Headroom'] = time.perf_counter() - HeadroomStarted
+        self.PhaseSeconds['Total'] = time.perf_counter() - Started
+
+        if Observer is not None or logger.isEnabledFor(logging.DEBUG):
+            Stats = self.rating_stats()
+            logger.debug('Rated %s MVA %s transformer: %s', self.RatedLoad,
+                         self.CoolingMode, Stats)
+            if Observer is not None:
+                Observer(self, Stats)
+
+    def rate(self, AmbWHS=25.0, AmbAgeing=27.0, LoadShape=[], Limits={},
+             **Options):
+        """ Rate the transformer for a scenario without changing it
+        Takes the same inputs as perform_rating, which is run on a shallow
+        copy sharing the compiled thermal model, so one Transformer can be
+        rated for different scenarios from many threads at once.
+        Returns a RatingResult
+        """
+        Scenario = copy.copy(self)
+        Scenario.perform_rating(AmbWHS, AmbAgeing, LoadShape, Limits, **Options)
+        Headroom = Options.get('Headroom', False)
+        return RatingResult(
+            *[getattr(Scenario, key) for key in RATING_RESULTS],
+            Scenario.ScaleFactor, _read_only(Scenario.WarmStart),
+            _read_only(Scenario.LimitRatings) if Headroom else None,
+            _read_only(Scenario.LimitMargins) if Headroom else None,
+            Scenario.BracketWidth, Scenario.Converged)
+
+    def reset_counters(self):
+        """ Reset the counters of the work done by a rating
+        """
+        self.NumEvaluations = 0  # Load cycles simulated in the last rating
+        self.NumWarmUpPasses = 0  # Passes through the load cycle
+        self.NumSearchRounds = 0  # Step halvings or root finder iterations
+        self.NumSolveFallbacks = 0  # Cycles not solved, so iterated instead
+        self.NumCappedCycles = 0  # Iterated cycles stopped at the pass limit
+        self.NumExp = 0  # Exponentials evaluated while simulating cycles
+        self.PhaseSeconds = {}  # Wall time of each phase of the rating
+
+    def rating_stats(self):
+        """ Get the work done by the last rating, to find slow units
+        """
+        return {
+            'Search': self.Search,
+            'SteadyState': self.SteadyState,
+            'RatingReason': self.RatingReason,
+            'Converged': self.Converged,
+            'BracketWidth': self.BracketWidth,
+            'SearchRounds': self.NumSearchRounds,
+            'CalculateLimitCalls': self.NumEvaluations,
+            'WarmUpPasses': self.NumWarmUpPasses,
+            'SolveFallbacks': self.NumSolveFallbacks,
+            'CappedCycles': self.NumCappedCycles,
+            'ExpCalls': self.NumExp,
+            'Seconds': dict(self.PhaseSeconds),
+        }
+
+    def step_search(self, Limits):
+        """ Find the rating by increasing the load in steps until a limit is
+        reached, then stepping back and halving the step size
+        This is the original search, kept as a reference
+        """
         # Define some initial values
         NumIter = 0
         Limit = False
@@ -173,15 +405,14 @@ class Transformer:
         if ScaleFactor < 0.2:
             ScaleFactor = 0.2  # Start reasonably high
 
-        self.RatingReason = 'Did not converge'  # Stops errors later
-
         # Loop until scaling factor is sufficiently small
         maxIterations = 150
         for i in range(maxIterations):
             while Limit == False:
                 (Limit, Max_Load, Max_TOtemp, Max_WHStemp,
                     L) = self.CalculateLimit(ScaleFactor, self.t, self.HeatRunData, self.ThermalChar,
-                                             Limits, self.AmbWHS, self.AmbAgeing, self.LoadShape)
+                                             Limits, self.AmbWHS, self.AmbAgeing, self.LoadShape,
+                                             SteadyState=self.SteadyState)
                 NumIter += 1
                 ScaleFactor += IncrementFactor
 
@@ -192,31 +423,371 @@ class Transformer:
                 ScaleFactor = 0
             (Limit, Max_Load, Max_TOtemp, Max_WHStemp,
                 L) = self.CalculateLimit(ScaleFactor, self.t, self.HeatRunData, self.ThermalChar,
-                                         Limits, self.AmbWHS, self.AmbAgeing, self.LoadShape)
+                                         Limits, self.AmbWHS, self.AmbAgeing, self.LoadShape,
+                                         SteadyState=self.SteadyState)
 
             # Decrese the amount scaled for next iteration run
             IncrementFactor = (IncrementFactor / 2)
 
-            # Round values to appropriate significant figures
-            self.MaxLoad = round(Max_Load, 3)
-            self.MaxTOTemp = round(Max_TOtemp, 2)
-            self.MaxWHSTemp = round(Max_WHStemp, 2)
-            self.Ageing = round(L, 3)
-
             # Check if converged early
             if IncrementFactor < 0.00001:  # Check scaling factor is small
                 if PrevPeak == Max_Load:
                     break
+                if ScaleFactor + IncrementFactor == ScaleFactor:
+                    break  # Increment can no longer change the scaling
             PrevPeak = Max_Load
 
-        self.CRF = round(self.MaxLoad / self.RatedLoad, 4)
-        self.NumIterations = NumIter
+        self.NumSearchRounds = i + 1
+        self.ScaleFactor = ScaleFactor
+        return Max_Load, Max_TOtemp, Max_WHStemp, L, NumIter
+
+    def bracket_search(self, Limits, Tolerance=0.000001, WarmStart=None,
+                       Precision=None, StopTime=None, MaxEvaluations=None):
+        """ Find the rating by solving for the scale factor where the
+        smallest limit margin reaches zero, using Brent's method
+        The margins decrease as the load is scaled up, so the rating is
+        bracketed between a scaling that is within limits and one that is not
+        WarmStart = State of a previous rating to search around
+        Precision = Bracket width to stop at, as a fraction of the rated load
+        StopTime = time.perf_counter() value to stop searching at
+        MaxEvaluations = Number of load cycles to stop searching after,
+        including the load cycle at no load simulated when no scaling within
+        limits is found (which is simulated even after StopTime)
+        """
+        Safe = [0.0, None, None]  # Highest scaling found within limits
+        Breach = [None, None]     # Lowest scaling found to breach a limit
+        Start = [None]            # Cycle start temperatures to begin from
+        NoLoad = [None, None]     # Results and cycle start at no load
+        if WarmStart is not None:
+            Start[0] = (WarmStart['TOStart'], WarmStart['WHSStart'])
+
+        def margin(ScaleFactor):
+            """ Smallest limit margin at a scaling, recording the bracket
+            """
+            # Keep a load cycle for the rating at no load until a scaling
+            # within limits is found
+            Reserve = 1 if Safe[1] is None and ScaleFactor > 0 else 0
+            if ((MaxEvaluations is not None
+                    and self.NumEvaluations + Reserve >= MaxEvaluations)
+                    or (StopTime is not None and time.perf_counter() >= StopTime)):
+                raise _BudgetSpent
+            Values = self.CalculateLimit(
+                ScaleFactor, self.t, self.HeatRunData, self.ThermalChar,
+                Limits, self.AmbWHS, self.AmbAgeing, self.LoadShape,
+                SteadyState=self.SteadyState, Start=Start[0])
+            self.Evaluations[ScaleFactor] = Values
+            if ScaleFactor == 0:
+                NoLoad[:] = [Values, self.CycleStart]
+            if WarmStart is not None:
+                Start[0] = self.CycleStart  # Nearest solution for the next
+            Margin = min(self.limit_margins(*Values[1:]))
+            Reason = self.limit_reason(*Values[1:])
+            if Reason is None:
+                if ScaleFactor >= Safe[0]:
+                    Safe[:] = [ScaleFactor, Values, self.CycleStart]
+                return max(Margin, 1e-12)  # Within limits
+            if Breach[0] is None or ScaleFactor < Breach[0]:
+                Breach[:] = [ScaleFactor, Reason]
+            return min(Margin, -1e-12)
+
+        # The load limit is always reached at a known scaling
+        ScaleLimit = (self.MaxLoadLimit * self.RatedLoad) / max(self.LoadShape)
+        Width = 0.0  # Bracket width to stop at
+        if Precision is not None:
+            Width = Precision * self.RatedLoad / max(self.LoadShape)
+
+        try:
+            if WarmStart is not None:
+                Lower, fLower, Upper, fUpper = self.warm_bracket(
+                    margin, WarmStart['ScaleFactor'], ScaleLimit)
+            else:
+                # Start at rated load, so a safe rating is found first
+                Lower = min(self.RatedLoad / max(self.LoadShape), ScaleLimit)
+                fLower = margin(Lower)
+                if fLower > 0:
+                    Upper = ScaleLimit
+                    fUpper = margin(Upper)
+                else:
+                    Upper, fUpper = Lower, fLower
+                # Move down until within limits
+                while fLower <= 0 and Lower > Tolerance:
+                    Upper, fUpper = Lower, fLower
+                    Lower = Lower / 4
+                    fLower = margin(Lower)
+            if fLower <= 0:
+                Lower = 0.0
+                fLower = margin(Lower)
+
+            if fLower > 0 and fUpper <= 0:
+                Bracketed = self.NumEvaluations
+                find_root(margin, Lower, Upper, fLower, fUpper,
+                          max(Tolerance * Upper, Width))
+                self.NumSearchRounds = self.NumEvaluations - Bracketed
+        except _BudgetSpent:
+            self.Converged = False
+
+        if Breach[0] is not None:
+            self.RatingReason = Breach[1]
+        elif self.Converged:
+            self.RatingReason = 'CRF'  # Rounding kept the load limit safe
+        Upper = ScaleLimit if Breach[0] is None else Breach[0]
+        self.BracketWidth = (Upper - Safe[0]) * max(self.LoadShape)
+        Values = Safe[1]
+        self.ScaleFactor, self.CycleStart = Safe[0], Safe[2]
+        if Values is None:
+            # Limits are breached even with no load, or the search was
+            # stopped before finding a load within limits
+            Values, self.CycleStart = NoLoad
+            if Values is None:
+                Values = self.CalculateLimit(
+                    0.0, self.t, self.HeatRunData, self.ThermalChar,
+                    Limits, self.AmbWHS, self.AmbAgeing, self.LoadShape,
+                    SteadyState=self.SteadyState)
+            self.RatingReason = self.limit_reason(*Values[1:]) or self.RatingReason
+        Limit, Max_Load, Max_TOtemp, Max_WHStemp, L = Values
+        return Max_Load, Max_TOtemp, Max_WHStemp, L, self.NumEvaluations
+
+    def warm_bracket(self, margin, Guess, ScaleLimit, Width=0.01):
+        """ Bracket the rating around the scaling of a previous rating,
+        widening the bracket by four times until it contains the rating
+        Returns Lower, fLower, Upper, fUpper, where fUpper is a breach and
+        fLower is not a breach unless the limits are breached near no load
+        """
+        Guess = min(Guess, ScaleLimit)
+        Lower = Guess * (1 - Width)
+        fLower = margin(Lower)
+        if fLower > 0:
+            # Within limits, so widen upwards to the load limit
+            while True:
+                Upper = min(Guess * (1 + Width), ScaleLimit)
+                fUpper = margin(Upper)
+                if fUpper <= 0 or Upper == ScaleLimit:
+                    return Lower, fLower, Upper, fUpper
+                Lower, fLower = Upper, fUpper
+                Width *= 4
+        # Limit breached, so widen downwards towards no load
+        Upper, fUpper = Lower, fLower
+        while Width < 1:
+            Width *= 4
+            Lower = Guess * max(1 - Width, 0.0)
+            fLower = margin(Lower)
+            if fLower > 0:
+                break
+            Upper, fUpper = Lower, fLower
+        return Lower, fLower, Upper, fUpper
+
+    def limit_headroom(self, Limits, Tolerance=0.000001, MaxScale=16):
+        """ Find the peak load at which each limit binds on its own, reusing
+        the load cycles simulated by the rating search
+        Sets LimitRatings, the peak load (MVA) for each limit, or None if it
+        does not bind below MaxScale times the load limit, and LimitMargins,
+        the margin to each limit at the rating (CRF in pu, TO and WHS in °C
+        and Age in hours)
+        """
+        Evaluations = self.Evaluations
+        RatingReason = self.RatingReason  # Kept from the rating search
+
+        def margins(ScaleFactor):
+            """ Margins at a scaling, simulating the cycle only if needed
+            """
+            if ScaleFactor not in Evaluations:
+                Evaluations[ScaleFactor] = self.CalculateLimit(
+                    ScaleFactor, self.t, self.HeatRunData, self.ThermalChar,
+                    Limits, self.AmbWHS, self.AmbAgeing, self.LoadShape,
+                    SteadyState=self.SteadyState)
+            return self.limit_margins(*Evaluations[ScaleFactor][1:])
+
+        Peak = max(self.LoadShape)
+        ScaleLimit = (self.MaxLoadLimit * self.RatedLoad) / Peak
+        self.LimitRatings = {'CRF': round(ScaleLimit * Peak, 3)}
+        for i, Name in enumerate(LIMIT_NAMES[1:], 1):
+            def margin(ScaleFactor, i=i):
+                return margins(ScaleFactor)[i]
+
+            # Bracket the limit with the scalings already simulated
+            Lower, fLower = 0.0, None
+            for ScaleFactor in sorted(Evaluations):
+                if margin(ScaleFactor) > 0:
+                    Lower, fLower = ScaleFactor, margin(ScaleFactor)
+            Upper = min([x for x in Evaluations if x > Lower and margin(x) <= 0],
+                        default=None)
+            if fLower is None:
+                fLower = margin(Lower)
+                if fLower <= 0:
+                    self.LimitRatings[Name] = 0.0  # Breached with no load
+                    continue
+            if Upper is None:
+                Upper = max(Lower, ScaleLimit)
+                while margin(Upper) > 0 and Upper < MaxScale * ScaleLimit:
+                    Lower, fLower = Upper, margin(Upper)
+                    Upper = Upper * 2
+                if margin(Upper) > 0:
+                    self.LimitRatings[Name] = None
+                    continue
+
+            Root = find_root(margin, Lower, Upper, fLower, margin(Upper),
+                             Tolerance * Upper)
+            self.LimitRatings[Name] = round(Root * Peak, 3)
+
+        margins(self.ScaleFactor)
+        Limit, Max_Load, Max_TOtemp, Max_WHStemp, LoL = Evaluations[self.ScaleFactor]
+        self.LimitMargins = {
+            'CRF': round(self.MaxLoadLimit - Max_Load / self.RatedLoad, 4),
+            'TO': round(self.TopOilLimit - Max_TOtemp, 2),
+            'WHS': round(self.WHSLimit - Max_WHStemp, 2),
+            'Age': round(self.LoLLimit - LoL, 3),
+        }
+        self.RatingReason = RatingReason
 
     def CalculateLimit(self, ScaleFactor, t, HeatRunData, ThermalChar,
-                       Limits, AmbWHS, AmbAgeing, LoadShape):
+                       Limits, AmbWHS, AmbAgeing, LoadShape,
+                       SteadyState='iterate', Tolerance=0.000001, Start=None):
         """ Scales load and checks whether limit will be breached
+        SteadyState = 'iterate' to repeat the cycle until the temperatures
+        repeat, or 'solve' to solve for the cyclic starting temperatures
+        Tolerance = Allowed difference in starting and ending rise (°C)
+        Start = Top oil and winding rises to start solving from ('solve' only)
         """
-        TempLoadShape = [i * ScaleFactor for i in LoadShape]
+        if self.Compress is None:
+            TempLoadShape = [i * ScaleFactor for i in LoadShape]
+        else:
+            # Blocks scale with the load shape, so only split it once
+            if self.Blocks is None or self.Blocks[0] is not LoadShape:
+                self.Blocks = (LoadShape, self.split_load_shape(LoadShape, t))
+            TempLoadShape = ScaleFactor  # The blocks kernel takes the scaling
+
+        if SteadyState == 'solve':
+            if Start is None:
+                Start = (0.0, 0.0)
+            Cycle = self.solve_steady_state(TempLoadShape, t, AmbWHS,
+                                            AmbAgeing, Tolerance, *Start,
+                                            Summary=True)
+            if Cycle is None:
+                self.NumSolveFallbacks += 1
+                Cycle = self.iterate_steady_state(TempLoadShape, t, AmbWHS,
+                                                  AmbAgeing, Summary=True)
+        elif SteadyState == 'iterate':
+            Cycle = self.iterate_steady_state(TempLoadShape, t, AmbWHS,
+                                              AmbAgeing, Summary=True)
+        else:
+            raise ValueError('Unknown steady state method: {}'.format(SteadyState))
+        Max_TOtemp, Max_WHStemp, LoL = Cycle[:3]
+        self.CycleStart = tuple(Cycle[3:])  # Rises the cycle repeats from
+        Max_Load = max(LoadShape) * ScaleFactor
+
+        Limit = self.was_limit_reached(Max_Load, Max_TOtemp, Max_WHStemp, LoL)
+        self.NumEvaluations += 1
+
+        return Limit, Max_Load, Max_TOtemp, Max_WHStemp, LoL
+
+    def simulate_cycle(self, LoadShape, t, TOinitial, WHSinitial,
+                       AmbWHS, AmbAgeing, Steps=None):
+        """ Simulate one pass of the load cycle from the starting rises
+        Steps = Precalculated Thermal.cycle_steps(LoadShape), if available
+        Returns the lists of top oil temperature, hot spot temperature and
+        ageing rate, and the ending top oil and winding rises
+        """
+        Thermal = self.Thermal
+        if Steps is None:
+            Steps = Thermal.cycle_steps(LoadShape)
+        f2, fW = Thermal.winding_factors(t)
+
+        # Set up containers for final results
+        List_TOtemp = []
+        List_WHStemp = []
+        List_V = []
+
+        # Set starting temperatures
+        TOprev = TOinitial
+        WHSprev = WHSinitial
+
+        # Loop through loads values
+        for dTOult, dWHS, LoadIncreasing in Steps:
+            TOrise = Thermal.top_oil_rise(t, TOprev, dTOult)
+            TOtemp = AmbWHS + TOrise
+
+            WHSrise = Thermal.winding_rise(WHSprev, dWHS, LoadIncreasing, f2, fW)
+            WHStemp = AmbWHS + TOrise + WHSrise
+            WHSageing = AmbAgeing + TOrise + WHSrise
+            V = relative_ageing_rate(WHSageing)
+
+            List_TOtemp.append(TOtemp)
+            List_WHStemp.append(WHStemp)
+            List_V.append(V)
+
+            # Set final temps as starting temperature for next in loop
+            TOprev = TOrise
+            WHSprev = WHSrise
+
+        self.NumWarmUpPasses += 1
+        self.NumExp += len(Steps) + 3  # Top oil each step, winding factors
+        return List_TOtemp, List_WHStemp, List_V, TOprev, WHSprev
+
+    def summarise_cycle(self, LoadShape, t, TOinitial, WHSinitial,
+                        AmbWHS, AmbAgeing, Steps=None):
+        """ Simulate one pass of the load cycle with the kernel backend
+        Steps = Precalculated cycle steps, prepared for the backend
+        Returns the maximum top oil and hot spot temperatures, the loss of
+        life (h), and the ending top oil and winding rises
+        """
+        Thermal = self.Thermal
+        Backend = self.Backend or kernels.get_backend()
+        if Steps is None:
+            Steps = self.prepared_steps(LoadShape)
+        if self.Compress is None:
+            f2, fW = Thermal.winding_factors(t)
+            MaxTOtemp, MaxWHStemp, L, TOend, WHSend = Backend.cycle(
+                *Steps, t, TOinitial, WHSinitial, AmbWHS, AmbAgeing,
+                Thermal.dTOr, Thermal.k11TauR, Thermal.n, Thermal.InvN, f2, fW)
+            NumExp = len(LoadShape) + 3  # Top oil each step, winding factors
+        else:
+            # The winding rises are the cyclic ones found by the split
+            MaxTOtemp, MaxWHStemp, L, TOend, WHSend, NumExp = Backend.blocks(
+                *Steps, t, TOinitial, AmbWHS, AmbAgeing, Thermal.dTOr,
+                Thermal.R, Thermal.x, Thermal.y, Thermal.k11TauR, Thermal.n,
+                Thermal.InvN, self.Compress * 4)
+
+        self.NumWarmUpPasses += 1
+        self.NumExp += NumExp
+        return MaxTOtemp, MaxWHStemp, L / 60, TOend, WHSend
+
+    def prepared_steps(self, LoadShape):
+        """ Cycle steps prepared for the kernel backend
+        If Compress is set, LoadShape is the scaling of the load shape last
+        split by CalculateLimit
+        """
+        Backend = self.Backend or kernels.get_backend()
+        if self.Compress is None:
+            return Backend.prepare(self.Thermal.cycle_steps(LoadShape))
+        return self.Blocks[1] + (LoadShape,)
+
+    def split_load_shape(self, LoadShape, t):
+        """ Split a load shape into blocks for the blocks kernel, bounding
+        the error at the load limit by Compress
+        """
+        Thermal = self.Thermal
+        Backend = self.Backend or kernels.get_backend()
+        f2, fW = Thermal.winding_factors(t)
+        ScaleLimit = (self.MaxLoadLimit * self.RatedLoad) / max(LoadShape)
+        self.NumExp += 4  # Winding factors, top oil retained each interval
+        return Backend.split(LoadShape, Thermal.RatedLoad, t, ScaleLimit,
+                             Thermal.dTOr, Thermal.R, Thermal.x, Thermal.y,
+                             Thermal.Hgr, Thermal.k11TauR, Thermal.n, f2, fW,
+                             self.Compress)
+
+    def iterate_steady_state(self, LoadShape, t, AmbWHS, AmbAgeing,
+                             Summary=False):
+        """ Repeat the load cycle from zero initial temperatures until the
+        starting and ending top oil temperatures are the same
+        Summary = Return the summary of the last pass from summarise_cycle,
+        rather than the lists from simulate_cycle
+        """
+        if Summary:
+            Steps = self.prepared_steps(LoadShape)
+            simulate = self.summarise_cycle
+        else:
+            Steps = self.Thermal.cycle_steps(LoadShape)
+            simulate = self.simulate_cycle
 
         # Initial Temperatures as Zero
         TOinitial = 0
@@ -224,40 +795,9 @@ class Transformer:
 
         # Iterate until starting and ending top oil temp are the same
         for i in range(25):  # Stop after 25 iterations if not converged
-
-            # Set up containers for final results
-            List_TOtemp = []
-            List_WHStemp = []
-            List_V = []
-
-            # Set starting temperatures to final in previous run
-            TOprev = TOinitial
-            WHSprev = WHSinitial
-
-            # Loop through loads values
-            for index, Load in enumerate(TempLoadShape):
-                # Check if load is bigger than previous
-                PrevLoad = TempLoadShape[index - 1]
-                if Load > PrevLoad:
-                    LoadIncreasing = True
-                else:
-                    LoadIncreasing = False
-
-                TOrise = self.calc_top_oil_rise(t, TOprev, Load)
-                TOtemp = AmbWHS + TOrise
-
-                WHSrise = self.calc_winding_rise(t, WHSprev, Load, LoadIncreasing)
-                WHStemp = AmbWHS + TOrise + WHSrise
-                WHSageing = AmbAgeing + TOrise + WHSrise
-                V = relative_ageing_rate(WHSageing)
-
-                List_TOtemp.append(TOtemp)
-                List_WHStemp.append(WHStemp)
-                List_V.append(V)
-
-                # Set final temps as starting temperature for next in loop
-                TOprev = TOrise
-                WHSprev = WHSrise
+            Cycle = simulate(LoadShape, t, TOinitial, WHSinitial,
+                             AmbWHS, AmbAgeing, Steps)
+            TOrise, WHSrise = Cycle[3:]
 
             # Check if converged early
             if TOinitial == TOrise:
@@ -266,37 +806,153 @@ class Transformer:
             # Set ending temperatures to initial
             TOinitial = TOrise
             WHSinitial = WHSrise
-
-        # Calculate the maximum and total values
-        Max_Load = max(TempLoadShape)
-        Max_TOtemp = max(List_TOtemp)
-        Max_WHStemp = max(List_WHStemp)
-
-        LoL = calulate_loss_of_life(List_V, t)
-
-        Limit = self.was_limit_reached(Max_Load, Max_TOtemp, Max_WHStemp, LoL)
-
-        return Limit, Max_Load, Max_TOtemp, Max_WHStemp, LoL
+        else:
+            self.NumCappedCycles += 1
+
+        return Cycle
+
+    def solve_steady_state(self, LoadShape, t, AmbWHS, AmbAgeing,
+                           Tolerance=0.000001, TOinitial=0.0, WHSinitial=0.0,
+                           MaxPasses=10, Summary=False):
+        """ Solve for the starting rises where the load cycle ends at the
+        same temperatures it started from
+        Uses secant steps on the difference between the ending and starting
+        rise of each pass. The winding rise is linear in its starting value,
+        so it is found exactly, and the top oil rise is close to linear.
+        Returns None if not converged within MaxPasses
+        Summary = As per iterate_steady_state
+        """
+        if Summary:
+            Steps = self.prepared_steps(LoadShape)
+            simulate = self.summarise_cycle
+        else:
+            Steps = self.Thermal.cycle_steps(LoadShape)
+            simulate = self.simulate_cycle
+        Start = (TOinitial, WHSinitial)
+        PrevStart = PrevResidual = None
+        for i in range(MaxPasses):
+            Cycle = simulate(LoadShape, t, Start[0], Start[1],
+                             AmbWHS, AmbAgeing, Steps)
+            End = Cycle[3:]
+            Residual = (End[0] - Start[0], End[1] - Start[1])
+            if abs(Residual[0]) <= Tolerance and abs(Residual[1]) <= Tolerance:
+                return Cycle
+
+            # Secant step on each rise, or take the ending rise if unavailable
+            NextStart = list(End)
+            if PrevStart is not None:
+                for j in range(2):
+                    Slope = Residual[j] - PrevResidual[j]
+                    if Slope != 0:
+                        x = Start[j] - Residual[j] * (Start[j] - PrevStart[j]) / Slope
+                        if x >= 0:
+                            NextStart[j] = x
+            PrevStart, PrevResidual = Start, Residual
+            Start = tuple(NextStart)
+        return None
 
     def was_limit_reached(self, Max_Load, Max_TOtemp, Max_WHStemp, LoL):
         """ Determine if any of the specified limits were reached
         """
+        Reason = self.limit_reason(Max_Load, Max_TOtemp, Max_WHStemp, LoL)
+        if Reason is None:
+            return False
+        self.RatingReason = Reason
+        return True
 
+    def limit_reason(self, Max_Load, Max_TOtemp, Max_WHStemp, LoL):
+        """ Get the first limit reached ('CRF', 'TO', 'WHS' or 'Age'),
+        or None if all values are within limits
+        """
         LoadPu = (Max_Load / self.RatedLoad)
         if LoadPu >= self.MaxLoadLimit:
-            self.RatingReason = 'CRF'
-            return True
+            return 'CRF'
         elif Max_TOtemp >= self.TopOilLimit:
-            self.RatingReason = 'TO'
-            return True
+            return 'TO'
         elif Max_WHStemp >= self.WHSLimit:
-            self.RatingReason = 'WHS'
-            return True
+            return 'WHS'
         elif LoL >= self.LoLLimit:
-            self.RatingReason = 'Age'
-            return True
+            return 'Age'
         else:
-            return False
+            return None
+
+    def limit_margins(self, Max_Load, Max_TOtemp, Max_WHStemp, LoL):
+        """ Get the margin to each limit (CRF, TO, WHS, Age), which is
+        positive within limits and decreases as the load increases
+        The load margin is in pu, the temperature margins in °C and the
+        ageing margin as the equivalent hot spot temperature in °C
+        """
+        LoadPu = (Max_Load / self.RatedLoad)
+        if self.LoLLimit <= 0:
+            AgeMargin = -1.0
+        else:
+            # Ageing rate doubles for every 6°C
+            AgeMargin = 6 * math.log2(self.LoLLimit / max(LoL, 1e-300))
+        return (self.MaxLoadLimit - LoadPu,
+                self.TopOilLimit - Max_TOtemp,
+                self.WHSLimit - Max_WHStemp,
+                AgeMargin)
+
+
+class _BudgetSpent(Exception):
+    """ Raised to stop a rating search once its time or evaluations are
+    used up
+    """
+
+
+def _read_only(Mapping):
+    """ A read-only view of a copy of a dict, so it cannot be changed
+    through a RatingResult
+    """
+    return types.MappingProxyType(dict(Mapping))
+
+
+def find_root(f, xa, xb, fa, fb, xtol, maxiter=100):
+    """ Find a root of f between xa and xb using Brent's method
+    fa and fb are the values of f at xa and xb, and must differ in sign
+    Stops once the bracket around the root is smaller than xtol
+    """
+    xpre, xcur = xa, xb
+    fpre, fcur = fa, fb
+    xblk, fblk = 0.0, 0.0
+    spre, scur = 0.0, 0.0
+    for i in range(maxiter):
+        if fpre * fcur < 0:
+            xblk, fblk = xpre, fpre
+            spre = scur = xcur - xpre
+        if abs(fblk) < abs(fcur):
+            xpre, xcur, xblk = xcur, xblk, xcur
+            fpre, fcur, fblk = fcur, fblk, fcur
+
+        delta = xtol / 2
+        sbis = (xblk - xcur) / 2
+        if fcur == 0 or abs(sbis) < delta:
+            return xcur
+
+        if abs(spre) > delta and abs(fcur) < abs(fpre):
+            if xpre == xblk:
+                # Secant step
+                stry = -fcur * (xcur - xpre) / (fcur - fpre)
+            else:
+                # Inverse quadratic interpolation
+                dpre = (fpre - fcur) / (xpre - xcur)
+                dblk = (fblk - fcur) / (xblk - xcur)
+                stry = -fcur * (fblk * dblk - fpre * dpre) / \
+                    (dblk * dpre * (fblk - fpre))
+            if 2 * abs(stry) < min(abs(spre), 3 * abs(sbis) - delta):
+                spre, scur = scur, stry
+            else:
+                spre, scur = sbis, sbis  # Bisect
+        else:
+            spre, scur = sbis, sbis  # Bisect
+
+        xpre, fpre = xcur, fcur
+        if abs(scur) > delta:
+            xcur += scur
+        else:
+            xcur += delta if sbis > 0 else -delta
+        fcur = f(xcur)
+    return xcur
 
 
 def calulate_loss_of_life(List_V, t):
@@ -332,18 +988,57 @@ def inst_top_oil_rise_at_load(dTOi, dTOult, t, k11, Tau):
     return dTO
 
 
+def thermal_characteristics(CoolingMode, ThermalChar):
+    """ Get the thermal characteristics of a transformer, using the
+    recommended values for its cooling mode for any not in ThermalChar
+    The cooling mode is only looked up for the values that are missing
+    Returns x, y, C (None if unknown), k11, k21, k22, TauW and n
+    """
+    try:
+        x = ThermalChar['x']  # Oil Exponent
+    except KeyError:
+        x = recommended_oil_exponent(CoolingMode)
+    try:
+        y = ThermalChar['y']  # Winding Exponent
+    except KeyError:
+        y = recommended_winding_exponent(CoolingMode)
+
+    try:
+        C = ThermalChar['C']  # Thermal Capacity
+    except KeyError:
+        try:
+            mass_assembly = ThermalChar['mass_assembly']
+            mass_tank = ThermalChar['mass_tank']
+            vol_oil = ThermalChar['vol_oil']
+            C = thermal_capacity(vol_oil, mass_assembly, mass_tank, CoolingMode)
+        except KeyError:
+            C = None
+
+    try:
+        k11 = ThermalChar['k11']
+        k21 = ThermalChar['k21']
+        k22 = ThermalChar['k22']
+    except KeyError:
+        k11, k21, k22 = recommended_thermal_constants(CoolingMode)
+
+    try:
+        TauW = ThermalChar['TauW']  # Winding Time Constant
+    except:
+        TauW = recommended_winding_time_constant(CoolingMode)
+
+    try:
+        n = ThermalChar['n']  # Oil time constant exponent
+    except KeyError:
+        n = recommended_oil_time_constant(CoolingMode)
+    return x, y, C, k11, k21, k22, TauW, n
+
+
 def determine_oil_thermal_time_constant(CoolingMode, C, P, dTOr):
     """ Determine the oil thermal time constant - rated load
     """
     if C is None or C == 0:
         # Use Lookup Table - AS 60077.7-2013 Table 5
-        if any(CoolingMode in s for s in ['ODAF', 'ODAN', 'OFAN', 'OF', 'OFB']):
-            TauR = 90.0
-        else:
-            if any(CoolingMode in s for s in ['ONAF', 'OB']):
-                TauR = 150.0
-            else:
-                TauR = 210.0
+        TauR = cooling_mode_data(CoolingMode).TauO
     else:
         # Calculate the Tau value
         TauR = thermal_time_constant_at_rated_load(C, P, dTOr)
@@ -404,8 +1099,7 @@ def thermal_capacity(oil_volume, mass_core, mass_tank, cooling_mode):
         C = 0  # Data not available
     else:
         mass_oil = 0.87825 * oil_volume  # Mass of oil in kilograms
-        Cooling_List = ['ONAN', 'ON', 'ONAF', 'OB']
-        if any(cooling_mode in s for s in Cooling_List):
+        if cooling_mode_data(cooling_mode).NaturalOil:
             C = 0.132 * mass_core + 0.0882 * mass_tank + 0.400 * mass_oil
         else:
             C = 0.132 * (mass_core + mass_tank) + 0.580 * mass_oil
@@ -413,70 +1107,31 @@ def thermal_capacity(oil_volume, mass_core, mass_tank, cooling_mode):
 
 
 def recommended_thermal_constants(cooling_mode):
-    """ Get recommended oil exponent as per AS 60076.7-2013 Table 5
+    """ Get recommended thermal constants as per AS 60076.7-2013 Table 5
     """
-    # Constants - As per AS 60076.7-2013 Table 5
-    Cooling_List = ['ONAN', 'ONAF', 'ON', 'OB']
-    if any(cooling_mode in s for s in Cooling_List):
-        k11 = 0.5
-        k21 = 2.0
-        k22 = 2.0
-    else:
-        Cooling_List = ['OFAN', 'OF', 'OFB']
-        if any(cooling_mode in s for s in Cooling_List):
-            k11 = 1.0
-            k21 = 1.3
-            k22 = 1.0
-        else:
-            k11 = 1.0
-            k21 = 1.0
-            k22 = 1.0
-    return k11, k21, k22
+    data = cooling_mode_data(cooling_mode)
+    return data.k11, data.k21, data.k22
 
 
 def recommended_winding_time_constant(cooling_mode):
     """ Get recommended time constant TauW as per AS 60076.7-2013 Table 5
     """
-    Cooling_List = ['ONAN', 'ON']
-    if any(cooling_mode in s for s in Cooling_List):
-        TauW = 10.0
-    else:
-        TauW = 7.0
-    return TauW
+    return cooling_mode_data(cooling_mode).TauW
 
 
 def recommended_oil_time_constant(cooling_mode):
     """ Get recommended oil tau constant as per IEEE C57.91-2011 Table 4
     """
-    Cooling_List = ['ONAN', 'ON']
-    if any(cooling_mode in s for s in Cooling_List):
-        n = 0.8
-    else:
-        Cooling_List = ['ONAF', 'OB', 'OFAN', 'OF', 'OFB']
-        if any(cooling_mode in s for s in Cooling_List):
-            n = 0.9
-        else:
-            n = 1.0
-    return n
+    return cooling_mode_data(cooling_mode).n
 
 
 def recommended_oil_exponent(cooling_mode):
     """ Get recommended oil exponent as per AS 60076.7-2013 Table 5
     """
-    Cooling_List = ['ONAN', 'ON', 'ONAF', 'OB']
-    if any(cooling_mode in s for s in Cooling_List):
-        x = 0.8
-    else:
-        x = 1.0
-    return x
+    return cooling_mode_data(cooling_mode).x
 
 
 def recommended_winding_exponent(cooling_mode):
-    """ Get recommended oil exponent as per AS 60076.7-2013 Table 5
+    """ Get recommended winding exponent as per AS 60076.7-2013 Table 5
     """
-    Cooling_List = ['ONAN', 'ONAF', 'ON', 'OB', 'OFAN', 'OF', 'OFB']
-    if any(cooling_mode in s for s in Cooling_List):
-        y = 1.3
-    else:
-        y = 2.0
-    return y
+    return cooling_mode_data(cooling_mode).y
@@ -0,0 +1,133 @@
+""" Rating a transformer against every day of a season or year
+
+Each day has its own load shape and ambients, and the day that binds is the
+one whose load is closest to its rating, i.e. with the smallest ScaleFactor
+(rating / load). Days are rated from the most to the least severe (by the
+hot spot temperature their RMS load would reach in steady state), each warm
+started from the previous rating's peak load and cyclic temperatures.
+
+A day is skipped once it cannot bind, which is when it stays within limits
+at the smallest ScaleFactor found so far. This holds without simulating the
+day if its load at that ScaleFactor is no more than another day's load at
+that day's rating in every interval, with no higher ambients and the load
+rising and falling in the same intervals, as the temperatures then only
+rise with the load and the ambients. That is not so when the winding rise
+overshoots on a load increase (f2 above one in AS60076.7 Eq. (5), such as
+for ONAN units at 30 minute intervals), so then, or otherwise, a single
+load cycle at that ScaleFactor is simulated (starting from the previous
+cyclic temperatures, on a copy of the transformer), and the day is only
+rated if a limit is reached.
+"""
+
+import copy
+
+import numpy as np
+
+
+def seasonal_rating(tx, LoadShapes, AmbWHS, AmbAgeing, Limits={}, Skip=True,
+                    **Options):
+    """ Rate a transformer against a stack of daily load shapes and ambients
+
+        tx          The Transformer to rate
+        LoadShapes  The load curve of each day (days x intervals, in MVA)
+        AmbWHS      The ambient of each day used for the temperatures [°C]
+        AmbAgeing   The ambient of each day used for the ageing [°C]
+        Limits      Current and temperature limits
+        Skip        Skip the days that cannot bind
+        Options     Passed on to Transformer.perform_rating (with the
+                    brent search and solved steady state unless another
+                    Search or SteadyState is given, as only these start from
+                    the previous day's rating and temperatures)
+
+    Returns a dict of the MaxLoad, ScaleFactor and RatingReason of each day
+    (NaN and None for days skipped), the index of the day that binds
+    (WorstDay), whether each day was Skipped, and the total work done
+    (NumEvaluations and NumWarmUpPasses). tx is left with the rating of the
+    last day rated.
+    """
+    Options.setdefault('Search', 'brent')
+    Options.setdefault('SteadyState', 'solve')
+    Warm = Options['Search'] == 'brent'
+    LoadShapes = np.asarray(LoadShapes, dtype=float)
+    NumDays = len(LoadShapes)
+    AmbWHS = np.broadcast_to(np.asarray(AmbWHS, dtype=float), (NumDays,))
+    AmbAgeing = np.broadcast_to(np.asarray(AmbAgeing, dtype=float), (NumDays,))
+    Peaks = LoadShapes.max(axis=1)
+
+    # Most severe days first, so the rest are more likely to be skipped
+    RMS = np.sqrt((LoadShapes ** 2).mean(axis=1))
+    dTOult, dWHS = tx.Thermal.ultimate_rises(RMS)
+    Order = np.argsort(-(AmbWHS + dTOult + dWHS), kind='stable')
+
+    MaxLoad = np.full(NumDays, np.nan)
+    ScaleFactor = np.full(NumDays, np.nan)
+    Reasons = np.full(NumDays, None, dtype=object)
+    Skipped = np.zeros(NumDays, dtype=bool)
+    Rated = []
+    NumEvaluations = NumWarmUpPasses = 0
+    WarmStart = None
+
+    for Day in Order:
+        if Skip and Rated:
+            Worst = np.nanmin(ScaleFactor)
+            if Monotone and dominated(
+                    LoadShapes[Day] * Worst, AmbWHS[Day], AmbAgeing[Day],
+                    LoadShapes[Rated] * ScaleFactor[Rated, None],
+                    AmbWHS[Rated], AmbAgeing[Rated]):
+                Skipped[Day] = True
+                continue
+            # Simulated on a copy, so tx keeps the rating of the last day rated
+            Check = copy.copy(tx)
+            Check.NumWarmUpPasses = 0
+            Limit = Check.CalculateLimit(
+                Worst, tx.t, tx.HeatRunData, tx.ThermalChar, Limits,
+                float(AmbWHS[Day]), float(AmbAgeing[Day]), list(LoadShapes[Day]),
+                tx.SteadyState,
+                Options.get('Tolerance', 0.000001),
+                (WarmStart['TOStart'], WarmStart['WHSStart']))[0]
+            NumEvaluations += 1
+            NumWarmUpPasses += Check.NumWarmUpPasses
+            if not Limit:
+                Skipped[Day] = True
+                continue
+
+        if WarmStart is not None:
+            # Start from the same peak load as the previous day
+            WarmStart = dict(WarmStart, ScaleFactor=WarmStart['ScaleFactor'] *
+                             Peaks[Rated[-1]] / Peaks[Day])
+        tx.perform_rating(float(AmbWHS[Day]), float(AmbAgeing[Day]),
+                          list(LoadShapes[Day]), Limits,
+                          WarmStart=WarmStart if Warm else None, **Options)
+        NumEvaluations += tx.NumEvaluations
+        NumWarmUpPasses += tx.NumWarmUpPasses
+        MaxLoad[Day] = tx.MaxLoad
+        ScaleFactor[Day] = tx.ScaleFactor
+        Reasons[Day] = tx.RatingReason
+        WarmStart = tx.WarmStart
+        Rated.append(Day)
+        # Temperatures only rise with the loads if the winding rise does not
+        # overshoot on a load increase
+        Monotone = tx.Thermal.winding_factors(tx.t)[0] <= 1
+
+    return {
+        'MaxLoad': MaxLoad,
+        'ScaleFactor': ScaleFactor,
+        'RatingReason': Reasons,
+        'WorstDay': int(np.nanargmin(ScaleFactor)),
+        'Skipped': Skipped,
+        'NumEvaluations': NumEvaluations,
+        'NumWarmUpPasses': NumWarmUpPasses,
+    }
+
+
+def dominated(Loads, AmbWHS, AmbAgeing, RatedLoads, RatedAmbWHS,
+              RatedAmbAgeing):
+    """ Check whether loads and ambients are no higher than those of any of
+    the rated days (one row of RatedLoads per day), in every interval, with
+    the loads increasing in the same intervals
+    """
+    Increasing = Loads > np.roll(Loads, 1)
+    RatedIncreasing = RatedLoads > np.roll(RatedLoads, 1, axis=1)
+    return bool(np.any(np.all(Loads <= RatedLoads, axis=1) &
+                       np.all(Increasing == RatedIncreasing, axis=1) &
+                       (AmbWHS <= RatedAmbWHS) & (AmbAgeing <= RatedAmbAgeing)))
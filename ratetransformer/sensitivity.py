@@ -0,0 +1,113 @@
+""" Sensitivity of the rating to the heat run data and thermal constants
+
+The heat run values (dTOr, gr, R, H), the thermal capacity and the exponents
+x and y are often uncertain, or defaulted from the cooling mode. The
+sensitivity of each unit's CRF to each of these is found by central
+differences: every unit is rated with each parameter moved up and down by a
+small relative Step, and all of these perturbed units are rated together as
+one batch by the fleet engine, warm started from the unperturbed ratings.
+
+The thermal capacity C enters the model only through the oil time constant
+TauR (which is proportional to it), so the sensitivity to C is reported as
+the sensitivity to TauR. A parameter is perturbed on its own, so TauR is not
+recalculated when dTOr changes.
+"""
+
+import numpy as np
+
+from ratetransformer.rate import DEFAULT_LIMITS
+from ratetransformer.fleet import bracket_parameters
+from ratetransformer.fleet import fleet_parameters
+from ratetransformer.fleet import transformer_parameters
+
+# Parameters perturbed by default
+SENSITIVITY_PARAMETERS = ('dTOr', 'gr', 'R', 'H', 'TauR', 'x', 'y')
+
+
+def sensitivity(Transformers, LoadShapes=None, Ambients=(25.0, 27.0),
+                Limits={}, **Options):
+    """ Find the sensitivity of the CRF of a list of existing Transformer
+    objects to their parameters, as per sensitivity_parameters
+    """
+    return sensitivity_parameters(transformer_parameters(Transformers),
+                                  LoadShapes, Ambients, Limits, **Options)
+
+
+def fleet_sensitivity(HeatRunArray, ThermalArray=None, LoadShapes=None,
+                      Ambients=(25.0, 27.0), Limits={}, **Options):
+    """ Find the sensitivity of the CRF of a fleet to its parameters, with
+    inputs as per rate_fleet and results as per sensitivity_parameters
+    """
+    return sensitivity_parameters(fleet_parameters(HeatRunArray, ThermalArray),
+                                  LoadShapes, Ambients, Limits, **Options)
+
+
+def sensitivity_parameters(Params, LoadShapes=None, Ambients=(25.0, 27.0),
+                           Limits={}, t=30.0, Parameters=SENSITIVITY_PARAMETERS,
+                           Step=0.01, Tolerance=0.0000001):
+    """ Find the sensitivity of each unit's CRF to each of its parameters
+
+        Params      Resolved fleet parameter arrays, as per fleet_parameters
+        LoadShapes  The cyclic load curves (units x intervals, in MVA)
+        Ambients    Tuple of (AmbWHS, AmbAgeing) as scalars or arrays
+        Limits      Current and temperature limits as scalars or arrays
+        t           Time Interval (min)
+        Parameters  Names of the parameters to perturb
+        Step        Perturbation, relative to each parameter's value (or
+                    absolute for parameters that are zero)
+        Tolerance   Tolerance on the ratings, relative to the load limit
+
+    Returns a dict of the unperturbed (unrounded) CRF and RatingReason of
+    each unit, the Parameters, and tables (units x parameters) of the change
+    in CRF per unit change of each parameter (Sensitivity) and the relative
+    change in CRF per relative change of each parameter (Elasticity). Where
+    the limit that binds changes within the Step, the sensitivity is the
+    average of the two sides.
+    """
+    Params = {k: np.asarray(v, dtype=float) for k, v in Params.items()}
+    N = len(Params['RatedLoad'])
+    if LoadShapes is None:
+        LoadShapes = np.ones((N, 48))
+    LoadShapes = np.broadcast_to(np.asarray(LoadShapes, dtype=float),
+                                 (N, np.shape(LoadShapes)[-1]))
+    Ambients = [np.broadcast_to(np.asarray(a, dtype=float), (N,))
+                for a in Ambients]
+    Limits = {key: np.broadcast_to(np.asarray(Limits.get(key, default),
+                                              dtype=float), (N,))
+              for key, default in DEFAULT_LIMITS.items()}
+    Peak = LoadShapes.max(axis=1)
+
+    Base = bracket_parameters(Params, LoadShapes, Ambients, Limits, t,
+                              Tolerance=Tolerance)
+    CRF = Base['ScaleFactor'] * Peak / Params['RatedLoad']
+
+    # Each parameter moved up then down, as blocks of all the units
+    NumBlocks = 2 * len(Parameters)
+    Perturbed = {k: np.tile(v, NumBlocks) for k, v in Params.items()}
+    Deltas = np.empty((N, len(Parameters)))
+    for i, key in enumerate(Parameters):
+        Values = Params[key]
+        Deltas[:, i] = np.where(Values != 0, Step * np.abs(Values), Step)
+        Perturbed[key][2 * i * N:(2 * i + 1) * N] = Values + Deltas[:, i]
+        Perturbed[key][(2 * i + 1) * N:(2 * i + 2) * N] = Values - Deltas[:, i]
+    Results = bracket_parameters(
+        Perturbed, np.tile(LoadShapes, (NumBlocks, 1)),
+        [np.tile(a, NumBlocks) for a in Ambients],
+        {k: np.tile(v, NumBlocks) for k, v in Limits.items()}, t,
+        Tolerance=Tolerance, Guess=np.tile(Base['ScaleFactor'], NumBlocks))
+
+    PerturbedCRF = (Results['ScaleFactor'] * np.tile(Peak, NumBlocks) /
+                    Perturbed['RatedLoad']).reshape(len(Parameters), 2, N)
+    Sensitivity = ((PerturbedCRF[:, 0] - PerturbedCRF[:, 1]).T /
+                   (2 * Deltas))
+    Values = np.column_stack([Params[key] for key in Parameters])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        Elasticity = np.where(CRF[:, None] > 0,
+                              Sensitivity * Values / CRF[:, None], 0.0)
+    return {
+        'CRF': CRF,
+        'RatingReason': Base['RatingReason'],
+        'Parameters': tuple(Parameters),
+        'Sensitivity': Sensitivity,
+        'Elasticity': Elasticity,
+    }
@@ -0,0 +1,214 @@
+""" Asyncio rating service that batches concurrent requests
+
+Rating requests are queued rather than each holding a worker for a whole
+scalar search. Requests that arrive within a short window of each other are
+rated together as one batch by the fleet engine (off the event loop), and a
+request identical to one already in flight waits on the same result rather
+than being rated again. The queue is bounded, so callers wait for space when
+the service falls behind.
+
+Units are dicts in the same layout as the example files in the tests folder
+(HeatRun, Thermal, AmbWHS, AmbAgeing, LoadShape, Limits). The results are
+those of Transformer.perform_rating with Search='brent', to within the
+Tolerance.
+
+    async with RatingService() as service:
+        results = await service.rate(Unit)
+"""
+
+import asyncio
+import collections
+import time
+
+import numpy as np
+
+from ratetransformer.rate import Transformer
+from ratetransformer.rate import DEFAULT_LIMITS
+from ratetransformer.cache import rating_key
+from ratetransformer.fleet import bracket_parameters
+from ratetransformer.fleet import transformer_parameters
+
+# Results returned for each request
+SERVICE_RESULTS = ('MaxLoad', 'MaxTOTemp', 'MaxWHSTemp', 'Ageing', 'CRF',
+                   'RatingReason', 'NumIterations')
+
+
+class RatingService:
+    """ Queue rating requests and rate them in batches
+    """
+
+    def __init__(self, Window=0.002, MaxBatch=1024, MaxQueue=4096,
+                 Tolerance=0.000001, t=30.0, Executor=None,
+                 MaxLatencies=10000):
+        """ Set up the service
+
+            Window          Time to wait for more requests before rating a
+                            batch [s]
+            MaxBatch        Most requests rated in one batch
+            MaxQueue        Most requests waiting to be rated, after which
+                            callers wait for space
+            Tolerance       Tolerance on the ratings, relative to the load limit
+            t               Time Interval (min)
+            Executor        concurrent.futures executor the batches are rated
+                            in (defaults to the event loop's thread pool)
+            MaxLatencies    Number of recent latencies kept for the stats
+        """
+        self.Window = Window
+        self.MaxBatch = MaxBatch
+        self.MaxQueue = MaxQueue
+        self.Tolerance = Tolerance
+        self.t = t
+        self.Executor = Executor
+        self.Latencies = collections.deque(maxlen=MaxLatencies)
+        self.InFlight = {}
+        self.NumRequests = 0
+        self.NumDeduped = 0
+        self.NumBatches = 0
+        self.NumBatched = 0
+        self.Queue = None
+        self._worker = None
+
+    async def start(self):
+        """ Start rating queued requests on the running event loop
+        """
+        if self._worker is not None:
+            raise RuntimeError('RatingService is already running')
+        self.Queue = asyncio.Queue(self.MaxQueue)
+        self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """ Rate the requests already queued, then stop
+        """
+        if self._worker is None:
+            return
+        await self.Queue.put(None)
+        await self._worker
+        self._worker = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *args):
+        await self.stop()
+
+    async def rate(self, Unit):
+        """ Rate a unit, waiting for space in the queue if it is full
+        Returns a dict of the results
+        """
+        if self._worker is None:
+            raise RuntimeError('RatingService is not running')
+        Start = time.perf_counter()
+        self.NumRequests += 1
+        Key = rating_key(Unit['HeatRun'], Unit.get('Thermal', {}),
+                         Unit.get('AmbWHS', 25.0), Unit.get('AmbAgeing', 27.0),
+                         Unit.get('LoadShape', []), Unit.get('Limits', {}),
+                         {'Tolerance': self.Tolerance, 't': self.t})
+        future = self.InFlight.get(Key)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self.InFlight[Key] = future
+            try:
+                await self.Queue.put((Key, Unit, future))
+            except BaseException:
+                # Never queued, so release anyone waiting on it
+                del self.InFlight[Key]
+                future.cancel()
+                raise
+        else:
+            self.NumDeduped += 1
+        try:
+            # Shielded so one caller giving up does not cancel the others
+            return dict(await asyncio.shield(future))
+        finally:
+            self.Latencies.append(time.perf_counter() - Start)
+
+    def stats(self, Percentiles=(50, 95, 99)):
+        """ Get the request counts and latency percentiles [ms]
+        """
+        Stats = {
+            'NumRequests': self.NumRequests,
+            'NumDeduped': self.NumDeduped,
+            'NumBatches': self.NumBatches,
+            'MeanBatchSize': (self.NumBatched / self.NumBatches
+                              if self.NumBatches else None),
+            'QueueSize': self.Queue.qsize() if self.Queue is not None else 0,
+        }
+        Latencies = np.array(self.Latencies) * 1000
+        for q in Percentiles:
+            Stats['LatencyP{:g}Ms'.format(q)] = (
+                float(np.percentile(Latencies, q)) if len(Latencies) else None)
+        return Stats
+
+    async def _run(self):
+        """ Take batches from the queue and rate them, until stopped
+        """
+        loop = asyncio.get_running_loop()
+        Running = True
+        while Running:
+            Batch = [await self.Queue.get()]
+            if self.Window > 0 and self.Queue.qsize() < self.MaxBatch - 1:
+                await asyncio.sleep(self.Window)
+            while len(Batch) < self.MaxBatch and not self.Queue.empty():
+                Batch.append(self.Queue.get_nowait())
+            if None in Batch:
+                Running = False
+                Batch = [Request for Request in Batch if Request is not None]
+            if not Batch:
+                continue
+
+            Keys, Units, futures = zip(*Batch)
+            try:
+                Results = await loop.run_in_executor(
+                    self.Executor, rate_batch, Units, self.Tolerance, self.t)
+            except Exception as e:
+                Results = [e] * len(Batch)
+            self.NumBatches += 1
+            self.NumBatched += len(Batch)
+            for Key, future, Result in zip(Keys, futures, Results):
+                del self.InFlight[Key]
+                if future.done():
+                    continue
+                if isinstance(Result, Exception):
+                    future.set_exception(Result)
+                else:
+                    future.set_result(Result)
+
+
+def rate_batch(Units, Tolerance=0.000001, t=30.0):
+    """ Rate units together with the fleet engine
+    Units with the same number of load intervals are rated in one pass.
+    Returns a list of result dicts, or of the exception raised for a unit
+    that could not be set up, in the same order as Units
+    """
+    Results = [None] * len(Units)
+    Groups = collections.defaultdict(list)
+    for i, Unit in enumerate(Units):
+        try:
+            tx = Transformer(Unit['HeatRun'], Unit.get('Thermal', {}))
+            LoadShape = [float(v) for v in Unit.get('LoadShape', [])]
+            if LoadShape == []:
+                LoadShape = [1.0] * 48
+            Limits = dict(DEFAULT_LIMITS, **Unit.get('Limits', {}))
+            Ambients = (float(Unit.get('AmbWHS', 25.0)),
+                        float(Unit.get('AmbAgeing', 27.0)))
+        except Exception as e:
+            Results[i] = e
+            continue
+        Groups[len(LoadShape)].append((i, tx, LoadShape, Ambients, Limits))
+
+    for Group in Groups.values():
+        idx, Transformers, LoadShapes, Ambients, Limits = zip(*Group)
+        Rated = bracket_parameters(
+            transformer_parameters(Transformers), LoadShapes,
+            tuple(np.array(Ambients).T),
+            {key: [l[key] for l in Limits] for key in DEFAULT_LIMITS},
+            t, Tolerance=Tolerance)
+        for j, i in enumerate(idx):
+            Result = {key: Rated[key][j] for key in SERVICE_RESULTS}
+            Result = {key: v.item() if isinstance(v, np.generic) else v
+                      for key, v in Result.items()}
+            if Result['RatingReason'] == 'Did not converge':
+                Result['Error'] = Result['RatingReason']
+            Results[i] = Result
+    return Results
@@ -0,0 +1,182 @@
+""" Streaming thermal simulation over long load and ambient histories
+
+Records of (timestamp, load, ambient) are consumed one at a time and the
+AS60076.7 top oil and winding equations are stepped over the interval since
+the previous record, so memory use does not depend on the length of the
+history and intervals do not need to be evenly spaced.
+
+ThermalTracker keeps the state of one transformer between measurements, for
+live estimates, and FleetTracker advances many transformers together with
+one array operation per measurement.
+"""
+
+import datetime
+
+import numpy as np
+
+from ratetransformer.rate import relative_ageing_rate
+from ratetransformer import fleet
+
+
+class ThermalTracker:
+    """ The live thermal state of a transformer
+    """
+
+    def __init__(self, tx, Load=None, InitialState=None):
+        """ Set up the tracker
+
+            tx              The Transformer to track
+            Load            Load to start in steady state at (in MVA)
+            InitialState    Starting (top oil rise, winding rise), instead
+                            of the steady state at Load (or zero if neither)
+        """
+        self.Thermal = tx.Thermal
+        self.Load = 0.0 if Load is None else Load
+        if InitialState is not None:
+            self.TOrise, self.WHSrise = InitialState
+        elif Load is not None:
+            self.TOrise, self.WHSrise = self.Thermal.ultimate_rises(Load)
+        else:
+            self.TOrise, self.WHSrise = 0.0, 0.0
+        self.LoL = 0.0  # Loss of life since the tracker started [h]
+        self._t = None  # Interval the winding factors are cached for
+
+    def update(self, dt, Load, Ambient):
+        """ Advance the state over an interval of dt minutes, during which
+        Load (MVA) and Ambient (°C) applied
+        Returns the top oil and hot spot temperatures at the end of it
+        """
+        if dt <= 0:
+            raise ValueError('Interval must be positive, not {}'.format(dt))
+        Thermal = self.Thermal
+        if dt != self._t:
+            self._t = dt
+            self._factors = Thermal.winding_factors(dt)
+
+        dTOult, dWHS = Thermal.ultimate_rises(Load)
+        self.TOrise = Thermal.top_oil_rise(dt, self.TOrise, dTOult)
+        self.WHSrise = Thermal.winding_rise(self.WHSrise, dWHS, Load > self.Load,
+                                            *self._factors)
+        self.Load = Load
+        WHStemp = Ambient + self.TOrise + self.WHSrise
+        self.LoL += relative_ageing_rate(WHStemp) * dt / 60
+        return Ambient + self.TOrise, WHStemp
+
+
+class FleetTracker:
+    """ The live thermal state of many transformers, updated together
+    """
+
+    def __init__(self, Transformers, Loads=None):
+        """ Set up the tracker
+
+            Transformers    The Transformers to track
+            Loads           Loads to start in steady state at (in MVA), or
+                            None to start with no temperature rise
+        """
+        self.Params = fleet.transformer_parameters(Transformers)
+        N = len(Transformers)
+        if Loads is None:
+            self.Loads = np.zeros(N)
+            self.TOrise = np.zeros(N)
+            self.WHSrise = np.zeros(N)
+        else:
+            self.Loads = np.array(Loads, dtype=float)
+            self.TOrise, self.WHSrise = self.ultimate_rises(self.Loads)
+        self.LoL = np.zeros(N)  # Loss of life since the tracker started [h]
+
+    def ultimate_rises(self, Loads):
+        """ Ultimate top oil and winding rises for each unit's load
+        """
+        Params = self.Params
+        K = Loads / Params['RatedLoad']
+        dTOult = Params['dTOr'] * (((K ** 2) * Params['R'] + 1) /
+                                   (Params['R'] + 1)) ** Params['x']
+        dWHS = Params['H'] * Params['gr'] * (K ** Params['y'])
+        return dTOult, dWHS
+
+    def update_many(self, dt, Loads, Ambients):
+        """ Advance every unit over an interval of dt minutes (a scalar or
+        one per unit), during which Loads (MVA) and Ambients (°C) applied
+        Returns arrays of the top oil and hot spot temperatures at the end
+        """
+        dt = np.asarray(dt, dtype=float)
+        if (dt <= 0).any():
+            raise ValueError('Intervals must be positive')
+        Loads = np.asarray(Loads, dtype=float)
+        Ambients = np.asarray(Ambients, dtype=float)
+        dTOult, dWHS = self.ultimate_rises(Loads)
+        TOrise, WHSrise = fleet.simulate_pass(
+            self.Params, dTOult[:, None], dWHS[:, None],
+            (Loads > self.Loads)[:, None], self.TOrise, self.WHSrise, dt)
+        self.TOrise = TOrise[:, 0]
+        self.WHSrise = WHSrise[:, 0]
+        self.Loads = Loads
+        WHStemp = Ambients + self.TOrise + self.WHSrise
+        self.LoL += fleet.relative_ageing_rate(WHStemp) * dt / 60
+        return Ambients + self.TOrise, WHStemp
+
+
+def simulate_stream(tx, Records, InitialState=None):
+    """ Simulate the thermal response of a transformer to a stream of records
+
+        tx              The Transformer to simulate
+        Records         Iterable of (timestamp, load, ambient), where the
+                        timestamp is a datetime or a number of minutes, load
+                        is in MVA and ambient in °C. Each load and ambient
+                        applies over the interval ending at its timestamp.
+        InitialState    Starting (top oil rise, winding rise), or None to
+                        start in steady state at the first record's load
+
+    Yields (timestamp, TOtemp, WHStemp, LoL) for each record, where LoL is
+    the cumulative loss of life in hours since the first record
+    """
+    Records = iter(Records)
+    try:
+        Time, Load, Ambient = next(Records)
+    except StopIteration:
+        return
+
+    Tracker = ThermalTracker(tx, Load, InitialState)
+    TOtemp = Ambient + Tracker.TOrise
+    yield Time, TOtemp, TOtemp + Tracker.WHSrise, Tracker.LoL
+
+    PrevTime = Time
+    for Time, Load, Ambient in Records:
+        dt = interval_minutes(PrevTime, Time)
+        if dt <= 0:
+            raise ValueError('Records are not in time order at {}'.format(Time))
+        TOtemp, WHStemp = Tracker.update(dt, Load, Ambient)
+        yield Time, TOtemp, WHStemp, Tracker.LoL
+        PrevTime = Time
+
+
+def summarise_stream(tx, Records, InitialState=None):
+    """ Simulate a stream of records and return the maximum temperatures
+    and total loss of life, without keeping the simulated values
+
+    Returns a dict with MaxTOTemp, MaxWHSTemp (and the timestamps they
+    occurred at), LoL (hours) and the number of records
+    """
+    Summary = {'MaxTOTemp': None, 'MaxTOTime': None,
+               'MaxWHSTemp': None, 'MaxWHSTime': None,
+               'LoL': 0.0, 'NumRecords': 0}
+    for Time, TOtemp, WHStemp, LoL in simulate_stream(tx, Records, InitialState):
+        if Summary['MaxTOTemp'] is None or TOtemp > Summary['MaxTOTemp']:
+            Summary['MaxTOTemp'] = TOtemp
+            Summary['MaxTOTime'] = Time
+        if Summary['MaxWHSTemp'] is None or WHStemp > Summary['MaxWHSTemp']:
+            Summary['MaxWHSTemp'] = WHStemp
+            Summary['MaxWHSTime'] = Time
+        Summary['LoL'] = LoL
+        Summary['NumRecords'] += 1
+    return Summary
+
+
+def interval_minutes(Start, End):
+    """ Get the time between two timestamps in minutes
+    """
+    dt = End - Start
+    if isinstance(dt, datetime.timedelta):
+        return dt.total_seconds() / 60
+    return float(dt)
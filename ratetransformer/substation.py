@@ -0,0 +1,112 @@
+""" Firm (N-1) ratings of substations with parallel transformers
+
+Parallel units share the station load in fixed proportions: by rating, or
+by impedance (each unit's share of the load in service is proportional to
+its rating over its per unit impedance). The firm rating is the highest
+station load at which, after losing any one unit (or any NumOutages units),
+the units left in service all stay within their limits.
+
+Every unit carries a fixed share of the same station load shape, and its
+temperatures only rise with its load, so each unit only needs rating once:
+if the station load shape can be scaled by R before the unit reaches a limit
+carrying all of it, it can be scaled by R / Share when carrying Share of it.
+All units are rated together by the fleet engine, and the station scale
+factor of every outage case then follows as an array operation, rather than
+searching each case (and unit) separately.
+"""
+
+import itertools
+
+import numpy as np
+
+from ratetransformer.fleet import bracket_parameters
+from ratetransformer.fleet import transformer_parameters
+
+
+def firm_rating(Transformers, LoadShape=[], AmbWHS=25.0, AmbAgeing=27.0,
+                Limits={}, Sharing='rating', Impedances=None, NumOutages=1,
+                Tolerance=0.000001, t=30.0):
+    """ Find the firm rating of a substation's parallel transformers
+
+        Transformers    The Transformer objects in parallel
+        LoadShape       The cyclic load curve of the station (in MVA)
+        AmbWHS          The monthly average temperature of the hottest month [°C]
+        AmbAgeing       The yearly weighted ambient temperature [°C]
+        Limits          Current and temperature limits, as scalars or with
+                        one value per unit
+        Sharing         'rating' to share the load in proportion to the
+                        rated loads, or 'impedance' to share it by impedance
+        Impedances      Impedance of each unit [pu on its own rating]
+                        ('impedance' sharing only)
+        NumOutages      Number of units lost in each outage case (0 for the
+                        rating with every unit in service)
+        Tolerance       Tolerance on the unit ratings, relative to the load
+                        limit
+
+    Returns a dict of the FirmRating (peak station load, in MVA), the
+    station ScaleFactor, the units lost in the outage case that binds
+    (BindingOutage), the unit that reaches a limit first in that case
+    (BindingUnit) and its RatingReason, along with the outage Cases, the
+    rating of the station in each (CaseRatings), the share of the station
+    load carried by each unit in each (Shares, cases x units), the rating
+    of each unit carrying the whole station load shape (UnitRatings) and
+    the rating with every unit in service (IntactRating)
+    """
+    N = len(Transformers)
+    if N == 0:
+        raise ValueError('A substation needs at least one transformer')
+    if not 0 <= NumOutages < N:
+        raise ValueError('NumOutages must be less than the number of transformers')
+    if len(LoadShape) == 0:
+        LoadShape = [1.0] * 48
+    LoadShape = np.asarray(LoadShape, dtype=float)
+    Weights = sharing_weights(Transformers, Sharing, Impedances)
+
+    # Rate every unit as if it carried the whole station load
+    Results = bracket_parameters(
+        transformer_parameters(Transformers), np.tile(LoadShape, (N, 1)),
+        (AmbWHS, AmbAgeing), Limits, t, Tolerance=Tolerance)
+    UnitScale = Results['ScaleFactor']
+
+    Cases = [()]  # Every unit in service, then each outage
+    if NumOutages:
+        Cases += list(itertools.combinations(range(N), NumOutages))
+    InService = np.ones((len(Cases), N), dtype=bool)
+    for i, Lost in enumerate(Cases):
+        InService[i, list(Lost)] = False
+    Shares = np.where(InService, Weights, 0.0)
+    Shares /= Shares.sum(axis=1, keepdims=True)
+
+    # Station scaling at which each unit reaches a limit, in each case
+    with np.errstate(divide='ignore'):
+        Scale = np.where(InService, UnitScale / Shares, np.inf)
+    Binding = Scale.argmin(axis=1)
+    CaseScale = Scale[np.arange(len(Cases)), Binding]
+    Peak = LoadShape.max()
+
+    Worst = 1 + int(CaseScale[1:].argmin()) if NumOutages else 0
+    return {
+        'FirmRating': round(float(CaseScale[Worst] * Peak), 3),
+        'ScaleFactor': float(CaseScale[Worst]),
+        'BindingOutage': Cases[Worst],
+        'BindingUnit': int(Binding[Worst]),
+        'RatingReason': Results['RatingReason'][Binding[Worst]],
+        'Cases': Cases,
+        'CaseRatings': np.array([round(v, 3) for v in CaseScale * Peak]),
+        'Shares': Shares,
+        'UnitRatings': Results['MaxLoad'],
+        'IntactRating': round(float(CaseScale[0] * Peak), 3),
+    }
+
+
+def sharing_weights(Transformers, Sharing='rating', Impedances=None):
+    """ Relative share of the load carried by each unit while in service
+    """
+    RatedLoad = np.array([tx.RatedLoad for tx in Transformers], dtype=float)
+    if Sharing == 'rating':
+        return RatedLoad
+    elif Sharing == 'impedance':
+        if Impedances is None or len(Impedances) != len(Transformers):
+            raise ValueError('Impedance sharing needs the impedance of each unit')
+        return RatedLoad / np.asarray(Impedances, dtype=float)
+    raise ValueError('Unknown load sharing: {}'.format(Sharing))
@@ -0,0 +1,223 @@
+""" Precomputed rating surfaces for fast lookups
+
+A rating surface holds the rating of a transformer over a grid of ambient
+temperatures and (optionally) load factors, and interpolates between them,
+so a rating can be looked up in microseconds rather than solved for.
+
+The ambient is the hottest month ambient (AmbWHS), with the weighted ambient
+(AmbAgeing) a fixed offset from it. The load factor (average / peak) varies
+the load shape by blending it towards a flat load, or away from it by
+deepening its troughs. The grid points are rated together by the fleet
+engine, and the interpolation error is checked against the model at the
+midpoints between them.
+
+Surfaces with the same grid sizes are saved together as a structured .npy
+file, which can be memory mapped so that many units load without parsing.
+"""
+
+import bisect
+
+import numpy as np
+
+from ratetransformer.fleet import bracket_parameters
+from ratetransformer.fleet import transformer_parameters
+
+
+class RatingSurface:
+    """ The rating of a transformer over a grid of ambients and load factors
+    """
+
+    def __init__(self, Ambients, LoadFactors, MaxLoad, AgeingOffset=0.0,
+                 MaxError=None):
+        """ Set up the surface
+
+            Ambients        Ambient temperatures of the grid (ascending) [°C]
+            LoadFactors     Load factors of the grid (ascending)
+            MaxLoad         Ratings at each ambient and load factor [MVA]
+            AgeingOffset    AmbAgeing - AmbWHS the surface was rated with [°C]
+            MaxError        Largest interpolation error found [MVA]
+        """
+        self.Ambients = np.asarray(Ambients)
+        self.LoadFactors = np.asarray(LoadFactors)
+        self.MaxLoad = np.asarray(MaxLoad).reshape(len(self.Ambients),
+                                                   len(self.LoadFactors))
+        self.AgeingOffset = float(AgeingOffset)
+        self.MaxError = MaxError
+
+        # Python lists are quicker to search than small arrays
+        self._ambients = [float(a) for a in self.Ambients]
+        self._load_factors = [float(f) for f in self.LoadFactors]
+
+    @classmethod
+    def build(cls, tx, Ambients, LoadShape=[], LoadFactors=None,
+              AgeingOffset=2.0, Limits={}, Check=True, t=30.0):
+        """ Rate a transformer over a grid and check the interpolation error
+
+            tx              The Transformer to rate
+            Ambients        Ambient temperatures (AmbWHS) to rate at [°C]
+            LoadShape       The cyclic load curve to be considered
+            LoadFactors     Load factors to rate at, or None to only use the
+                            load factor of LoadShape
+            AgeingOffset    AmbAgeing - AmbWHS [°C]
+            Limits          Current and temperature limits
+            Check           Rate the midpoints of the grid to find MaxError
+        """
+        if len(LoadShape) == 0:
+            LoadShape = [1.0] * 48
+        Ambients = np.asarray(sorted(Ambients), dtype=float)
+        if LoadFactors is None:
+            LoadFactors = [load_factor(LoadShape)]
+        LoadFactors = np.asarray(sorted(LoadFactors), dtype=float)
+
+        MaxLoad = rate_grid(tx, Ambients, LoadFactors, LoadShape,
+                            AgeingOffset, Limits, t)
+        Surface = cls(Ambients, LoadFactors, MaxLoad, AgeingOffset)
+        if Check:
+            MidAmbients = midpoints(Ambients)
+            MidLoadFactors = midpoints(LoadFactors)
+            Exact = rate_grid(tx, MidAmbients, MidLoadFactors, LoadShape,
+                              AgeingOffset, Limits, t)
+            Error = [abs(Surface.rating(a, f) - Exact[i, j])
+                     for i, a in enumerate(MidAmbients)
+                     for j, f in enumerate(MidLoadFactors)]
+            Surface.MaxError = max(Error)
+        return Surface
+
+    def rating(self, Ambient, LoadFactor=None):
+        """ Interpolate the rating (MVA) at an ambient and load factor
+        Raises ValueError outside of the grid, including for any load factor
+        other than the only one of a single load factor surface
+        """
+        i, u = _locate(self._ambients, Ambient)
+        if LoadFactor is None:
+            j, v = 0, 0.0
+        else:
+            j, v = _locate(self._load_factors, LoadFactor)
+        M = self.MaxLoad
+        i1 = min(i + 1, M.shape[0] - 1)
+        j1 = min(j + 1, M.shape[1] - 1)
+        Rating = ((1 - u) * ((1 - v) * M[i, j] + v * M[i, j1]) +
+                  u * ((1 - v) * M[i1, j] + v * M[i1, j1]))
+        return float(Rating)
+
+    def to_record(self, dtype=None):
+        """ Convert the surface into a record of a structured array
+        """
+        if dtype is None:
+            dtype = surface_dtype(len(self.Ambients), len(self.LoadFactors))
+        Record = np.zeros((), dtype=dtype)
+        Record['Ambients'] = self.Ambients
+        Record['LoadFactors'] = self.LoadFactors
+        Record['MaxLoad'] = self.MaxLoad
+        Record['AgeingOffset'] = self.AgeingOffset
+        Record['MaxError'] = np.nan if self.MaxError is None else self.MaxError
+        return Record
+
+    @classmethod
+    def from_record(cls, Record):
+        """ Get the surface held in a record, without copying the arrays
+        """
+        MaxError = float(Record['MaxError'])
+        return cls(Record['Ambients'], Record['LoadFactors'], Record['MaxLoad'],
+                   float(Record['AgeingOffset']),
+                   None if np.isnan(MaxError) else MaxError)
+
+
+def surface_dtype(NumAmbients, NumLoadFactors):
+    """ Structured dtype for surfaces with the given grid sizes
+    """
+    return np.dtype([
+        ('Ambients', '<f8', (NumAmbients,)),
+        ('LoadFactors', '<f8', (NumLoadFactors,)),
+        ('MaxLoad', '<f4', (NumAmbients, NumLoadFactors)),
+        ('AgeingOffset', '<f8'),
+        ('MaxError', '<f4'),
+    ])
+
+
+def save_surfaces(Path, Surfaces):
+    """ Save surfaces with the same grid sizes to a .npy file
+    """
+    Surfaces = list(Surfaces)
+    dtype = surface_dtype(len(Surfaces[0].Ambients),
+                          len(Surfaces[0].LoadFactors))
+    Records = np.zeros(len(Surfaces), dtype=dtype)
+    for i, Surface in enumerate(Surfaces):
+        if Surface.MaxLoad.shape != Records['MaxLoad'].shape[1:]:
+            raise ValueError('Surfaces saved together must have the same grid sizes')
+        Records[i] = Surface.to_record(dtype)
+    np.save(Path, Records)
+
+
+def load_surfaces(Path, mmap=True):
+    """ Load the surfaces saved by save_surfaces, memory mapping the file
+    unless mmap is False
+    """
+    Records = np.load(Path, mmap_mode='r' if mmap else None)
+    return [RatingSurface.from_record(Record) for Record in Records]
+
+
+def rate_grid(tx, Ambients, LoadFactors, LoadShape, AgeingOffset, Limits,
+              t=30.0):
+    """ Rate a transformer at every ambient and load factor together
+    Returns the ratings (ambients x load factors) [MVA]
+    """
+    Shapes = np.array([shape_at_load_factor(LoadShape, f) for f in LoadFactors])
+    NumAmbients, NumLoadFactors = len(Ambients), len(LoadFactors)
+    N = NumAmbients * NumLoadFactors
+    AmbWHS = np.repeat(Ambients, NumLoadFactors)
+    Params = transformer_parameters([tx])
+    Results = bracket_parameters(
+        {k: np.repeat(v, N) for k, v in Params.items()},
+        np.tile(Shapes, (NumAmbients, 1)), (AmbWHS, AmbWHS + AgeingOffset),
+        Limits, t)
+    return Results['MaxLoad'].reshape(NumAmbients, NumLoadFactors)
+
+
+def load_factor(LoadShape):
+    """ Get the load factor (average / peak) of a load shape
+    """
+    return sum(LoadShape) / (len(LoadShape) * max(LoadShape))
+
+
+def shape_at_load_factor(LoadShape, LoadFactor):
+    """ Blend a load shape towards a flat load (or away from it, deepening
+    the troughs) until it has the given load factor
+    Returns the load shape as a fraction of its peak
+    """
+    Shape = np.asarray(LoadShape, dtype=float)
+    Shape = Shape / Shape.max()
+    Current = Shape.mean()
+    if Current == 1.0:
+        if LoadFactor != 1.0:
+            raise ValueError('A flat load shape only has a load factor of 1')
+        return Shape
+    Blend = (LoadFactor - Current) / (1 - Current)
+    Shaped = Shape + Blend * (1 - Shape)
+    if LoadFactor > 1 or Shaped.min() < -1e-12:
+        raise ValueError('Load factor {} is out of range for the load shape'.format(
+            LoadFactor))
+    return np.maximum(Shaped, 0.0)
+
+
+def midpoints(Values):
+    """ Get the values halfway between each pair of grid values, or the
+    grid value itself if there is only one
+    """
+    Values = np.asarray(Values, dtype=float)
+    if len(Values) == 1:
+        return Values
+    return (Values[:-1] + Values[1:]) / 2
+
+
+def _locate(Grid, Value):
+    """ Find the grid interval containing a value
+    Returns the index of the interval and the fraction along it
+    """
+    if not Grid[0] <= Value <= Grid[-1]:
+        raise ValueError('{} is outside of the surface ({} to {})'.format(
+            Value, Grid[0], Grid[-1]))
+    i = min(bisect.bisect_right(Grid, Value) - 1, len(Grid) - 2)
+    if i < 0:
+        return 0, 0.0  # Only one grid value
+    return i, (Value - Grid[i]) / (Grid[i + 1] - Grid[i])
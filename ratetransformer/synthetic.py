@@ -0,0 +1,117 @@
+""" Reproducible synthetic fleets for testing and benchmarking
+
+Each unit is a dict in the same layout as the example files in the tests
+folder (HeatRun, Thermal, AmbWHS, AmbAgeing, LoadShape, Limits), so a fleet
+can be passed straight to rate_many, or to rate_fleet via fleet_columns.
+Units are drawn from a seeded random generator, so the same seed always
+gives the same fleet.
+"""
+
+import math
+import random
+
+# Cooling modes in the fleet, and their share of the units
+COOLING_MODES = (('ONAN', 0.4), ('ONAF', 0.3), ('OFAF', 0.2), ('ODAF', 0.1))
+
+# Nameplate ratings to choose from [MVA]
+RATED_LOADS = (5.0, 10.0, 15.0, 20.0, 25.0, 30.0, 40.0, 60.0)
+
+# Daily load profiles as (peak hour, peak width [h], base load [pu of peak])
+PROFILES = {
+    'Residential': (18.5, 2.5, 0.45),
+    'Commercial': (13.0, 4.5, 0.35),
+    'Industrial': (11.0, 7.0, 0.70),
+}
+
+
+def synthetic_fleet(NumUnits, Seed=0, Intervals=48, RandomLimits=False):
+    """ Generate a fleet of synthetic units
+
+        NumUnits        Number of units in the fleet
+        Seed            Seed for the random generator
+        Intervals       Number of load values in each daily load shape
+        RandomLimits    Draw the limits of each unit, rather than using
+                        the defaults
+
+    Returns a list of unit dicts
+    """
+    rng = random.Random(Seed)
+    return [synthetic_unit(rng, Intervals, RandomLimits) for i in range(NumUnits)]
+
+
+def synthetic_unit(rng, Intervals=48, RandomLimits=False):
+    """ Generate a single unit from a random generator
+    """
+    Modes, Weights = zip(*COOLING_MODES)
+    CoolingMode = rng.choices(Modes, Weights)[0]
+    RatedLoad = rng.choice(RATED_LOADS)
+    Directed = CoolingMode.startswith('OD')
+
+    HeatRun = {
+        'CoolingMode': CoolingMode,
+        'RatedLoad': RatedLoad,
+        'dTOr': round(rng.uniform(35.0, 55.0), 1),
+        'gr': round(rng.uniform(20.0, 30.0) if Directed else rng.uniform(13.0, 25.0), 1),
+        'H': rng.choice((1.1, 1.2, 1.3)),
+        'P': round(RatedLoad * rng.uniform(600.0, 1000.0), 1),
+        'R': round(rng.uniform(3.0, 25.0), 3),
+    }
+    Thermal = {'C': round(RatedLoad * rng.uniform(250.0, 600.0), 1)}
+
+    AmbWHS = round(rng.uniform(20.0, 32.0), 2)
+    Profile = rng.choice(sorted(PROFILES))
+    Peak = RatedLoad * rng.uniform(0.6, 1.2)
+    Unit = {
+        'HeatRun': HeatRun,
+        'Thermal': Thermal,
+        'AmbWHS': AmbWHS,
+        'AmbAgeing': round(AmbWHS - rng.uniform(2.0, 8.0), 2),
+        'LoadShape': daily_load_shape(rng, Profile, Peak, Intervals),
+        'Limits': {},
+    }
+    if RandomLimits:
+        Unit['Limits'] = random_limits(rng)
+    return Unit
+
+
+def random_limits(rng):
+    """ Draw a set of limits around those of AS60076.7 Table 4
+    """
+    TopOil = round(rng.uniform(95.0, 115.0), 1)
+    return {
+        'MaxLoadPU': round(rng.uniform(1.2, 2.0), 2),
+        'TopOil': TopOil,
+        'HotSpot': round(rng.uniform(TopOil + 10.0, 150.0), 1),
+        'LoL': round(rng.uniform(6.0, 48.0), 1),
+    }
+
+
+def daily_load_shape(rng, Profile, Peak, Intervals=48):
+    """ Generate a daily load shape (MVA) for one of the PROFILES, with a
+    random shift in the peak time and noise in each interval
+    """
+    PeakHour, Width, Base = PROFILES[Profile]
+    PeakHour += rng.uniform(-1.0, 1.0)
+    Hours = 24.0 / Intervals
+    LoadShape = []
+    for i in range(Intervals):
+        Hour = (i + 0.5) * Hours
+        Distance = min(abs(Hour - PeakHour), 24.0 - abs(Hour - PeakHour))
+        Load = Base + (1 - Base) * math.exp(-0.5 * (Distance / Width) ** 2)
+        LoadShape.append(Load * rng.uniform(0.95, 1.05))
+    Scale = Peak / max(LoadShape)
+    return [round(Load * Scale, 4) for Load in LoadShape]
+
+
+def fleet_columns(Units):
+    """ Convert a list of unit dicts into the inputs of rate_fleet
+
+    Returns (HeatRunArray, ThermalArray, LoadShapes, Ambients), taking the
+    load shapes from every unit and the limits as defaults
+    """
+    HeatRunArray = [Unit['HeatRun'] for Unit in Units]
+    ThermalArray = [Unit.get('Thermal', {}) for Unit in Units]
+    LoadShapes = [Unit['LoadShape'] for Unit in Units]
+    Ambients = ([Unit.get('AmbWHS', 25.0) for Unit in Units],
+                [Unit.get('AmbAgeing', 27.0) for Unit in Units])
+    return HeatRunArray, ThermalArray, LoadShapes, Ambients
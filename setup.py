@@ -2,6 +2,7 @@ from distutils.core import setup
 setup(
     name = 'ratetransformer',
     packages = ['ratetransformer'],
+    package_data = {'ratetransformer': ['baseline.json']},
     version = '2.1',
     description = 'Rate Transformer',
     author = 'aguinane',
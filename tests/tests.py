@@ -1,7 +1,31 @@
 import unittest
 from ratetransformer import rate
 from ratetransformer import Transformer
+from ratetransformer import fleet
+from ratetransformer import parallel
+from ratetransformer import stream
+from ratetransformer import cache
+from ratetransformer import synthetic
+from ratetransformer import probabilistic
+from ratetransformer import surface
+from ratetransformer import service
+from ratetransformer import kernels
+from ratetransformer import columnar
+from ratetransformer import emergency
+from ratetransformer import seasonal
+from ratetransformer import sensitivity
+from ratetransformer import differential
+from ratetransformer import substation
+import asyncio
+import csv
+import os
+import subprocess
+import sys
+import threading
+import tempfile
+import datetime
 import yaml
+import numpy as np
 
 
 class TestRateTx(unittest.TestCase):
@@ -12,7 +36,7 @@ class TestRateTx(unittest.TestCase):
         """ Test the calculated rating for example1.yaml
         """
         with open('tests/example1.yaml', newline='') as example_file:
-            data = yaml.load(example_file)
+            data = yaml.safe_load(example_file)
 
         HeatRunData = data['HeatRun']
         ThermalChar = data['Thermal']
@@ -38,7 +62,7 @@ class TestRateTx(unittest.TestCase):
         """ Test the calculated rating for example2.yaml
         """
         with open('tests/example2.yaml', newline='') as example_file:
-            data = yaml.load(example_file)
+            data = yaml.safe_load(example_file)
 
         HeatRunData = data['HeatRun']
         ThermalChar = {}
@@ -127,6 +151,1177 @@ class TestRecommendedCharacteristic(unittest.TestCase):
         k11, k21, k22 = rate.recommended_thermal_constants(cooling_mode='OF')
         self.assertEqual((k11, k21, k22), (1.0, 1.3, 1.0))
 
+    def test_cooling_mode_registry(self):
+        self.assertEqual(rate.determine_oil_thermal_time_constant('ON', None, 0, 0), 210.0)
+        self.assertEqual(rate.determine_oil_thermal_time_constant('OB', None, 0, 0), 150.0)
+        self.assertEqual(rate.recommended_thermal_constants('OFAF'), (1.0, 1.3, 1.0))
+        self.assertEqual(rate.recommended_winding_exponent('odaf'), 2.0)
+        with self.assertRaises(ValueError):
+            rate.recommended_oil_exponent('AN')
+
+    def test_unlisted_cooling_mode(self):
+        with open('tests/example1.yaml', newline='') as example_file:
+            data = yaml.safe_load(example_file)
+        HeatRun = dict(data['HeatRun'], CoolingMode='KNAN')
+        with self.assertRaises(ValueError):
+            Transformer(HeatRun, data['Thermal'])  # n is not given
+        tx = Transformer(HeatRun, dict(data['Thermal'], n=0.8))
+        expected = Transformer(data['HeatRun'], dict(data['Thermal'], n=0.8))
+        self.assertEqual(tx.Thermal, expected.Thermal)
+
+
+class TestThermalParameters(unittest.TestCase):
+    """ Tests the compiled thermal parameters
+    """
+
+    def setUp(self):
+        with open('tests/example1.yaml', newline='') as example_file:
+            data = yaml.safe_load(example_file)
+        self.tx = Transformer(data['HeatRun'], data['Thermal'])
+
+    def test_immutable(self):
+        with self.assertRaises(AttributeError):
+            self.tx.Thermal.dTOr = 40.0
+        with self.assertRaises(AttributeError):
+            self.tx.Thermal.Extra = 1.0
+
+    def test_precomputed(self):
+        Thermal = self.tx.Thermal
+        TauR = rate.thermal_time_constant_at_rated_load(10507.3, 20220.0, 35.4)
+        self.assertAlmostEqual(Thermal.TauR, TauR)
+        self.assertAlmostEqual(Thermal.k11TauR, 0.5 * TauR)
+        self.assertAlmostEqual(Thermal.Hgr, 1.3 * 14.8)
+
+    def test_matches_functions(self):
+        Thermal = self.tx.Thermal
+        K = 30.0 / 25.0
+        dTOult = rate.ult_top_oil_rise_at_load(K, Thermal.R, Thermal.dTOr, Thermal.x)
+        self.assertAlmostEqual(Thermal.ultimate_rises(30.0)[0], dTOult)
+        Tau = rate.thermal_time_constant_as_considered_load(
+            Thermal.TauR, Thermal.dTOr, 20.0, dTOult, Thermal.n)
+        dTO = rate.inst_top_oil_rise_at_load(20.0, dTOult, 30.0, Thermal.k11, Tau)
+        self.assertAlmostEqual(Thermal.top_oil_rise(30.0, 20.0, dTOult), dTO)
+
+
+class TestSearch(unittest.TestCase):
+    """ Tests the bracketed search against the original step search
+    """
+
+    def test_matches_step_search(self):
+        with open('tests/example1.yaml', newline='') as example_file:
+            data = yaml.safe_load(example_file)
+        for CoolingMode in ['ONAN', 'ODAF']:
+            HeatRunData = dict(data['HeatRun'], CoolingMode=CoolingMode)
+            LoadShape = [10.0 + (j % 16) for j in range(48)]
+            ratings = {}
+            for Search in ['step', 'brent']:
+                tx = Transformer(HeatRunData, data['Thermal'])
+                tx.perform_rating(data['AmbWHS'], data['AmbAgeing'], LoadShape,
+                                  data['Limits'], Search=Search)
+                ratings[Search] = tx
+            step, brent = ratings['step'], ratings['brent']
+            self.assertAlmostEqual(brent.MaxLoad, step.MaxLoad, delta=step.MaxLoad * 0.0001)
+            self.assertEqual(brent.RatingReason, step.RatingReason)
+            self.assertLess(brent.NumEvaluations, step.NumEvaluations / 3)
+
+    def test_load_limit(self):
+        tx = Transformer({'CoolingMode': 'ONAN', 'RatedLoad': 25.0, 'dTOr': 35.4,
+                          'gr': 14.8, 'P': 20220.0, 'R': 23.305}, {})
+        tx.perform_rating(0.0, 0.0, [5.0] * 48, {'MaxLoadPU': 1.1})
+        self.assertEqual(tx.RatingReason, 'CRF')
+        self.assertAlmostEqual(tx.MaxLoad, 27.5, places=3)
+
+    def test_load_limit_rounding(self):
+        """ The load limit binds although rounding keeps it just within limits
+        """
+        unit = synthetic.synthetic_fleet(150, Seed=0)[97]
+        tx = Transformer(unit['HeatRun'], unit['Thermal'])
+        tx.perform_rating(unit['AmbWHS'], unit['AmbAgeing'], unit['LoadShape'],
+                          unit['Limits'], Search='brent')
+        self.assertFalse(any(Values[0] for Values in tx.Evaluations.values()))
+        self.assertEqual(tx.RatingReason, 'CRF')
+        self.assertAlmostEqual(tx.MaxLoad, 1.5 * tx.RatedLoad, places=3)
+
+    def test_unknown_search(self):
+        tx = Transformer({'CoolingMode': 'ONAN', 'RatedLoad': 25.0, 'dTOr': 35.4,
+                          'gr': 14.8, 'P': 20220.0, 'R': 23.305}, {})
+        with self.assertRaises(ValueError):
+            tx.perform_rating(Search='newton')
+
+    def test_warm_start(self):
+        with open('tests/example1.yaml', newline='') as example_file:
+            data = yaml.safe_load(example_file)
+        tx = Transformer(data['HeatRun'], data['Thermal'])
+        tx.perform_rating(data['AmbWHS'], data['AmbAgeing'], data['LoadShape'], data['Limits'],
+                          Search='brent', SteadyState='solve')
+        LoadShape = list(data['LoadShape'])
+        LoadShape[30] *= 1.05
+        for AmbAgeing, Shape in [(data['AmbAgeing'] + 1, data['LoadShape']),
+                                 (data['AmbAgeing'], LoadShape),
+                                 (data['AmbAgeing'], [0.5 * i for i in LoadShape])]:
+            cold = Transformer(data['HeatRun'], data['Thermal'])
+            cold.perform_rating(data['AmbWHS'], AmbAgeing, Shape, data['Limits'],
+                                Search='brent', SteadyState='solve')
+            warm = Transformer(data['HeatRun'], data['Thermal'])
+            warm.perform_rating(data['AmbWHS'], AmbAgeing, Shape, data['Limits'],
+                                Search='brent', SteadyState='solve',
+                                WarmStart=tx.WarmStart)
+            self.assertEqual(warm.MaxLoad, cold.MaxLoad)
+            self.assertEqual(warm.RatingReason, cold.RatingReason)
+        warm = Transformer(data['HeatRun'], data['Thermal'])
+        warm.perform_rating(data['AmbWHS'], data['AmbAgeing'] + 1, data['LoadShape'],
+                            data['Limits'], Search='brent', SteadyState='solve',
+                            WarmStart=tx.WarmStart)
+        self.assertLess(warm.NumWarmUpPasses, tx.NumWarmUpPasses / 2)
+        with self.assertRaises(ValueError):
+            warm.perform_rating(data['AmbWHS'], data['AmbAgeing'], data['LoadShape'],
+                                data['Limits'], Search='step', WarmStart=tx.WarmStart)
+
+    def test_limit_headroom(self):
+        with open('tests/example1.yaml', newline='') as example_file:
+            data = yaml.safe_load(example_file)
+        tx = Transformer(data['HeatRun'], data['Thermal'])
+        tx.perform_rating(data['AmbWHS'], data['AmbAgeing'], data['LoadShape'],
+                          data['Limits'], Headroom=True)
+        self.assertEqual(tx.LimitRatings[tx.RatingReason], tx.MaxLoad)
+        self.assertEqual(min(tx.LimitRatings.values()), tx.MaxLoad)
+        self.assertAlmostEqual(tx.LimitMargins[tx.RatingReason], 0.0, places=2)
+
+        # Each limit rating matches a rating with only that limit applied
+        Unlimited = {'MaxLoadPU': 100, 'TopOil': 1000, 'HotSpot': 1000, 'LoL': 1e9}
+        NumEvaluations = 0
+        for Name, Key in [('CRF', 'MaxLoadPU'), ('TO', 'TopOil'), ('WHS', 'HotSpot'),
+                          ('Age', 'LoL')]:
+            single = Transformer(data['HeatRun'], data['Thermal'])
+            single.perform_rating(data['AmbWHS'], data['AmbAgeing'], data['LoadShape'],
+                                  dict(Unlimited, **{Key: data['Limits'][Key]}))
+            self.assertEqual(single.RatingReason, Name)
+            self.assertAlmostEqual(tx.LimitRatings[Name], single.MaxLoad, delta=0.002)
+            NumEvaluations += single.NumEvaluations
+        self.assertLess(tx.NumEvaluations, NumEvaluations)
+
+    def test_find_root(self):
+        f = lambda x: 2.0 - x ** 2
+        root = rate.find_root(f, 0.0, 2.0, f(0.0), f(2.0), 1e-10)
+        self.assertAlmostEqual(root, 2 ** 0.5, places=9)
+
+
+class TestSeasonal(unittest.TestCase):
+    """ Tests rating against many daily load shapes
+    """
+
+    def setUp(self):
+        with open('tests/example1.yaml', newline='') as example_file:
+            data = yaml.safe_load(example_file)
+        self.tx = Transformer(data['HeatRun'], data['Thermal'])
+        rng = np.random.default_rng(3)
+        Days = np.arange(60)
+        Base = np.array([15.0 + 8.0 * np.sin(np.pi * j / 48) for j in range(48)])
+        Season = 1 + 0.15 * np.cos(2 * np.pi * Days / 60)
+        self.LoadShapes = Base * Season[:, None] * rng.uniform(0.95, 1.05, (60, 48))
+        self.AmbWHS = 20.0 + 5.0 * np.cos(2 * np.pi * Days / 60) + rng.uniform(-2, 2, 60)
+
+    def test_worst_day(self):
+        Results = seasonal.seasonal_rating(self.tx, self.LoadShapes, self.AmbWHS, 27.0)
+        ScaleFactors = []
+        NumEvaluations = 0
+        for Day in range(60):
+            self.tx.perform_rating(self.AmbWHS[Day], 27.0, list(self.LoadShapes[Day]))
+            ScaleFactors.append(self.tx.ScaleFactor)
+            NumEvaluations += self.tx.NumEvaluations
+        self.assertEqual(Results['WorstDay'], int(np.argmin(ScaleFactors)))
+        self.assertAlmostEqual(Results['ScaleFactor'][Results['WorstDay']],
+                               min(ScaleFactors), places=5)
+        self.assertGreater(Results['Skipped'].sum(), 50)
+        self.assertLess(Results['NumEvaluations'] * 5, NumEvaluations)
+
+    def test_no_skip(self):
+        Results = seasonal.seasonal_rating(self.tx, self.LoadShapes[:10],
+                                           self.AmbWHS[:10], 27.0, Skip=False)
+        self.assertFalse(Results['Skipped'].any())
+        for Day in range(10):
+            self.tx.perform_rating(self.AmbWHS[Day], 27.0, list(self.LoadShapes[Day]))
+            self.assertAlmostEqual(Results['MaxLoad'][Day], self.tx.MaxLoad, delta=0.002)
+            self.assertEqual(Results['RatingReason'][Day], self.tx.RatingReason)
+
+    def test_warm_start(self):
+        Results = seasonal.seasonal_rating(self.tx, self.LoadShapes[:10],
+                                           self.AmbWHS[:10], 27.0, Skip=False)
+        NumWarmUpPasses = 0
+        for Day in range(10):
+            self.tx.perform_rating(self.AmbWHS[Day], 27.0, list(self.LoadShapes[Day]),
+                                   Search='brent', SteadyState='solve')
+            NumWarmUpPasses += self.tx.NumWarmUpPasses
+        # Each day's solve starts from the previous day's temperatures
+        self.assertLess(Results['NumWarmUpPasses'], NumWarmUpPasses)
+
+    def test_keeps_last_rating(self):
+        Results = seasonal.seasonal_rating(self.tx, self.LoadShapes, self.AmbWHS, 27.0)
+        Day = int(np.flatnonzero(Results['ScaleFactor'] == self.tx.ScaleFactor)[0])
+        self.assertEqual(self.tx.RatingReason, Results['RatingReason'][Day])
+        self.assertEqual(self.tx.CycleStart, (self.tx.WarmStart['TOStart'],
+                                              self.tx.WarmStart['WHSStart']))
+
+    def test_dominated_needs_same_steps(self):
+        Rated = np.array([[10.0, 20.0, 10.0, 20.0]])
+        self.assertTrue(seasonal.dominated(np.array([9.0, 19.0, 9.0, 19.0]), 25.0, 27.0,
+                                           Rated, np.array([25.0]), np.array([27.0])))
+        # Lower, but falling where the rated day rises
+        self.assertFalse(seasonal.dominated(np.array([9.0, 8.0, 7.0, 19.0]), 25.0, 27.0,
+                                            Rated, np.array([25.0]), np.array([27.0])))
+
+
+class TestSteadyState(unittest.TestCase):
+    """ Tests the cyclic steady state solver against repeating the cycle
+    """
+
+    def setUp(self):
+        with open('tests/example1.yaml', newline='') as example_file:
+            self.data = yaml.safe_load(example_file)
+        self.LoadShape = [10.0 + (j % 16) for j in range(48)]
+
+    def test_matches_iterate(self):
+        ratings = {}
+        for SteadyState in ['iterate', 'solve']:
+            tx = Transformer(self.data['HeatRun'], self.data['Thermal'])
+            tx.perform_rating(self.data['AmbWHS'], self.data['AmbAgeing'],
+                              self.LoadShape, self.data['Limits'],
+                              SteadyState=SteadyState)
+            ratings[SteadyState] = tx
+        self.assertEqual(ratings['solve'].MaxLoad, ratings['iterate'].MaxLoad)
+        self.assertEqual(ratings['solve'].RatingReason, ratings['iterate'].RatingReason)
+        self.assertLessEqual(ratings['solve'].NumWarmUpPasses,
+                             ratings['iterate'].NumWarmUpPasses)
+
+    def test_cycle_repeats(self):
+        """ A long oil time constant needs more than 25 passes to repeat
+        """
+        tx = Transformer(dict(self.data['HeatRun'], CoolingMode='ODAF'),
+                         dict(self.data['Thermal'], C=60000.0))
+        Cycle = tx.solve_steady_state(self.LoadShape, 30.0, 25.0, 27.0,
+                                      Tolerance=1e-9)
+        self.assertLessEqual(tx.NumWarmUpPasses, 5)
+        End = tx.simulate_cycle(self.LoadShape, 30.0, Cycle[3], Cycle[4], 25.0, 27.0)
+        self.assertAlmostEqual(End[3], Cycle[3], places=6)
+        self.assertAlmostEqual(End[4], Cycle[4], places=6)
+
+    def test_fleet_matches_iterate(self):
+        HeatRunData = [dict(self.data['HeatRun'], CoolingMode=m) for m in ['ONAN', 'ODAF']]
+        results = {}
+        for SteadyState in ['iterate', 'solve']:
+            results[SteadyState] = fleet.rate_fleet(
+                HeatRunData, None, [self.LoadShape] * 2,
+                (self.data['AmbWHS'], self.data['AmbAgeing']),
+                SteadyState=SteadyState)
+        for i in range(2):
+            self.assertAlmostEqual(results['solve']['MaxLoad'][i],
+                                   results['iterate']['MaxLoad'][i], places=2)
+
+
+class TestRatingResult(unittest.TestCase):
+    """ Tests rating without changing the Transformer
+    """
+
+    def setUp(self):
+        with open('tests/example1.yaml', newline='') as example_file:
+            self.data = yaml.safe_load(example_file)
+        self.tx = Transformer(self.data['HeatRun'], self.data['Thermal'])
+
+    def test_matches_perform_rating(self):
+        Attributes = dict(vars(self.tx))
+        Result = self.tx.rate(self.data['AmbWHS'], self.data['AmbAgeing'],
+                              self.data['LoadShape'], self.data['Limits'])
+        self.assertEqual(vars(self.tx).keys(), Attributes.keys())
+        self.tx.perform_rating(self.data['AmbWHS'], self.data['AmbAgeing'],
+                               self.data['LoadShape'], self.data['Limits'])
+        for key in rate.RATING_RESULTS:
+            self.assertEqual(getattr(Result, key), getattr(self.tx, key))
+        self.assertEqual(Result.WarmStart, self.tx.WarmStart)
+        self.assertIsNone(Result.LimitRatings)
+        with self.assertRaises(AttributeError):
+            Result.MaxLoad = 0.0
+
+    def test_mappings_read_only(self):
+        Result = self.tx.rate(self.data['AmbWHS'], self.data['AmbAgeing'],
+                              self.data['LoadShape'], self.data['Limits'],
+                              Search='brent', Headroom=True)
+        for Mapping in [Result.WarmStart, Result.LimitRatings, Result.LimitMargins]:
+            with self.assertRaises(TypeError):
+                Mapping['TO'] = 0.0
+        # Still usable to warm start a later rating
+        Warm = self.tx.rate(self.data['AmbWHS'], self.data['AmbAgeing'],
+                            self.data['LoadShape'], self.data['Limits'],
+                            Search='brent', WarmStart=Result.WarmStart)
+        self.assertAlmostEqual(Warm.MaxLoad, Result.MaxLoad, delta=0.002)
+
+    def test_threads(self):
+        Scenarios = [(20.0 + i % 10, [10.0 + (j % (5 + i % 7)) for j in range(48)])
+                     for i in range(40)]
+        Expected = [self.tx.rate(Amb, 27.0, LoadShape) for Amb, LoadShape in Scenarios]
+        Results = [None] * len(Scenarios)
+
+        def worker(Start):
+            for i in range(Start, len(Scenarios), 4):
+                Results[i] = self.tx.rate(Scenarios[i][0], 27.0, Scenarios[i][1])
+        Threads = [threading.Thread(target=worker, args=(i,)) for i in range(4)]
+        for Thread in Threads:
+            Thread.start()
+        for Thread in Threads:
+            Thread.join()
+        self.assertEqual(Results, Expected)
+
+
+class TestBudget(unittest.TestCase):
+    """ Tests ratings to a precision or within a budget
+    """
+
+    def setUp(self):
+        with open('tests/example1.yaml', newline='') as example_file:
+            self.data = yaml.safe_load(example_file)
+        self.tx = Transformer(self.data['HeatRun'], self.data['Thermal'])
+        self.exact = self.rate()
+
+    def rate(self, **Options):
+        Options.setdefault('Search', 'brent')
+        return self.tx.rate(self.data['AmbWHS'], self.data['AmbAgeing'],
+                            self.data['LoadShape'], self.data['Limits'], **Options)
+
+    def test_precision(self):
+        result = self.rate(Precision=0.005)
+        self.assertTrue(result.Converged)
+        self.assertLessEqual(result.BracketWidth, 0.005 * self.tx.RatedLoad)
+        self.assertLessEqual(result.MaxLoad, self.exact.MaxLoad)
+        self.assertLessEqual(self.exact.MaxLoad - result.MaxLoad, 0.005 * self.tx.RatedLoad)
+        self.assertLess(result.NumEvaluations, self.exact.NumEvaluations)
+        self.assertEqual(result.RatingReason, self.exact.RatingReason)
+
+    def test_evaluation_budget(self):
+        for Budget in range(1, 6):
+            result = self.rate(MaxEvaluations=Budget)
+            self.assertFalse(result.Converged)
+            self.assertLessEqual(result.NumEvaluations, Budget)
+            # The rating is safe and the exact rating is within the bracket
+            self.assertLessEqual(result.MaxLoad, self.exact.MaxLoad)
+            self.assertGreaterEqual(result.MaxLoad + result.BracketWidth + 0.001,
+                                    self.exact.MaxLoad)
+        # The rating at no load is counted within the budget, and reused
+        # when the limits are breached even with no load
+        for TopOil in [self.data['AmbWHS'] + 20, self.data['AmbWHS'] - 5]:
+            Limits = dict(self.data['Limits'], TopOil=TopOil)
+            for Budget in range(1, 6):
+                result = self.tx.rate(self.data['AmbWHS'], self.data['AmbAgeing'],
+                                      self.data['LoadShape'], Limits, Search='brent',
+                                      MaxEvaluations=Budget)
+                self.assertLessEqual(result.NumEvaluations, Budget)
+                self.assertIsNotNone(result.WarmStart)
+
+    def test_deadline(self):
+        result = self.rate(Deadline=0.0)
+        self.assertFalse(result.Converged)
+        self.assertEqual(result.MaxLoad, 0.0)
+        self.assertEqual(result.RatingReason, 'Did not converge')
+        self.assertTrue(self.rate(Deadline=60.0).Converged)
+        with self.assertRaises(ValueError):
+            self.rate(Search='step', Deadline=1.0)
+
+    def test_fleet_bracket_width(self):
+        Params = fleet.transformer_parameters([self.tx])
+        results = fleet.bracket_parameters(
+            Params, [self.data['LoadShape']], (self.data['AmbWHS'], self.data['AmbAgeing']),
+            self.data['Limits'])
+        self.assertLess(results['BracketWidth'][0], 0.001)
+
+
+class TestInstrumentation(unittest.TestCase):
+    """ Tests the counters and observer of a rating
+    """
+
+    def setUp(self):
+        with open('tests/example1.yaml', newline='') as example_file:
+            self.data = yaml.safe_load(example_file)
+
+    def test_observer(self):
+        observed = []
+        tx = Transformer(self.data['HeatRun'], self.data['Thermal'])
+        tx.perform_rating(self.data['AmbWHS'], self.data['AmbAgeing'], self.data['LoadShape'],
+                          self.data['Limits'], Observer=lambda tx, stats: observed.append(stats))
+        self.assertEqual(len(observed), 1)
+        stats = observed[0]
+        self.assertEqual(stats, tx.rating_stats())
+        self.assertEqual(stats['CalculateLimitCalls'], tx.NumEvaluations)
+        self.assertEqual(stats['ExpCalls'], stats['WarmUpPasses'] * (48 + 3))
+        self.assertLess(stats['SearchRounds'], stats['CalculateLimitCalls'])
+        self.assertGreaterEqual(stats['Seconds']['Total'], stats['Seconds']['Search'])
+
+    def test_capped_cycles(self):
+        tx = Transformer(self.data['HeatRun'], dict(self.data['Thermal'], C=1e6))
+        with self.assertLogs('ratetransformer.rate', 'DEBUG') as logs:
+            tx.perform_rating(self.data['AmbWHS'], self.data['AmbAgeing'],
+                              self.data['LoadShape'], self.data['Limits'],
+                              SteadyState='iterate')
+        self.assertGreater(tx.NumCappedCycles, 0)
+        self.assertIn('CappedCycles', logs.output[0])
+        tx.perform_rating(self.data['AmbWHS'], self.data['AmbAgeing'],
+                          self.data['LoadShape'], self.data['Limits'],
+                          SteadyState='solve')
+        self.assertEqual(tx.NumCappedCycles, 0)
+
+
+class TestKernels(unittest.TestCase):
+    """ Tests the load cycle kernel backends
+    """
+
+    def setUp(self):
+        with open('tests/example1.yaml', newline='') as example_file:
+            self.data = yaml.safe_load(example_file)
+        self.LoadShape = [10.0 + (j % 12) for j in range(48)]
+
+    def test_matches_simulate_cycle(self):
+        tx = Transformer(self.data['HeatRun'], self.data['Thermal'])
+        Cycle = tx.simulate_cycle(self.LoadShape, 30.0, 20.0, 5.0, 25.0, 27.0)
+        for Name in kernels.BACKENDS:
+            tx.Backend = kernels.get_backend(Name)
+            Summary = tx.summarise_cycle(self.LoadShape, 30.0, 20.0, 5.0, 25.0, 27.0)
+            self.assertAlmostEqual(Summary[0], max(Cycle[0]), places=9)
+            self.assertAlmostEqual(Summary[1], max(Cycle[1]), places=9)
+            self.assertAlmostEqual(Summary[2], rate.calulate_loss_of_life(Cycle[2], 30.0), places=9)
+            self.assertAlmostEqual(Summary[3], Cycle[3], places=9)
+            self.assertAlmostEqual(Summary[4], Cycle[4], places=9)
+
+    @unittest.skipUnless('numba' in kernels.BACKENDS, 'Numba is not installed')
+    def test_backends_agree(self):
+        ratings = {}
+        for Name in ['python', 'numba']:
+            tx = Transformer(self.data['HeatRun'], self.data['Thermal'])
+            tx.Backend = kernels.get_backend(Name)
+            tx.perform_rating(25.0, 27.0, self.LoadShape, self.data['Limits'])
+            ratings[Name] = tx
+        self.assertAlmostEqual(ratings['python'].MaxLoad, ratings['numba'].MaxLoad, delta=0.002)
+        self.assertEqual(ratings['python'].RatingReason, ratings['numba'].RatingReason)
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            kernels.get_backend('fortran')
+        self.assertIn(kernels.get_backend().Name, kernels.BACKENDS)
+
+    def test_numba_imported_lazily(self):
+        Imported = subprocess.check_output(
+            [sys.executable, '-c', 'import sys, ratetransformer.rate, ratetransformer.fleet; '
+             'print("numba" in sys.modules)'], universal_newlines=True)
+        self.assertEqual(Imported.strip(), 'False')
+
+
+class TestCompression(unittest.TestCase):
+    """ Tests rating high resolution load shapes split into blocks
+    """
+
+    def setUp(self):
+        with open('tests/example1.yaml', newline='') as example_file:
+            self.data = yaml.safe_load(example_file)
+        # A half hourly load shape at one minute intervals
+        self.LoadShape = list(np.repeat(self.data['LoadShape'], 30))
+        # With independent noise of up to 5% on every minute
+        self.Noisy = list(np.array(self.LoadShape) *
+                          np.random.default_rng(1).uniform(0.95, 1.05, len(self.LoadShape)))
+
+    def rate(self, LoadShape, Limits={}, Backend=None, **Options):
+        tx = Transformer(self.data['HeatRun'], self.data['Thermal'])
+        tx.Backend = kernels.get_backend(Backend)
+        tx.perform_rating(25.0, 27.0, LoadShape, dict(self.data['Limits'], **Limits),
+                          Interval=1.0, Search='brent', SteadyState='solve', **Options)
+        return tx
+
+    def cycle(self, tx, ScaleFactor, LoadShape):
+        """ Maximum temperatures and loss of life at a scaling
+        """
+        return tx.CalculateLimit(ScaleFactor, 1.0, tx.HeatRunData, tx.ThermalChar,
+                                 self.data['Limits'], 25.0, 27.0, LoadShape,
+                                 SteadyState='solve')[2:]
+
+    def test_no_error_matches_fixed_step(self):
+        Fixed = self.rate(self.Noisy)
+        for Name in kernels.BACKENDS:
+            with self.subTest(Backend=Name):
+                tx = self.rate(self.Noisy, Backend=Name, Compress=0.0)
+                self.assertEqual(tx.MaxLoad, Fixed.MaxLoad)
+                self.assertAlmostEqual(tx.MaxWHSTemp, Fixed.MaxWHSTemp, delta=0.011)
+                self.assertAlmostEqual(tx.Ageing, Fixed.Ageing, delta=0.0011)
+
+    def test_plateaus(self):
+        Fixed = self.rate(self.LoadShape)
+        tx = self.rate(self.LoadShape, Compress=0.25)
+        self.assertAlmostEqual(tx.MaxLoad, Fixed.MaxLoad, delta=Fixed.MaxLoad * 0.001)
+        self.assertEqual(tx.RatingReason, Fixed.RatingReason)
+        self.assertLess(tx.NumExp, Fixed.NumExp / 10)
+
+    def test_noisy_loads_within_bound(self):
+        Fixed = self.rate(self.Noisy)
+        Expected = self.cycle(Fixed, Fixed.ScaleFactor, self.Noisy)
+        for Name in kernels.BACKENDS:
+            for Compress in (0.25, 1.0):
+                with self.subTest(Backend=Name, Compress=Compress):
+                    tx = self.rate(self.Noisy, Backend=Name, Compress=Compress)
+                    self.assertAlmostEqual(tx.MaxLoad, Fixed.MaxLoad,
+                                           delta=Fixed.MaxLoad * 0.002 * Compress)
+                    self.assertLess(tx.NumExp, Fixed.NumExp / 10)
+                    TOtemp, WHStemp, LoL = self.cycle(tx, Fixed.ScaleFactor, self.Noisy)
+                    self.assertLessEqual(abs(TOtemp - Expected[0]), Compress)
+                    self.assertLessEqual(abs(WHStemp - Expected[1]), Compress)
+                    self.assertLessEqual(abs(np.log2(LoL / Expected[2])), Compress / 6)
+
+    def test_limited_by_peak_load(self):
+        tx = self.rate(self.Noisy, Compress=0.25, Limits={'MaxLoadPU': 0.5})
+        self.assertEqual(tx.RatingReason, 'CRF')
+        self.assertAlmostEqual(tx.MaxLoad, 0.5 * tx.RatedLoad, delta=0.01)
+
+
+class TestEmergency(unittest.TestCase):
+    """ Tests emergency ratings from a known thermal state
+    """
+
+    def setUp(self):
+        with open('tests/example1.yaml', newline='') as example_file:
+            data = yaml.safe_load(example_file)
+        self.tx = Transformer(data['HeatRun'], data['Thermal'])
+        tracker = stream.ThermalTracker(self.tx, Load=20.0)
+        self.State = (tracker.TOrise, tracker.WHSrise)
+
+    def test_matches_tracker(self):
+        """ The closed form response matches a single step of the model
+        """
+        Response = emergency.ThermalResponse(self.tx, np.array([30.0, 15.0]), 25.0,
+                                             self.State, 20.0)
+        TOtemp, WHStemp = Response.temperatures(np.array([37.0]))
+        for i, Load in enumerate([30.0, 15.0]):
+            tracker = stream.ThermalTracker(self.tx, InitialState=self.State)
+            tracker.Load = 20.0
+            Expected = tracker.update(37.0, Load, 25.0)
+            self.assertAlmostEqual(TOtemp[0, i], Expected[0], places=9)
+            self.assertAlmostEqual(WHStemp[0, i], Expected[1], places=9)
+
+    def test_time_to_limit(self):
+        Loads = [20.0, 35.0, 37.4, 40.0]
+        Results = emergency.time_to_limit(self.tx, Loads, 25.0, self.State, 20.0)
+        self.assertEqual(list(Results['Limit']), [None, 'Age', 'Age', 'CRF'])
+        self.assertEqual(Results['Time'][0], np.inf)
+        self.assertEqual(Results['Time'][3], 0.0)
+        self.assertTrue(np.all(np.diff(Results['Time'][:3]) < 0))
+        Response = emergency.ThermalResponse(self.tx, np.array(Loads), 25.0, self.State, 20.0)
+        WHStemp = Response.temperatures(np.array([Results['WHS'][2]]))[1][0, 2]
+        self.assertAlmostEqual(WHStemp, 120.0, places=3)
+        Times = np.linspace(0, Results['Age'][1], 20001)
+        V = fleet.relative_ageing_rate(Response.temperatures(Times)[1][:, 1])
+        LoL = np.sum((V[1:] + V[:-1]) / 2 * np.diff(Times)) / 60
+        self.assertAlmostEqual(LoL, 24.0, places=3)
+
+    def test_brief_peak(self):
+        """ A hot spot peak above the limit for less than a grid interval
+        """
+        Response = emergency.ThermalResponse(self.tx, np.array([30.0]), 25.0, (70.0, 5.0), 10.0)
+        Turn = Response.hot_spot_turns(600.0, 0.000001)[0]
+        Peak = Response.temperatures(Turn, np.arange(1))[1][0]
+        Times = np.linspace(0.0, 600.0, 600001)
+        self.assertAlmostEqual(Response.temperatures(Times)[1].max(), Peak, places=6)
+        Results = emergency.time_to_limit(self.tx, [30.0], 25.0, (70.0, 5.0), 10.0,
+                                          {'HotSpot': Peak - 0.0001, 'LoL': 1000.0},
+                                          Horizon=600.0)
+        self.assertEqual(Results['Limit'][0], 'WHS')
+        self.assertLess(Results['WHS'][0], Turn[0])
+        self.assertGreater(Results['WHS'][0], Turn[0] - 0.5)
+
+    def test_emergency_rating(self):
+        Durations = [120.0, 240.0, 480.0]
+        Results = emergency.emergency_rating(self.tx, Durations, 25.0, self.State, 20.0,
+                                             Limits={'MaxLoadPU': 2.0})
+        self.assertTrue(np.all(np.diff(Results['MaxLoad']) < 0))
+        for Load, Duration in zip(Results['MaxLoad'], Durations):
+            Times = emergency.time_to_limit(self.tx, [Load - 0.002, Load + 0.002], 25.0,
+                                            self.State, 20.0, {'MaxLoadPU': 2.0},
+                                            Horizon=Duration)['Time']
+            self.assertGreaterEqual(Times[0], Duration)
+            self.assertLess(Times[1], Duration)
+
+
+class TestFleet(unittest.TestCase):
+    """ Tests the vectorised fleet engine matches the single transformer rating
+    """
+
+    def setUp(self):
+        with open('tests/example1.yaml', newline='') as example_file:
+            self.data = yaml.safe_load(example_file)
+
+    def fleet_cases(self):
+        """ Variations of example1.yaml across cooling modes and load shapes
+        """
+        cases = []
+        for i, CoolingMode in enumerate(['ONAN', 'ONAF', 'OFAN', 'ODAF']):
+            HeatRunData = dict(self.data['HeatRun'], CoolingMode=CoolingMode)
+            HeatRunData['dTOr'] += 5 * i
+            ThermalChar = {} if i % 2 else dict(self.data['Thermal'])
+            LoadShape = [10.0 + 10 * (j % (12 + i)) / (12 + i) for j in range(48)]
+            cases.append((HeatRunData, ThermalChar, LoadShape, 20.0 + 5 * i))
+        return cases
+
+    def test_matches_scalar(self):
+        cases = self.fleet_cases()
+        results = fleet.rate_fleet(
+            [c[0] for c in cases], [c[1] for c in cases],
+            [c[2] for c in cases],
+            ([c[3] for c in cases], [c[3] + 3 for c in cases]))
+        for i, (HeatRunData, ThermalChar, LoadShape, Amb) in enumerate(cases):
+            tx = Transformer(HeatRunData, ThermalChar)
+            tx.perform_rating(Amb, Amb + 3, LoadShape, {})
+            self.assertAlmostEqual(results['MaxLoad'][i], tx.MaxLoad, delta=tx.MaxLoad * 0.001)
+            self.assertAlmostEqual(results['MaxTOTemp'][i], tx.MaxTOTemp, delta=0.1)
+            self.assertAlmostEqual(results['MaxWHSTemp'][i], tx.MaxWHSTemp, delta=0.1)
+            self.assertAlmostEqual(results['Ageing'][i], tx.Ageing, delta=0.1)
+            self.assertEqual(results['RatingReason'][i], tx.RatingReason)
+
+    def test_column_input(self):
+        Results = self.data['ExpectedResults']
+        HeatRunArray = {k: [v] * 3 for k, v in self.data['HeatRun'].items()}
+        ThermalArray = {k: [v] * 3 for k, v in self.data['Thermal'].items()}
+        results = fleet.rate_fleet(
+            HeatRunArray, ThermalArray, [self.data['LoadShape']] * 3,
+            (self.data['AmbWHS'], self.data['AmbAgeing']), self.data['Limits'])
+        for i in range(3):
+            self.assertEqual(results['MaxLoad'][i], Results['MaxLoad'])
+            self.assertEqual(results['CRF'][i], Results['CRF'])
+            self.assertEqual(results['RatingReason'][i], Results['RatingReason'])
+
+
+    def test_bracket_matches_scalar(self):
+        units = synthetic.synthetic_fleet(40, Seed=5)
+        HeatRunArray, ThermalArray, LoadShapes, Ambients = synthetic.fleet_columns(units)
+        Params = fleet.fleet_parameters(HeatRunArray, ThermalArray)
+        for Guess in [None, np.full(40, 1.0)]:
+            results = fleet.bracket_parameters(Params, LoadShapes, Ambients, Guess=Guess)
+            for i, unit in enumerate(units):
+                tx = Transformer(unit['HeatRun'], unit['Thermal'])
+                tx.perform_rating(unit['AmbWHS'], unit['AmbAgeing'], unit['LoadShape'])
+                self.assertAlmostEqual(results['MaxLoad'][i], tx.MaxLoad, delta=0.002)
+                self.assertEqual(results['RatingReason'][i], tx.RatingReason)
+
+
+class TestProbabilistic(unittest.TestCase):
+    """ Tests the Monte Carlo rating
+    """
+
+    def setUp(self):
+        with open('tests/example1.yaml', newline='') as example_file:
+            self.data = yaml.safe_load(example_file)
+
+    def test_fixed_inputs(self):
+        results = probabilistic.probabilistic_rating(
+            self.data['HeatRun'], self.data['Thermal'], self.data['AmbWHS'],
+            self.data['AmbAgeing'], self.data['LoadShape'], self.data['Limits'],
+            NumSamples=5)
+        Expected = self.data['ExpectedResults']
+        self.assertAlmostEqual(results['P50'], Expected['MaxLoad'], delta=0.002)
+        self.assertEqual(results['StdDev'], 0.0)
+        self.assertEqual(results['LimitProbability'][Expected['RatingReason']], 1.0)
+
+    def test_distributions(self):
+        LoadShape = [10.0 + (j % 16) for j in range(48)]
+        rate = lambda Seed, BatchSize: probabilistic.probabilistic_rating(
+            self.data['HeatRun'], self.data['Thermal'],
+            probabilistic.normal(self.data['AmbWHS'], 3.0),
+            probabilistic.uniform(20.0, 35.0),
+            probabilistic.perturbed_shape(LoadShape, 0.05),
+            self.data['Limits'], NumSamples=400, Seed=Seed, BatchSize=BatchSize)
+        results = rate(1, 400)
+        self.assertTrue((results['Samples'] == rate(1, 150)['Samples']).all())
+        self.assertFalse((results['Samples'] == rate(2, 400)['Samples']).all())
+        self.assertGreaterEqual(results['P50'], results['P90'])
+        self.assertGreaterEqual(results['P90'], results['P99'])
+        self.assertAlmostEqual(sum(results['LimitProbability'].values()), 1.0)
+        self.assertGreater(results['LimitProbability']['Age'], 0.0)
+        self.assertGreater(results['LimitProbability']['CRF'], 0.0)
+
+
+class TestSensitivity(unittest.TestCase):
+    """ Tests the sensitivity of the rating to the heat run data
+    """
+
+    def setUp(self):
+        with open('tests/example1.yaml', newline='') as example_file:
+            self.data = yaml.safe_load(example_file)
+
+    def scalar_crf(self, key, Value):
+        tx = Transformer(self.data['HeatRun'], self.data['Thermal'])
+        Params = dict(zip(tx.Thermal._fields[:13], tx.Thermal[:13]))
+        Params[key] = Value
+        tx.Thermal = tx.Thermal.build(**Params)
+        tx.perform_rating(self.data['AmbWHS'], self.data['AmbAgeing'],
+                          self.data['LoadShape'], self.data['Limits'], Tolerance=1e-8)
+        return tx.ScaleFactor * max(self.data['LoadShape']) / tx.RatedLoad
+
+    def test_matches_scalar_differences(self):
+        tx = Transformer(self.data['HeatRun'], self.data['Thermal'])
+        results = sensitivity.sensitivity(
+            [tx], [self.data['LoadShape']], (self.data['AmbWHS'], self.data['AmbAgeing']),
+            self.data['Limits'], Parameters=('gr', 'H', 'x'))
+        self.assertEqual(results['Sensitivity'].shape, (1, 3))
+        self.assertEqual(results['RatingReason'][0], self.data['ExpectedResults']['RatingReason'])
+        for i, key in enumerate(results['Parameters']):
+            Value = getattr(tx.Thermal, key)
+            Expected = (self.scalar_crf(key, Value * 1.01) -
+                        self.scalar_crf(key, Value * 0.99)) / (0.02 * Value)
+            self.assertAlmostEqual(results['Sensitivity'][0, i], Expected, delta=0.001)
+        # A higher winding gradient lowers the rating
+        self.assertLess(results['Elasticity'][0, 0], 0.0)
+
+    def test_load_limited(self):
+        results = sensitivity.fleet_sensitivity(
+            [self.data['HeatRun']] * 2, None, [[1.0] * 48, [50.0] * 48],
+            Limits={'MaxLoadPU': [0.5, 1.5]})
+        self.assertEqual(list(results['RatingReason']), ['CRF', 'Age'])
+        self.assertAlmostEqual(results['CRF'][0], 0.5, places=5)
+        self.assertTrue((results['Sensitivity'][0] == 0).all())
+        self.assertTrue((results['Sensitivity'][1] != 0).any())
+
+
+class TestDifferential(unittest.TestCase):
+    """ Tests the differential accuracy harness
+    """
+
+    def setUp(self):
+        self.units = synthetic.synthetic_fleet(8, Seed=2, RandomLimits=True)
+
+    def test_engines_match_reference(self):
+        report = differential.differential_test(['brent', 'fleet_brent'], Units=self.units)
+        self.assertTrue(report['Passed'])
+        for Name, result in report['Engines'].items():
+            self.assertLess(result['MaxLoad']['Max'], 0.001)
+            self.assertEqual(result['ReasonMismatch'], 0.0)
+            self.assertGreater(result['Speedup'], 1.0)
+
+    def test_gates_on_tolerances(self):
+        brent = differential.ENGINES['brent']
+
+        def biased(Units):
+            Results = brent(Units)
+            Results['MaxLoad'] = Results['MaxLoad'] * 1.01
+            Results['RatingReason'][0] = 'Did not converge'
+            return Results
+        report = differential.differential_test({'biased': biased}, Units=self.units)
+        result = report['Engines']['biased']
+        self.assertFalse(report['Passed'])
+        self.assertEqual(result['Failures'], ['MaxLoad', 'RatingReason'])
+        self.assertAlmostEqual(result['MaxLoad']['P50'], 0.01, delta=0.001)
+        self.assertEqual(result['ReasonMismatchUnits'], [0])
+        # Looser tolerances pass
+        report = differential.differential_test(
+            {'biased': biased}, Units=self.units,
+            Tolerances={'MaxLoad': 0.02, 'RatingReason': 0.2})
+        self.assertTrue(report['Passed'])
+
+    def test_baseline(self):
+        units = synthetic.synthetic_fleet(10, Seed=0, RandomLimits=True)
+        baseline = differential.ENGINES['baseline'](units)
+        results = differential.ENGINES['reference'](units)
+        for i, unit in enumerate(units):
+            if unit['HeatRun']['CoolingMode'] != 'OFAF':
+                for key in differential.FIELDS + ('RatingReason',):
+                    self.assertEqual(results[key][i], baseline[key][i])
+        # Only the default units were rated by the original model
+        with self.assertRaises(ValueError):
+            differential.ENGINES['baseline'](self.units)
+
+    def test_random_limits(self):
+        units = synthetic.synthetic_fleet(20, Seed=2, RandomLimits=True)
+        self.assertEqual(units, synthetic.synthetic_fleet(20, Seed=2, RandomLimits=True))
+        for unit in units:
+            self.assertGreater(unit['Limits']['HotSpot'], unit['Limits']['TopOil'])
+
+
+class TestSubstation(unittest.TestCase):
+    """ Tests the firm rating of parallel transformers
+    """
+
+    def setUp(self):
+        with open('tests/example1.yaml', newline='') as example_file:
+            self.data = yaml.safe_load(example_file)
+        units = synthetic.synthetic_fleet(3, Seed=5)
+        self.txs = [Transformer(unit['HeatRun'], unit['Thermal']) for unit in units]
+        self.LoadShape = [30.0 + 20.0 * (j % 24 > 12) for j in range(48)]
+
+    def test_identical_units(self):
+        txs = [Transformer(self.data['HeatRun'], self.data['Thermal']) for i in range(2)]
+        results = substation.firm_rating(txs, self.data['LoadShape'], self.data['AmbWHS'],
+                                         self.data['AmbAgeing'], self.data['Limits'])
+        # Losing either unit leaves the other carrying the whole station load
+        Expected = self.data['ExpectedResults']
+        self.assertAlmostEqual(results['FirmRating'], Expected['MaxLoad'], delta=0.002)
+        self.assertEqual(results['RatingReason'], Expected['RatingReason'])
+        self.assertAlmostEqual(results['IntactRating'], 2 * results['FirmRating'], delta=0.005)
+
+    def test_matches_rating_each_case(self):
+        results = substation.firm_rating(self.txs, self.LoadShape, 28.0, 25.0,
+                                         Sharing='impedance', Impedances=[0.1, 0.12, 0.08])
+        self.assertEqual(results['Cases'], [(), (0,), (1,), (2,)])
+        np.testing.assert_allclose(results['Shares'].sum(axis=1), 1.0)
+        for Case, Shares, CaseRating in zip(results['Cases'], results['Shares'],
+                                            results['CaseRatings']):
+            Ratings = []
+            for i, tx in enumerate(self.txs):
+                if i in Case:
+                    self.assertEqual(Shares[i], 0.0)
+                    continue
+                tx.perform_rating(28.0, 25.0, [Load * Shares[i] for Load in self.LoadShape])
+                Ratings.append(tx.MaxLoad / Shares[i])
+            self.assertAlmostEqual(CaseRating, min(Ratings), delta=0.01)
+        self.assertEqual(results['FirmRating'], min(results['CaseRatings'][1:]))
+        self.assertNotIn(results['BindingUnit'], results['BindingOutage'])
+
+    def test_outages(self):
+        intact = substation.firm_rating(self.txs, self.LoadShape, NumOutages=0)
+        n2 = substation.firm_rating(self.txs, self.LoadShape, NumOutages=2)
+        self.assertEqual(intact['Cases'], [()])
+        self.assertEqual(intact['FirmRating'], intact['IntactRating'])
+        self.assertEqual(len(n2['Cases']), 4)
+        self.assertEqual(n2['FirmRating'], min(n2['UnitRatings']))
+        with self.assertRaises(ValueError):
+            substation.firm_rating(self.txs, self.LoadShape, NumOutages=3)
+        with self.assertRaises(ValueError):
+            substation.firm_rating(self.txs, self.LoadShape, Sharing='impedance')
+
+
+class TestSurface(unittest.TestCase):
+    """ Tests the precomputed rating surface
+    """
+
+    def setUp(self):
+        with open('tests/example1.yaml', newline='') as example_file:
+            self.data = yaml.safe_load(example_file)
+        self.tx = Transformer(self.data['HeatRun'], self.data['Thermal'])
+        self.LoadShape = [10.0 + (j % 16) for j in range(48)]
+        self.surface = surface.RatingSurface.build(
+            self.tx, [10.0, 20.0, 30.0, 40.0, 50.0], self.LoadShape,
+            LoadFactors=[0.6, 0.8, 1.0], AgeingOffset=3.0)
+
+    def exact(self, Ambient, LoadFactor):
+        tx = Transformer(self.data['HeatRun'], self.data['Thermal'])
+        LoadShape = surface.shape_at_load_factor(self.LoadShape, LoadFactor)
+        tx.perform_rating(Ambient, Ambient + 3.0, list(LoadShape), {})
+        return tx.MaxLoad
+
+    def test_lookup(self):
+        self.assertAlmostEqual(self.surface.rating(30.0, 0.8), self.exact(30.0, 0.8), delta=0.002)
+        self.assertAlmostEqual(self.surface.rating(45.0, 0.7), self.exact(45.0, 0.7),
+                               delta=self.surface.MaxError)
+        self.assertAlmostEqual(surface.load_factor(surface.shape_at_load_factor(
+            self.LoadShape, 0.6)), 0.6)
+        with self.assertRaises(ValueError):
+            self.surface.rating(55.0, 0.8)
+
+    def test_single_load_factor(self):
+        single = surface.RatingSurface.build(
+            self.tx, [10.0, 30.0], np.array(self.LoadShape), Check=False)
+        LoadFactor = surface.load_factor(self.LoadShape)
+        self.assertEqual(single.rating(20.0, LoadFactor), single.rating(20.0))
+        with self.assertRaises(ValueError):
+            single.rating(20.0, 0.5)
+
+    def test_save_load(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'surfaces.npy')
+            surface.save_surfaces(path, [self.surface, self.surface])
+            surfaces = surface.load_surfaces(path)
+            self.assertEqual(len(surfaces), 2)
+            self.assertAlmostEqual(surfaces[1].rating(42.0, 0.9),
+                                   self.surface.rating(42.0, 0.9), places=3)
+            self.assertAlmostEqual(surfaces[1].MaxError, self.surface.MaxError, places=3)
+            del surfaces  # Release the memory map before the folder is removed
+
+
+class TestColumnar(unittest.TestCase):
+    """ Tests bulk fleet input and output
+    """
+
+    def setUp(self):
+        self.Units = synthetic.synthetic_fleet(40, Seed=4)
+        self.Units[0]['Thermal'] = {'mass_assembly': 20000.0, 'mass_tank': 8000.0,
+                                    'vol_oil': 15000.0}
+        self.Units[1]['Thermal'] = {'k11': 0.6, 'k21': 1.5, 'x': 0.9, 'n': 0.85}
+        self.Units[2]['Limits'] = {'TopOil': 95.0}
+        self.Columns, self.LoadShapes = columnar.unit_columns(self.Units)
+
+    def test_parameters_match_transformer(self):
+        Params = columnar.column_parameters(self.Columns)
+        Expected = fleet.fleet_parameters([u['HeatRun'] for u in self.Units],
+                                          [u['Thermal'] for u in self.Units])
+        for key in fleet.PARAMETERS:
+            np.testing.assert_allclose(Params[key], Expected[key], rtol=1e-12)
+
+    def test_round_trip(self):
+        with tempfile.TemporaryDirectory() as folder:
+            for Extension in ['.csv', '.npz']:
+                Path = os.path.join(folder, 'fleet' + Extension)
+                columnar.save_columns(Path, self.Columns)
+                Columns = columnar.read_columns(Path)
+                self.assertEqual(list(Columns['CoolingMode']), list(self.Columns['CoolingMode']))
+                np.testing.assert_array_equal(Columns['TopOil'], self.Columns['TopOil'])
+
+    def test_rate_columns(self):
+        with tempfile.TemporaryDirectory() as folder:
+            np.save(os.path.join(folder, 'shapes.npy'), self.LoadShapes)
+            Progress = []
+            NumUnits = columnar.rate_columns(
+                self.Columns, os.path.join(folder, 'shapes.npy'),
+                os.path.join(folder, 'results.csv'), ChunkSize=16,
+                Progress=lambda done, total: Progress.append(done))
+            with open(os.path.join(folder, 'results.csv'), newline='') as f:
+                Rows = list(csv.DictReader(f))
+        self.assertEqual(NumUnits, 40)
+        self.assertEqual(Progress, [16, 32, 40])
+        self.assertEqual(len(Rows), 40)
+        for i in [0, 1, 2, 3]:
+            serial = parallel.rate_unit(self.Units[i])
+            self.assertAlmostEqual(float(Rows[i]['MaxLoad']), serial['MaxLoad'], delta=0.002)
+            self.assertEqual(Rows[i]['RatingReason'], serial['RatingReason'])
+
+
+class TestParallel(unittest.TestCase):
+    """ Tests rating many units across processes
+    """
+
+    def setUp(self):
+        with open('tests/example1.yaml', newline='') as example_file:
+            data = yaml.safe_load(example_file)
+        self.Units = []
+        for i in range(6):
+            Unit = dict(data)
+            Unit['LoadShape'] = [10.0 + (j % (8 + i)) for j in range(48)]
+            self.Units.append(Unit)
+        self.Units[3] = dict(data, HeatRun=dict(data['HeatRun'], CoolingMode='XX'))
+
+    def test_matches_serial(self):
+        Progress = []
+        serial = parallel.rate_many(self.Units, ChunkSize=2, MaxWorkers=0)
+        results = parallel.rate_many(self.Units, ChunkSize=2, MaxWorkers=2,
+                                     Progress=lambda done, total: Progress.append(done))
+        self.assertEqual(results, serial)
+        self.assertEqual(sorted(Progress), [2, 4, 6])
+
+    def test_failure_isolated(self):
+        results = parallel.rate_many(self.Units, ChunkSize=4, MaxWorkers=0)
+        self.assertEqual(len(results), 6)
+        self.assertIn('ValueError', results[3]['Error'])
+        for i in [0, 1, 2, 4, 5]:
+            self.assertNotIn('Error', results[i])
+            self.assertIn(results[i]['RatingReason'], ['CRF', 'TO', 'WHS', 'Age'])
+
+
+class TestService(unittest.TestCase):
+    """ Tests the asyncio rating service
+    """
+
+    def setUp(self):
+        with open('tests/example1.yaml', newline='') as example_file:
+            data = yaml.safe_load(example_file)
+        self.Units = []
+        for i in range(6):
+            Unit = dict(data)
+            Unit['LoadShape'] = [10.0 + (j % (8 + i)) for j in range(48)]
+            self.Units.append(Unit)
+        self.Units[3] = dict(data, HeatRun=dict(data['HeatRun'], CoolingMode='XX'))
+
+    def rate_all(self, Units, **Options):
+        async def run():
+            async with service.RatingService(**Options) as ratings:
+                Results = await asyncio.gather(
+                    *[ratings.rate(Unit) for Unit in Units],
+                    return_exceptions=True)
+            return Results, ratings.stats()
+        return asyncio.run(run())
+
+    def test_matches_serial(self):
+        results, stats = self.rate_all(self.Units + self.Units[:2])
+        self.assertIsInstance(results[3], ValueError)
+        for i in [0, 1, 2, 4, 5]:
+            serial = parallel.rate_unit(self.Units[i])
+            for key in ['MaxLoad', 'MaxTOTemp', 'MaxWHSTemp', 'Ageing', 'CRF']:
+                self.assertAlmostEqual(results[i][key], serial[key], delta=0.002)
+            self.assertEqual(results[i]['RatingReason'], serial['RatingReason'])
+        self.assertEqual(results[6], results[0])
+        self.assertEqual(stats['NumRequests'], 8)
+        self.assertEqual(stats['NumDeduped'], 2)
+        self.assertEqual(stats['NumBatches'], 1)
+
+    def test_bounded_queue(self):
+        results, stats = self.rate_all(self.Units[:3] * 4, MaxQueue=1, MaxBatch=2)
+        self.assertEqual(results[:3], results[9:])
+        self.assertEqual(stats['QueueSize'], 0)
+        self.assertLessEqual(stats['MeanBatchSize'], 2)
+        self.assertLessEqual(stats['LatencyP50Ms'], stats['LatencyP99Ms'])
+
+
+class TestStream(unittest.TestCase):
+    """ Tests the streaming simulation over many days of records
+    """
+
+    def setUp(self):
+        with open('tests/example1.yaml', newline='') as example_file:
+            data = yaml.safe_load(example_file)
+        self.tx = Transformer(data['HeatRun'], data['Thermal'])
+        self.LoadShape = [15.0 + (j % 16) for j in range(48)]
+
+    def records(self, days):
+        start = datetime.datetime(2020, 1, 1)
+        for i in range(days * 48):
+            Time = start + datetime.timedelta(minutes=30 * (i + 1))
+            yield Time, self.LoadShape[i % 48], 25.0
+
+    def test_matches_cycle(self):
+        """ Repeating a day converges to the cyclic steady state
+        """
+        Cycle = self.tx.solve_steady_state(self.LoadShape, 30.0, 25.0, 25.0)
+        LastDay = list(stream.simulate_stream(self.tx, self.records(20)))[-48:]
+        self.assertAlmostEqual(max(r[1] for r in LastDay), max(Cycle[0]), places=4)
+        self.assertAlmostEqual(max(r[2] for r in LastDay), max(Cycle[1]), places=4)
+        DayLoL = LastDay[-1][3] - LastDay[0][3] + Cycle[2][0] * 30.0 / 60
+        self.assertAlmostEqual(DayLoL, rate.calulate_loss_of_life(Cycle[2], 30.0), places=4)
+
+    def test_summary(self):
+        Summary = stream.summarise_stream(self.tx, self.records(5))
+        self.assertEqual(Summary['NumRecords'], 5 * 48)
+        Values = list(stream.simulate_stream(self.tx, self.records(5)))
+        self.assertEqual(Summary['MaxWHSTemp'], max(r[2] for r in Values))
+        self.assertEqual(Summary['LoL'], Values[-1][3])
+
+    def test_uneven_intervals(self):
+        """ Constant load stays at its steady state for any interval
+        """
+        Records = [(0, 20.0, 25.0), (5, 20.0, 25.0), (65, 20.0, 25.0), (66.5, 20.0, 25.0)]
+        Values = list(stream.simulate_stream(self.tx, Records))
+        for Time, TOtemp, WHStemp, LoL in Values:
+            self.assertAlmostEqual(TOtemp, Values[0][1])
+            self.assertAlmostEqual(WHStemp, Values[0][2])
+        with self.assertRaises(ValueError):
+            list(stream.simulate_stream(self.tx, [(10, 20.0, 25.0), (5, 20.0, 25.0)]))
+
+    def test_tracker(self):
+        Values = list(stream.simulate_stream(self.tx, self.records(2)))
+        tracker = stream.ThermalTracker(self.tx, self.LoadShape[0])
+        for Time, Load, Ambient in list(self.records(2))[1:]:
+            TOtemp, WHStemp = tracker.update(30.0, Load, Ambient)
+        self.assertEqual((TOtemp, WHStemp, tracker.LoL), Values[-1][1:])
+        with self.assertRaises(ValueError):
+            tracker.update(0.0, 20.0, 25.0)
+
+    def test_fleet_tracker(self):
+        units = synthetic.synthetic_fleet(30, Seed=4)
+        txs = [Transformer(unit['HeatRun'], unit['Thermal']) for unit in units]
+        fleet_tracker = stream.FleetTracker(txs, [unit['LoadShape'][0] for unit in units])
+        trackers = [stream.ThermalTracker(tx, unit['LoadShape'][0]) for tx, unit in zip(txs, units)]
+        for j in range(1, 60):
+            dt = 1.0 / 6 if j % 3 else 30.0
+            Loads = [unit['LoadShape'][j % 48] for unit in units]
+            Ambients = [unit['AmbWHS'] for unit in units]
+            TOtemps, WHStemps = fleet_tracker.update_many(dt, Loads, Ambients)
+            for i, tracker in enumerate(trackers):
+                TOtemp, WHStemp = tracker.update(dt, Loads[i], Ambients[i])
+                self.assertAlmostEqual(TOtemps[i], TOtemp, places=9)
+                self.assertAlmostEqual(WHStemps[i], WHStemp, places=9)
+        for i, tracker in enumerate(trackers):
+            self.assertAlmostEqual(fleet_tracker.LoL[i], tracker.LoL, places=9)
+
+
+class TestCache(unittest.TestCase):
+    """ Tests the rating result cache
+    """
+
+    def setUp(self):
+        with open('tests/example1.yaml', newline='') as example_file:
+            self.data = yaml.safe_load(example_file)
+        self.folder = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.folder.name, 'ratings.db')
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def rate(self, ratings, LoadShape, **Options):
+        return ratings.rate(self.data['HeatRun'], self.data['Thermal'],
+                            self.data['AmbWHS'], self.data['AmbAgeing'],
+                            LoadShape, self.data['Limits'], **Options)
+
+    def test_same_inputs_share_entry(self):
+        ratings = cache.RatingCache()
+        first = self.rate(ratings, [10.0 + (j % 16) for j in range(48)])
+        second = self.rate(ratings, [10.0 + (j % 16) for j in range(48)])
+        self.assertEqual(first, second)
+        self.assertEqual((ratings.Hits, ratings.Misses), (1, 1))
+        self.assertEqual(self.rate(ratings, np.array([10.0 + (j % 16) for j in range(48)])),
+                         first)
+        self.assertEqual((ratings.Hits, ratings.Misses), (2, 1))
+        # The same profile at another magnitude, or another search, is rated
+        self.rate(ratings, [20.0 + 2 * (j % 16) for j in range(48)])
+        self.rate(ratings, [10.0 + (j % 16) for j in range(48)], Search='brent')
+        self.assertEqual((ratings.Hits, ratings.Misses), (2, 3))
+
+    def test_matches_perform_rating(self):
+        ratings = cache.RatingCache()
+        for unit in synthetic.synthetic_fleet(12, Seed=3):
+            for Magnitude in [1.0, 3.0, 0.05]:
+                LoadShape = [Load * Magnitude for Load in unit['LoadShape']]
+                tx = Transformer(unit['HeatRun'], unit['Thermal'])
+                tx.perform_rating(unit['AmbWHS'], unit['AmbAgeing'], LoadShape, unit['Limits'])
+                results = ratings.rate(unit['HeatRun'], unit['Thermal'], unit['AmbWHS'],
+                                       unit['AmbAgeing'], LoadShape, unit['Limits'])
+                for key in rate.RATING_RESULTS:
+                    self.assertEqual(results[key], getattr(tx, key))
+
+    def test_matches_rating(self):
+        ratings = cache.RatingCache()
+        results = self.rate(ratings, self.data['LoadShape'])
+        Expected = self.data['ExpectedResults']
+        self.assertEqual(results['MaxLoad'], Expected['MaxLoad'])
+        self.assertEqual(results['RatingReason'], Expected['RatingReason'])
+
+    def test_disk_tier(self):
+        with cache.RatingCache(self.path) as ratings:
+            first = self.rate(ratings, self.data['LoadShape'])
+        with cache.RatingCache(self.path) as ratings:
+            self.assertEqual(self.rate(ratings, self.data['LoadShape']), first)
+            self.assertEqual(ratings.DiskHits, 1)
+        with cache.RatingCache(self.path, Version='changed') as ratings:
+            self.rate(ratings, self.data['LoadShape'])
+            self.assertEqual((ratings.Hits, ratings.Misses), (0, 1))
+
+    def test_eviction(self):
+        with cache.RatingCache(self.path, MaxEntries=2, MaxBytes=500) as ratings:
+            for i in range(5):
+                ratings.put(str(i), {'MaxLoad': float(i), 'RatingReason': 'Age' * 30})
+            self.assertEqual(list(ratings.Memory), ['3', '4'])
+            self.assertLessEqual(ratings.DiskBytes, 500)
+            self.assertIsNone(ratings.get('0'))
+            self.assertEqual(ratings.get('4')['MaxLoad'], 4.0)
+
+    def test_canonical_key(self):
+        key = cache.rating_key({'RatedLoad': 25}, {}, 25, 27, [1.0], {})
+        self.assertEqual(key, cache.rating_key({'RatedLoad': 25.0}, {}, 25.0, 27.0, [1], {}))
+
+
+class TestSynthetic(unittest.TestCase):
+    """ Tests the synthetic fleet generator
+    """
+
+    def test_reproducible(self):
+        units = synthetic.synthetic_fleet(50, Seed=3)
+        self.assertEqual(units, synthetic.synthetic_fleet(50, Seed=3))
+        self.assertNotEqual(units, synthetic.synthetic_fleet(50, Seed=4))
+        self.assertEqual(len(units[0]['LoadShape']), 48)
+        Modes = {unit['HeatRun']['CoolingMode'] for unit in units}
+        self.assertEqual(Modes, {'ONAN', 'ONAF', 'OFAF', 'ODAF'})
+
+    def test_fleet_is_rated(self):
+        units = synthetic.synthetic_fleet(20, Seed=1)
+        results = fleet.rate_fleet(*synthetic.fleet_columns(units))
+        for unit, MaxLoad in zip(units, results['MaxLoad']):
+            self.assertGreater(MaxLoad, 0.0)
+            self.assertLessEqual(MaxLoad, 1.5 * unit['HeatRun']['RatedLoad'] + 0.001)
+
 
 if __name__ == '__main__':
     unittest.main()